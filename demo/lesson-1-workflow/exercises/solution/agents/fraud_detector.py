@@ -1,13 +1,32 @@
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Literal, Tuple, Any, Optional
 from models.swift_message import SWIFTMessage
 from services.llm_service import LLMService
+from services.llm_client import create_chat_completion
+from services.prompt_serializer import PromptSerializer, FRAUD_DETECTOR_FIELDS
+from services.response_parser import JSON_OBJECT, LLMResponse, ResponseParseError, ResponseParser, ResponseSchema
 from config import Config
-import json
+
+
+class FraudVerdictResponse(LLMResponse):
+    fraud: Literal["YES", "NO"]
+    reasoning: str = ""
+
+
+FRAUD_VERDICT = ResponseSchema("fraud_verdict", FraudVerdictResponse)
+
 
 class FraudDetector:
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
+
+        self.stats = {
+            "batches": 0,
+            "packed_messages": 0,
+            "requeued": 0,
+            "truncated": 0,
+            "fallbacks": 0
+        }
         
     def create_prompt(self, message: SWIFTMessage) -> str:
         prompt = f"""
@@ -15,7 +34,7 @@ class FraudDetector:
 You are a SWIFT Transaction processor.  Your job is to look for fraud in SWIFT messages.
 Your primary definition of fraud is any currency not in USD. Please look at this message.
 
-{message}
+{PromptSerializer.serialize(message, FRAUD_DETECTOR_FIELDS)}
 
 Now perform risk behavior analysis. Respond with JSON:
         {{
@@ -25,11 +44,15 @@ Now perform risk behavior analysis. Respond with JSON:
 """
         return prompt
     
-    def respond(self, prompt: str) -> Dict[str, Any]:
+    def respond(self, prompt: str, message_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get SWIFT message corrections from LLM
         """
-        response = self.llm_service.client.chat.completions.create(
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudDetector",
+            step="respond",
+            message_id=message_id,
             model=self.llm_service.model,
             messages=[
                 {
@@ -45,6 +68,186 @@ Now perform risk behavior analysis. Respond with JSON:
             temperature=0
         )
         
-        result = json.loads(response.choices[0].message.content or "{}")
+        result = ResponseParser.parse_response(FRAUD_VERDICT, response.choices[0].message.content)
          
-        return result
\ No newline at end of file
+        return result
+
+    def create_batch_prompt(self, messages: List[SWIFTMessage]) -> str:
+        """
+        Prompt scoring several messages at once, one TSV row per message
+        """
+        prompt = f"""
+
+You are a SWIFT Transaction processor.  Your job is to look for fraud in SWIFT messages.
+Your primary definition of fraud is any currency not in USD. Please look at each of these messages.
+
+{PromptSerializer.serialize_batch(messages, FRAUD_DETECTOR_FIELDS)}
+
+Now perform risk behavior analysis on every message. Respond with JSON containing one entry per message_id:
+        {{
+                "results": [
+                        {{
+                                "message_id": "message_id from the table",
+                                "fraud": "YES"|"NO",
+                                "reasoning": "One sentence on why this is or is not fraud"
+                        }}
+                ]
+        }}
+"""
+        return prompt
+
+    def respond_batch(self, prompt: str, messages: List[SWIFTMessage],
+                      reserve: Optional[int] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Get the packed fraud verdicts for a batch from the LLM, with the
+        response's finish_reason; an unparseable response yields no verdicts
+        """
+        reserve = reserve or self.config.FRAUD_BATCH_OUTPUT_TOKENS
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudDetector",
+            step="respond_batch",
+            model=self.llm_service.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a helpful assistant"
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=min(self.config.LLM_MAX_OUTPUT_TOKENS, len(messages) * reserve),
+            temperature=0
+        )
+
+        choice = response.choices[0]
+        try:
+            return ResponseParser.parse_response(JSON_OBJECT, choice.message.content), choice.finish_reason
+        except ResponseParseError:
+            return {}, choice.finish_reason
+
+    def detect_batch(self, messages: List[SWIFTMessage]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fraud verdicts for many messages using packed requests.
+
+        Messages missing from a packed response (or whose response could not
+        be parsed) are re-queued into the next round; any still missing after
+        Config.FRAUD_BATCH_MAX_ATTEMPTS rounds are scored one by one.
+
+        A re-queued round never repeats a request that already failed, which
+        the response cache could otherwise answer with the same bad response.
+        A batch dropped as a whole is split in half, and one cut short by the
+        output limit is also given twice the completion tokens per message;
+        a lone message that still gets no verdict is scored on its own.
+        Returns verdicts keyed by message_id.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = list(messages)
+        unpacked: List[SWIFTMessage] = []
+        max_messages = self.config.FRAUD_BATCH_MAX_MESSAGES
+        reserve = self.config.FRAUD_BATCH_OUTPUT_TOKENS
+
+        for _ in range(self.config.FRAUD_BATCH_MAX_ATTEMPTS):
+            if not pending:
+                break
+
+            dropped = []
+            next_max_messages, next_reserve = max_messages, reserve
+            for batch in self.plan_batches(pending, max_messages, reserve):
+                response, finish_reason = self.respond_batch(self.create_batch_prompt(batch), batch, reserve)
+                verdicts = self.demux(response, batch)
+                results.update(verdicts)
+                missing = [message for message in batch if message.message_id not in verdicts]
+
+                truncated = finish_reason == "length"
+                if truncated:
+                    self.stats["truncated"] += 1
+                    next_reserve = min(reserve * 2, self.config.LLM_MAX_OUTPUT_TOKENS)
+
+                if len(missing) == len(batch) or truncated:
+                    if len(batch) == 1 and (not truncated or reserve >= self.config.LLM_MAX_OUTPUT_TOKENS):
+                        unpacked.extend(missing)
+                        missing = []
+                    next_max_messages = min(next_max_messages, max(len(batch) // 2, 1))
+                dropped.extend(missing)
+
+                self.stats["batches"] += 1
+                self.stats["packed_messages"] += len(batch)
+
+            self.stats["requeued"] += len(dropped)
+            pending = dropped
+            max_messages, reserve = next_max_messages, next_reserve
+
+        for message in unpacked + pending:
+            results[message.message_id] = self.respond(self.create_prompt(message), message.message_id)
+            self.stats["fallbacks"] += 1
+
+        return results
+
+    def plan_batches(self, messages: List[SWIFTMessage], max_messages: Optional[int] = None,
+                     reserve: Optional[int] = None) -> List[List[SWIFTMessage]]:
+        """
+        Split messages into batches of at most max_messages whose prompt and
+        reserved completion fit the model's context window and output limit
+        """
+        overhead = PromptSerializer.count_tokens(self.create_batch_prompt([]))
+        reserve = reserve or self.config.FRAUD_BATCH_OUTPUT_TOKENS
+        max_messages = min(max_messages or self.config.FRAUD_BATCH_MAX_MESSAGES,
+                           max(self.config.LLM_MAX_OUTPUT_TOKENS // reserve, 1))
+
+        batches: List[List[SWIFTMessage]] = []
+        batch: List[SWIFTMessage] = []
+        prompt_tokens = overhead
+
+        for message in messages:
+            tokens = PromptSerializer.count_tokens(PromptSerializer.serialize_row(message, FRAUD_DETECTOR_FIELDS))
+            fits = prompt_tokens + tokens + (len(batch) + 1) * reserve <= self.config.LLM_CONTEXT_WINDOW
+            if batch and (len(batch) >= max_messages or not fits):
+                batches.append(batch)
+                batch, prompt_tokens = [], overhead
+            batch.append(message)
+            prompt_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def demux(response: Any, messages: List[SWIFTMessage]) -> Dict[str, Dict[str, Any]]:
+        """
+        Match packed verdicts back to their messages.
+
+        Accepts the results as a list of entries or an object keyed by
+        message_id; entries for unknown ids, repeated ids and malformed
+        verdicts are ignored, so their messages count as dropped.
+        """
+        entries = response.get("results", response) if isinstance(response, dict) else response
+        if isinstance(entries, dict):
+            entries = [
+                {"message_id": message_id, **entry}
+                for message_id, entry in entries.items() if isinstance(entry, dict)
+            ]
+        if not isinstance(entries, list):
+            return {}
+
+        expected = {message.message_id for message in messages}
+        verdicts: Dict[str, Dict[str, Any]] = {}
+
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            message_id = str(entry.get("message_id", "")).strip()
+            fraud = str(entry.get("fraud", "")).strip().upper()
+            if message_id in expected and message_id not in verdicts and fraud in ("YES", "NO"):
+                verdicts[message_id] = {"fraud": fraud, "reasoning": entry.get("reasoning", "")}
+
+        return verdicts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Packed request counters"""
+        stats = dict(self.stats)
+        stats["messages_per_batch"] = stats["packed_messages"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
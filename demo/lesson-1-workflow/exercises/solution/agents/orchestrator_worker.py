@@ -2,10 +2,12 @@
 Orchestrator-Worker Agent Pattern for transaction splitting and processing
 """
 
-from typing import List
+from typing import List, Optional
 from models.swift_message import SWIFTMessage
 from config import Config
+from services.llm_service import LLMService
 from agents.workflow_agents.base_agents import Orchestrator, GenericAgent
+from services.stream_sinks import ConsoleSink, StreamSink
 
 
 class OrchestratorWorker:
@@ -13,19 +15,35 @@ class OrchestratorWorker:
     Orchestrator-Worker pattern implementation for SWIFT transaction processing
     """
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.orchestrator = Orchestrator()
+        self.llm_service = llm_service or LLMService()
+        self.orchestrator = Orchestrator(self.llm_service)
     
-    def process_transactions(self, messages: List[SWIFTMessage]):
+    def process_transactions(self, messages: List[SWIFTMessage], sink: Optional[StreamSink] = None):
         """
         Main orchestrator method - coordinates workers to process transactions
-        """
 
-        prompt = self.orchestrator.create_prompt(messages)
+        Worker reports are streamed into sink as they arrive (the console by
+        default while LLM_STREAM_WORKER_OUTPUT is on) instead of being
+        printed once complete. A sink created here is closed before
+        returning; a sink passed in stays open, since the caller may share
+        it across runs, and must be closed by the caller.
+        """
+        owned = sink is None and self.config.LLM_STREAM_WORKER_OUTPUT
+        if owned:
+            sink = ConsoleSink()
 
-        tasks = self.orchestrator.respond(prompt)
+        try:
+            prompt = self.orchestrator.create_prompt(messages)
 
-        for task in tasks['tasks']:
-            print(GenericAgent().respond(task, tasks['analysis'], messages))
+            tasks = self.orchestrator.respond(prompt)
 
+            for task in tasks['tasks']:
+                if sink is not None:
+                    GenericAgent(self.llm_service).respond(task, tasks['analysis'], messages, sink=sink)
+                else:
+                    print(GenericAgent(self.llm_service).respond(task, tasks['analysis'], messages))
+        finally:
+            if owned:
+                sink.close()
@@ -1,16 +1,32 @@
 
 from services.llm_service import LLMService
+from services.llm_client import create_chat_completion, stream_chat_completion
+from services.stream_sinks import StreamSink
+from services.prompt_serializer import PromptSerializer, ORCHESTRATOR_FIELDS
 from config import Config
 from models.swift_message import SWIFTMessage
-from typing import Dict, List, Tuple, Any
-import json
+from services.response_parser import LLMResponse, ResponseParser, ResponseSchema
+from typing import Dict, Iterator, List, Tuple, Any, Optional
+
+
+class OrchestratorTask(LLMResponse):
+    type: str
+    description: str
+
+
+class OrchestratorPlanResponse(LLMResponse):
+    analysis: str
+    tasks: List[OrchestratorTask]
+
+
+ORCHESTRATOR_PLAN = ResponseSchema("orchestrator_plan", OrchestratorPlanResponse)
 
 
 class Orchestrator:
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
         
     def create_prompt(self, messages: List[SWIFTMessage]) -> str:
         """
@@ -20,7 +36,7 @@ class Orchestrator:
 
 You are a SWIFT Transaction processor.  You have this list of messages.
 
-{messages}
+{PromptSerializer.serialize_batch(messages, ORCHESTRATOR_FIELDS)}
 
 Your job is to analyze these messages and process them. Only concern your self with amounts, countries, debits and credits.
 
@@ -53,7 +69,10 @@ Respond in JSON Format.
         """
         Get SWIFT message corrections from LLM
         """
-        response = self.llm_service.client.chat.completions.create(
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="Orchestrator",
+            step="respond",
             model=self.llm_service.model,
             messages=[
                 {
@@ -69,16 +88,16 @@ Respond in JSON Format.
             temperature=0
         )
         
-        result = json.loads(response.choices[0].message.content or "{}")
+        result = ResponseParser.parse_response(ORCHESTRATOR_PLAN, response.choices[0].message.content)
          
         return result
     
 class GenericAgent():
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
 
-    def respond(self, task: str, analysis: str, messages:List[SWIFTMessage] ) -> Dict[str, Any]:
+    def create_prompt(self, task: Dict[str, Any], analysis: str, messages: List[SWIFTMessage]) -> str:
         prompt = f"""
 You are a SWIFT payment processor.  Please process the subtasks according to the subtask type and description.
 
@@ -87,13 +106,32 @@ Subtask Type: {task['type']}
 Subtask Description: {task['description']}
 
 The Swift Messages are here
-{messages}
+{PromptSerializer.serialize_batch(messages, ORCHESTRATOR_FIELDS)}
 
 Return 
 1.  How the task was processed and a summary of findings for review.
 
 """
-        response = self.llm_service.client.chat.completions.create(
+        return prompt
+
+    def respond(self, task: Dict[str, Any], analysis: str, messages: List[SWIFTMessage],
+                sink: Optional[StreamSink] = None) -> Optional[str]:
+        """
+        Process a subtask. With a sink, the response is streamed into it as it
+        arrives instead of being returned.
+        """
+        prompt = self.create_prompt(task, analysis, messages)
+
+        if sink is not None:
+            for chunk in self.stream(prompt):
+                sink.write(chunk)
+            sink.end()
+            return None
+
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="GenericAgent",
+            step="respond",
             model=self.llm_service.model,
             messages=[
                 {
@@ -111,4 +149,27 @@ Return
         
         result = response.choices[0].message.content 
          
-        return result
\ No newline at end of file
+        return result
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Stream the response to a prompt chunk by chunk
+        """
+        return stream_chat_completion(
+            self.llm_service.client,
+            agent="GenericAgent",
+            step="respond",
+            model=self.llm_service.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a helpful assistant"
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            response_format={"type": "text"},
+            temperature=0
+        )
\ No newline at end of file
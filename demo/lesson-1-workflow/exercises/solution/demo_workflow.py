@@ -9,11 +9,15 @@ import time
 from typing import List, Dict, Any
 
 from models.swift_message import SWIFTMessage
+from models.swift_batch import SWIFTBatch
 from agents.evaluator_optimizer import EvaluatorOptimizer
 from agents.prompt_chaining import PromptChainingAgent
 from agents.orchestrator_worker import OrchestratorWorker
 from services.swift_generator import SWIFTGenerator
+from services.llm_service import LLMService
+from services.llm_metrics import LLMMetrics
 from agents.fraud_detector import FraudDetector
+from services.benford import BenfordMonitor
 from config import Config
 
 
@@ -26,12 +30,16 @@ class WorkflowPatternDemo:
     def __init__(self):
         self.config = Config()
         
+        # All agents share one LLM service backed by the pooled client
+        self.llm_service = LLMService()
+        
         # Initialize all agent patterns
         self.swift_generator = SWIFTGenerator()
-        self.evaluator_optimizer = EvaluatorOptimizer()
-        self.prompt_chaining_agent = PromptChainingAgent()
-        self.orchestrator_worker = OrchestratorWorker()
-        self.fraud_detector = FraudDetector()
+        self.evaluator_optimizer = EvaluatorOptimizer(self.llm_service)
+        self.prompt_chaining_agent = PromptChainingAgent(self.llm_service.client)
+        self.orchestrator_worker = OrchestratorWorker(self.llm_service)
+        self.fraud_detector = FraudDetector(self.llm_service)
+        self.benford_monitor = BenfordMonitor(self.llm_service, self.swift_generator.bank_registry)
 
         #TODO:  Create fraud class to instantiate
         
@@ -65,6 +73,7 @@ class WorkflowPatternDemo:
 
         #TODO:  What can I add here to change the validated messages to do a fraud check.
         validated_messages = self._step_2a_fraud(validated_messages)
+        validated_messages = self._step_2b_benford_monitoring(validated_messages)
         
         # Step 3: Chaining
         analyzed_messages = self._step_3_prompt_chaining(validated_messages)
@@ -163,16 +172,55 @@ class WorkflowPatternDemo:
         return validated_messages
     
     def _step_2a_fraud(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
+        if self.config.FRAUD_DETECTOR_PACKED:
+            verdicts = self.fraud_detector.detect_batch(messages)
+        else:
+            verdicts = {
+                message.message_id: self.fraud_detector.respond(
+                    self.fraud_detector.create_prompt(message), message.message_id
+                )
+                for message in messages
+            }
+
         checked_messages = []
         for message in messages:
-            fraud_prompt = self.fraud_detector.create_prompt(message)
-            fraud_message = self.fraud_detector.respond(fraud_prompt)
+            fraud_message = verdicts[message.message_id]
             if fraud_message["fraud"] == "YES":
                 message.mark_as_fraudulent(.9, fraud_message["reasoning"])
             checked_messages.append(message)
         return checked_messages
 
     
+    def _step_2b_benford_monitoring(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
+        """
+        Step 2b: Streaming Benford's law monitoring per sender BIC and bank
+        """
+        print("STEP 2B: BENFORD MONITORING")
+        print("📈 Updating leading-digit histograms...")
+        
+        start_time = time.time()
+        
+        # The LLM is only asked about keys that newly crossed the threshold
+        result = self.benford_monitor.observe(messages)
+        
+        monitoring_time = time.time() - start_time
+        
+        print(f"   📊 Tracked keys: {result['tracked']}")
+        print(f"   ⚠️  New deviations: {len(result['events'])}")
+        for key in result['deviating']:
+            print(f"      - {key}")
+        print(f"   ⏱️  Monitoring time: {monitoring_time:.2f} seconds")
+        print()
+        
+        self.workflow_stats['benford_monitoring'] = {
+            'tracked': result['tracked'],
+            'new_deviations': len(result['events']),
+            'llm_reviews': len(result['reviews']),
+            'time': monitoring_time
+        }
+        
+        return messages
+    
     def _step_3_prompt_chaining(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
         """
         Step 3: Enhanced fraud analysis using Prompt Chaining pattern
@@ -193,12 +241,10 @@ class WorkflowPatternDemo:
         if high_risk_messages:
             print(f"   🎯 Analyzing {len(high_risk_messages)} high-risk transactions...")
             
-            # Run prompt chain analysis
-            chain_results = []
-            for msg in high_risk_messages:
-                chain_results.append( self.prompt_chaining_agent.analyze_transaction_chain(
-                    msg
-                ))
+            # Run prompt chain analysis, pipelined across the messages
+            chain_results = self.prompt_chaining_agent.analyze_transactions(
+                high_risk_messages, progress=self._print_chain_progress
+            )
             
             # Update messages with chain analysis results
             decisions = {'APPROVE': 0, 'HOLD': 0, 'REJECT': 0}
@@ -242,6 +288,13 @@ class WorkflowPatternDemo:
         
         return messages
     
+    def _print_chain_progress(self, progress: Dict[str, Any]):
+        """Print chain progress at every tenth of the batch"""
+        interval = max(progress["total"] // 10, 1)
+        if progress["completed"] % interval == 0 or progress["completed"] == progress["total"]:
+            print(f"      ⏳ {progress['completed']}/{progress['total']} chains complete "
+                  f"({progress['messages_per_second']:.1f}/s)")
+    
     def _step_4_orchestrator_worker(self, messages: List[SWIFTMessage]) -> None:
         """
         Step 5: Transaction processing using Orchestrator-Worker pattern
@@ -257,7 +310,7 @@ class WorkflowPatternDemo:
         print(f"   📊 Processing {len(clean_messages)} clean transactions...")
         
         # Calculate processing statistics
-        total_amount = sum(float(msg.amount) for msg in clean_messages)
+        total_amount = SWIFTBatch.from_messages(clean_messages).total_amount()
         
         try:
             # Process transactions (splits into company fees and transfers)
@@ -327,6 +380,17 @@ class WorkflowPatternDemo:
         for step, stats in self.workflow_stats.items():
             print(f"   {step.title().replace('_', ' ')}: {stats.get('time', 0):.2f}s")
         print()
+        print("🤖 LLM USAGE BY AGENT STEP:")
+        llm_metrics = LLMMetrics.get_shared()
+        step_stats = llm_metrics.summary(by="step")
+        for step, stats in sorted(step_stats.items(), key=lambda item: item[1]['latency_total'], reverse=True):
+            print(f"   {step}: {stats['calls']} calls, {stats['total_tokens']:,} tokens, "
+                  f"p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s, "
+                  f"wait p95 {stats['wait_p95']:.2f}s, ${stats['cost']:.4f}")
+        totals = llm_metrics.totals()
+        print(f"   Total: {totals['calls']} calls ({totals['api_calls']} sent to the API), "
+              f"{totals['total_tokens']:,} tokens, ${totals['cost']:.4f}")
+        print()
         
         print("🏆 WORKFLOW EFFICIENCY:")
         if self.workflow_stats.get('routing', {}).get('fraud_stats'):
@@ -38,6 +38,7 @@ class SWIFTMessage(BaseModel):
     fraud_evaluation : str = Field(default="PENDING")
     chain_analysis : Optional[str] = ""
     agent_perspectives: Optional[str] = ""
+    chain_metadata: Optional[dict] = None
 
     note: Optional[str] = None
     
@@ -52,6 +53,9 @@ class SWIFTMessage(BaseModel):
     def get_agent_perspectives(self)-> str:
         return self.agent_perspectives
     
+    def get_chain_metadata(self)-> Optional[dict]:
+        return self.chain_metadata
+    
     def mark_as_fraudulent(self, score: float, reason: str):
         """Mark message as fraudulent"""
         self.fraud_status = "FRAUDULENT"
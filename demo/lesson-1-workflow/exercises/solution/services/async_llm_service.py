@@ -0,0 +1,457 @@
+"""
+Async LLM service for fraud analysis and SWIFT message correction using OpenAI
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Dict, List, Any, Literal, Optional, Tuple, TypeVar
+
+from openai import AsyncOpenAI
+from services.llm_client import LLMClientRegistry, acreate_chat_completion
+from services.prompt_templates import PromptRegistry, PromptTemplate
+from services.resilience import CircuitOpenError
+from services.response_parser import JSON_OBJECT, LLMResponse, ResponseParser, ResponseSchema
+from models.swift_message import SWIFTMessage
+from models.swift_batch import SWIFTBatch
+from config import Config
+
+
+T = TypeVar("T")
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_thread: Optional[threading.Thread] = None
+_background_lock = threading.Lock()
+
+
+class FraudReviewResponse(LLMResponse):
+    decision: Literal["APPROVE", "HOLD", "REJECT"]
+    confidence: Optional[float] = None
+    risk_factors: List[str] = []
+    recommended_actions: List[str] = []
+
+
+class BenfordAnalysisResponse(LLMResponse):
+    analysis: str = ""
+    significance: Optional[Literal["LOW", "MEDIUM", "HIGH"]] = None
+    fraud_probability: Optional[float] = None
+    recommendations: List[str] = []
+
+
+FRAUD_REVIEW = ResponseSchema("fraud_review", FraudReviewResponse)
+BENFORD_ANALYSIS = ResponseSchema("benford_analysis", BenfordAnalysisResponse)
+
+
+PromptRegistry.register(PromptTemplate(
+    name="llm_service.fraud_review",
+    system="""
+        You are an expert fraud analyst specializing in SWIFT transactions. Analyze the provided transaction data and make a decision about whether to approve, reject, or hold the transaction for further investigation. Respond with JSON in the specified format.
+    """,
+    instructions="""
+        Analyze the SWIFT transaction at the end of this prompt for fraud risk.
+
+        The automated fraud score runs from 0.0 (no risk) to 1.0 (high risk).
+        Based on the transaction, the automated analysis and the additional context, make a decision and provide analysis.
+
+        Respond with JSON in this exact format:
+        {
+            "decision": "APPROVE|HOLD|REJECT",
+            "confidence": 0.0-1.0,
+            "reasoning": "Detailed explanation of your decision",
+            "risk_factors": ["list", "of", "key", "risk", "factors"],
+            "recommended_actions": ["list", "of", "recommended", "actions"],
+            "business_impact": "Assessment of business impact if decision is wrong",
+            "additional_checks": ["list", "of", "additional", "checks", "recommended"]
+        }
+
+        Decision Guidelines:
+        - APPROVE: Low risk, process normally
+        - HOLD: Medium risk, requires manual review
+        - REJECT: High risk, block transaction
+    """,
+    dynamic="""
+        TRANSACTION DETAILS:
+        - Message ID: {message.message_id}
+        - Type: {message.message_type}
+        - Reference: {message.reference}
+        - Amount: {message.amount} {message.currency}
+        - Sender BIC: {message.sender_bic}
+        - Receiver BIC: {message.receiver_bic}
+        - Value Date: {message.value_date}
+
+        AUTOMATED FRAUD ANALYSIS:
+        - Fraud Score: {fraud_score:.3f}
+        - Risk Indicators:
+        {indicators}
+
+        ADDITIONAL CONTEXT:
+        - Ordering Customer: {ordering_customer}
+        - Beneficiary: {beneficiary}
+        - Remittance Info: {remittance_info}
+    """
+))
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on the shared background event loop and wait for its result.
+    
+    Synchronous callers from any thread share one loop, and therefore one async
+    connection pool, instead of each spinning up their own.
+    """
+    global _background_loop, _background_thread
+    
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            _background_thread = threading.Thread(
+                target=_background_loop.run_forever, name="llm-service-loop", daemon=True
+            )
+            _background_thread.start()
+    
+    if threading.current_thread() is _background_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the background loop; await the coroutine instead")
+    
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop).result()
+
+
+class AsyncLLMService:
+    """
+    Asyncio-native service for LLM-based fraud analysis and SWIFT message correction.
+    
+    All requests share a bounded semaphore, so a single event loop can hold
+    many in-flight reviews without exceeding Config.LLM_MAX_CONCURRENCY.
+    An instance must only be used from one event loop.
+    """
+    
+    def __init__(self, client: Optional[AsyncOpenAI] = None, max_concurrency: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.config = Config()
+        
+        self._client = client
+        self.model = self.config.OPENAI_MODEL
+        self.max_concurrency = max_concurrency or self.config.LLM_MAX_CONCURRENCY
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Injected client, or the shared pooled client of the running loop"""
+        if self._client is None:
+            self._client = LLMClientRegistry.get_async_client()
+        return self._client
+    
+    async def review_suspicious_transaction(self, message: SWIFTMessage, fraud_score: float, 
+                                    indicators: List[str]) -> Dict[str, Any]:
+        """
+        Use LLM to review suspicious transactions and make hold/approve decisions.
+        
+        A conservative HOLD is returned only while the endpoint's circuit
+        breaker is open; any other failure is raised to the caller.
+        """
+        
+        try:
+            response = await self._create_completion(
+                step="review_suspicious_transaction",
+                message_id=message.message_id,
+                model=self.model,
+                messages=self._create_fraud_review_prompt(message, fraud_score, indicators),
+                response_format={"type": "json_object"},
+                temperature=0.1  # Low temperature for consistent analysis
+            )
+            
+            result = ResponseParser.parse_response(FRAUD_REVIEW, response.choices[0].message.content)
+            
+            self.logger.debug(f"LLM fraud review completed for {message.message_id}: {result['decision']}")
+            
+            return result
+            
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM fraud review skipped for {message.message_id}: {str(e)}")
+            # Return conservative hold decision while the endpoint is unavailable
+            return {
+                "decision": "HOLD",
+                "confidence": 0.5,
+                "reasoning": f"LLM analysis unavailable: {str(e)}",
+                "risk_factors": indicators,
+                "recommended_actions": ["Manual review required due to system error"]
+            }
+    
+    async def get_swift_correction(self, prompt: str) -> Dict[str, Any]:
+        """
+        Get SWIFT message corrections from LLM
+        """
+        try:
+            response = await self._create_completion(
+                step="get_swift_correction",
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a SWIFT message validation expert. "
+                        "Your task is to correct SWIFT message format errors while "
+                        "maintaining the business intent of the transaction. "
+                        "Respond with JSON containing the corrected fields."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            
+            result = ResponseParser.parse_response(JSON_OBJECT, response.choices[0].message.content)
+            
+            return result
+            
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM SWIFT correction skipped: {str(e)}")
+            return {}
+    
+    async def analyze_benford_deviation(self, amounts: List[float], deviation_score: float, 
+                                p_value: float) -> Dict[str, Any]:
+        """
+        Use LLM to analyze Benford's Law deviations and provide insights
+        """
+        try:
+            prompt = self._create_benford_analysis_prompt(amounts, deviation_score, p_value)
+            
+            response = await self._create_completion(
+                step="analyze_benford_deviation",
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a financial forensics expert specializing in "
+                        "Benford's Law analysis for fraud detection. Analyze the provided "
+                        "transaction data and explain the significance of any deviations. "
+                        "Respond with JSON in the specified format."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            
+            result = ResponseParser.parse_response(BENFORD_ANALYSIS, response.choices[0].message.content)
+            
+            self.logger.debug("LLM Benford's Law analysis completed")
+            
+            return result
+            
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM Benford analysis skipped: {str(e)}")
+            return {
+                "analysis": "Analysis unavailable",
+                "significance": "UNKNOWN",
+                "recommendations": ["Manual review required"]
+            }
+    
+    def _create_fraud_review_prompt(self, message: SWIFTMessage, fraud_score: float, 
+                                  indicators: List[str]) -> List[Dict[str, str]]:
+        """
+        Create the chat messages for LLM fraud review, static instructions first
+        """
+        return PromptRegistry.get_shared().render(
+            "llm_service.fraud_review",
+            message=message,
+            fraud_score=fraud_score,
+            indicators=chr(10).join(f"  - {indicator}" for indicator in indicators),
+            ordering_customer=getattr(message, 'ordering_customer', 'N/A'),
+            beneficiary=getattr(message, 'beneficiary', 'N/A'),
+            remittance_info=getattr(message, 'remittance_info', 'N/A')
+        )
+    
+    def _create_benford_analysis_prompt(self, amounts: List[float], deviation_score: float, 
+                                      p_value: float) -> str:
+        """
+        Create prompt for Benford's Law analysis
+        """
+        # Extract first digits for analysis
+        first_digits = []
+        for amount in amounts[:20]:  # Sample first 20 for prompt
+            amount_str = str(int(amount)).lstrip('0')
+            if amount_str and amount_str[0].isdigit():
+                first_digits.append(int(amount_str[0]))
+        
+        prompt = f"""
+Analyze the following transaction data for Benford's Law compliance:
+
+DATASET OVERVIEW:
+- Total Transactions: {len(amounts)}
+- Sample First Digits: {first_digits[:20]}
+- Sample Amounts: {[f"${amt:,.2f}" for amt in amounts[:10]]}
+
+STATISTICAL ANALYSIS:
+- Deviation Score: {deviation_score:.4f}
+- P-Value: {p_value:.6f}
+- Significant Deviation: {p_value < 0.05}
+
+BENFORD'S LAW CONTEXT:
+Benford's Law states that in many real-world datasets, the first digit follows a specific distribution:
+- Digit 1: ~30.1%
+- Digit 2: ~17.6%
+- Digit 3: ~12.5%
+- etc.
+
+Significant deviations may indicate:
+- Data manipulation
+- Systematic fraud
+- Artificial data generation
+- Specific business processes
+
+Respond with JSON in this exact format:
+{{
+    "analysis": "Detailed analysis of the deviation and its implications",
+    "significance": "LOW|MEDIUM|HIGH",
+    "fraud_probability": 0.0-1.0,
+    "likely_causes": ["list", "of", "likely", "causes"],
+    "recommendations": ["list", "of", "recommended", "actions"],
+    "false_positive_risk": "Assessment of false positive risk",
+    "additional_analysis": "Suggestions for additional analysis"
+}}
+"""
+        return prompt
+    
+    async def batch_analyze_transactions(self, messages: List[SWIFTMessage]) -> Dict[str, Any]:
+        """
+        Perform batch analysis of multiple transactions for patterns.
+        
+        Amounts that do not parse are left out of the amount statistics and
+        counted in the prompt; a batch with no parseable amount is not sent.
+        """
+        # Create summary of transaction patterns from the columnar batch
+        batch = SWIFTBatch.from_messages(messages)
+        amounts = batch.amounts[batch.amount_valid]
+        
+        if amounts.size == 0:
+            self.logger.warning(f"LLM batch analysis skipped: no parseable amount in {len(messages)} transactions")
+            return {
+                "analysis": "Insufficient data for batch analysis",
+                "patterns": [],
+                "recommendations": ["Manual review required"]
+            }
+        
+        try:
+            prompt = f"""
+Analyze this batch of {len(messages)} SWIFT transactions for suspicious patterns:
+
+SUMMARY STATISTICS:
+- Total Transactions: {len(messages)}
+- Unparseable Amounts: {len(messages) - amounts.size} (excluded from the amount statistics)
+- Amount Range: ${amounts.min():,.2f} - ${amounts.max():,.2f}
+- Average Amount: ${amounts.mean():,.2f}
+- Unique Currencies: {len(batch.categories["currency"])}
+- Unique BIC Pairs: {batch.unique_pairs("sender_bic", "receiver_bic")}
+
+SAMPLE TRANSACTIONS:
+{chr(10).join([
+    f"- {msg.message_type} {msg.amount} {msg.currency} {msg.sender_bic}->{msg.receiver_bic}"
+    for msg in messages[:10]
+])}
+
+Look for patterns that might indicate:
+- Systematic fraud
+- Money laundering schemes  
+- Structuring activities
+- Coordination between entities
+
+Respond with JSON format analysis of suspicious patterns found.
+"""
+            
+            response = await self._create_completion(
+                step="batch_analyze_transactions",
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a financial crimes investigator analyzing "
+                        "transaction patterns for suspicious activity."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            
+            result = ResponseParser.parse_response(JSON_OBJECT, response.choices[0].message.content)
+            
+            self.logger.info("LLM batch analysis completed")
+            
+            return result
+            
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM batch analysis skipped: {str(e)}")
+            return {
+                "analysis": "Batch analysis unavailable",
+                "patterns": [],
+                "recommendations": ["Manual review required"]
+            }
+    
+    async def review_suspicious_transactions(self, reviews: List[Tuple[SWIFTMessage, float, List[str]]]
+                                           ) -> List[Dict[str, Any]]:
+        """
+        Review many (message, fraud_score, indicators) tuples concurrently, preserving order.
+        
+        A review that fails does not cancel the others; its entry is a HOLD
+        that names the error.
+        """
+        results = await asyncio.gather(*[
+            self.review_suspicious_transaction(message, fraud_score, indicators)
+            for message, fraud_score, indicators in reviews
+        ], return_exceptions=True)
+        
+        return [
+            self._review_error(message, indicators, result) if isinstance(result, Exception) else result
+            for (message, _, indicators), result in zip(reviews, results)
+        ]
+    
+    async def get_swift_corrections(self, prompts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get SWIFT message corrections for many prompts concurrently, preserving order.
+        
+        A correction that fails does not cancel the others; its entry holds
+        only the error.
+        """
+        results = await asyncio.gather(*[self.get_swift_correction(prompt) for prompt in prompts],
+                                       return_exceptions=True)
+        
+        corrections = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"LLM SWIFT correction failed: {str(result)}")
+                result = {"error": f"{type(result).__name__}: {str(result)}"}
+            corrections.append(result)
+        return corrections
+    
+    def _review_error(self, message: SWIFTMessage, indicators: List[str], error: Exception) -> Dict[str, Any]:
+        """
+        The entry for a review that failed within a batch
+        """
+        self.logger.error(f"LLM fraud review failed for {message.message_id}: {str(error)}")
+        return {
+            "decision": "HOLD",
+            "confidence": 0.0,
+            "reasoning": f"LLM analysis failed: {str(error)}",
+            "risk_factors": indicators,
+            "recommended_actions": ["Manual review required due to system error"],
+            "error": type(error).__name__
+        }
+    
+    async def _create_completion(self, **params):
+        """
+        Send one chat completion request, bounded by the shared semaphore
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._semaphore:
+            return await acreate_chat_completion(self.client, agent="LLMService", **params)
@@ -0,0 +1,370 @@
+"""
+Vectorized Benford's law analysis for SWIFT transaction amounts
+"""
+
+import json
+import logging
+import math
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from models.bank import BankRegistry
+from models.swift_batch import SWIFTBatch
+from models.swift_message import SWIFTMessage
+from services.llm_service import LLMService
+
+
+# Expected leading-digit probabilities: P(d) = log10(1 + 1/d)
+FIRST_DIGITS = np.arange(1, 10)
+FIRST_TWO_DIGITS = np.arange(10, 100)
+BENFORD_FIRST = np.log10(1 + 1 / FIRST_DIGITS)
+BENFORD_FIRST_TWO = np.log10(1 + 1 / FIRST_TWO_DIGITS)
+
+
+class BenfordAnalyzer:
+    """
+    Benford's law conformity tests over whole amount arrays.
+
+    Digit histograms, chi-square and MAD statistics are computed with NumPy,
+    for the full dataset and for sliding windows grouped by sender BIC or
+    currency. The LLM is only asked to interpret a window when its p-value
+    newly drops below Config.BENFORD_THRESHOLD.
+    """
+
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.config = Config()
+        self.llm_service = llm_service
+        self.logger = logging.getLogger(__name__)
+
+    def digit_counts(self, digits: np.ndarray, count: int = 1) -> np.ndarray:
+        """
+        Histogram of leading digits; zeros (unusable amounts) are ignored
+        """
+        support = FIRST_DIGITS if count == 1 else FIRST_TWO_DIGITS
+        return np.bincount(digits, minlength=support[-1] + 1)[support[0]:]
+
+    def test_counts(self, counts: np.ndarray, count: int = 1) -> Dict[str, Any]:
+        """
+        Chi-square and mean absolute deviation for one digit histogram
+        """
+        stats = self._test_count_matrix(counts[np.newaxis, :], count)
+        return {key: value[0] for key, value in stats.items()}
+
+    def test_batch(self, batch: SWIFTBatch, count: int = 1) -> Dict[str, Any]:
+        """
+        Test every amount in a batch against Benford's distribution
+        """
+        counts = self.digit_counts(batch.leading_digits(count), count)
+        result = self.test_counts(counts, count)
+        result["observed"] = (counts / max(counts.sum(), 1)).round(4).tolist()
+        return result
+
+    def sliding_windows(self, batch: SWIFTBatch, group_by: str = "sender_bic",
+                        count: int = 1) -> List[Dict[str, Any]]:
+        """
+        Test sliding windows of each group's amounts in arrival order.
+
+        Window histograms come from differences of a cumulative one-hot digit
+        matrix, so all windows of a group are tested in one array operation.
+        """
+        window_size = self.config.BENFORD_WINDOW_SIZE
+        step = self.config.BENFORD_WINDOW_STEP
+        support = FIRST_DIGITS if count == 1 else FIRST_TWO_DIGITS
+
+        digits = batch.leading_digits(count)
+        codes = batch.codes[group_by]
+        windows = []
+
+        for code, group in enumerate(batch.categories[group_by]):
+            rows = np.flatnonzero(codes == code)
+            if len(rows) < self.config.BENFORD_MIN_SAMPLES:
+                continue
+
+            one_hot = (digits[rows, np.newaxis] == support).astype(np.int64)
+            cumulative = np.vstack([np.zeros(len(support), dtype=np.int64), one_hot.cumsum(axis=0)])
+
+            size = min(window_size, len(rows))
+            starts = np.arange(0, len(rows) - size + 1, step)
+            stats = self._test_count_matrix(cumulative[starts + size] - cumulative[starts], count)
+
+            for i, start in enumerate(starts):
+                windows.append({
+                    "group_by": group_by,
+                    "group": str(group),
+                    "rows": rows[start:start + size],
+                    **{key: value[i] for key, value in stats.items()}
+                })
+
+        return windows
+
+    def analyze(self, messages: List[SWIFTMessage],
+                group_by: Sequence[str] = ("sender_bic", "currency"), count: int = 1) -> Dict[str, Any]:
+        """
+        Run the overall and windowed tests and send new deviations to the LLM
+        """
+        batch = SWIFTBatch.from_messages(messages)
+        overall = self.test_batch(batch, count)
+        windows = [window for field in group_by for window in self.sliding_windows(batch, field, count)]
+
+        flagged = []
+        previous = {}
+        for window in windows:
+            key = (window["group_by"], window["group"])
+            if window["deviates"] and not previous.get(key, False):
+                flagged.append(window)
+            previous[key] = window["deviates"]
+
+        llm_reviews = []
+        if self.llm_service:
+            for window in flagged:
+                amounts = batch.amounts[window["rows"]].tolist()
+                analysis = self.llm_service.analyze_benford_deviation(
+                    amounts, window["chi_square"], window["p_value"]
+                )
+                llm_reviews.append({
+                    "group_by": window["group_by"],
+                    "group": window["group"],
+                    "analysis": analysis
+                })
+
+        self.logger.info(
+            f"Benford analysis: {len(windows)} windows tested, {len(flagged)} new deviations"
+        )
+
+        return {
+            "overall": overall,
+            "windows_tested": len(windows),
+            "deviations": [
+                {key: value for key, value in window.items() if key != "rows"}
+                for window in flagged
+            ],
+            "llm_reviews": llm_reviews
+        }
+
+    def _test_count_matrix(self, counts: np.ndarray, count: int) -> Dict[str, np.ndarray]:
+        """
+        Vectorized tests for a (windows x digits) matrix of histograms
+        """
+        expected_share = BENFORD_FIRST if count == 1 else BENFORD_FIRST_TWO
+        sample_size = counts.sum(axis=1)
+        safe_size = np.maximum(sample_size, 1)[:, np.newaxis]
+
+        expected = safe_size * expected_share
+        chi_square = ((counts - expected) ** 2 / expected).sum(axis=1)
+        mad = np.abs(counts / safe_size - expected_share).mean(axis=1)
+
+        degrees = len(expected_share) - 1
+        p_values = np.array([self._chi_square_sf(value, degrees) for value in chi_square])
+        deviates = (sample_size >= self.config.BENFORD_MIN_SAMPLES) & (p_values < self.config.BENFORD_THRESHOLD)
+
+        return {
+            "sample_size": sample_size.astype(int).tolist(),
+            "chi_square": chi_square.round(4).tolist(),
+            "p_value": p_values.round(6).tolist(),
+            "mad": mad.round(6).tolist(),
+            "deviates": deviates.tolist()
+        }
+
+    @staticmethod
+    def _chi_square_sf(value: float, degrees: int) -> float:
+        """Chi-square survival function via the Wilson-Hilferty approximation"""
+        if value <= 0:
+            return 1.0
+        scale = 2.0 / (9.0 * degrees)
+        z = ((value / degrees) ** (1.0 / 3.0) - (1.0 - scale)) / math.sqrt(scale)
+        return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+class BenfordMonitor:
+    """
+    Streaming Benford conformity per sender BIC and per registered bank.
+
+    Each tracked key holds a nine-bin first-digit histogram that is updated
+    in constant time per message, either with exponential decay or in
+    tumbling windows of Config.BENFORD_WINDOW_SIZE messages. An event is
+    raised only when a key's p-value newly drops below the threshold; the
+    key re-arms once it recovers above Config.BENFORD_RECOVERY_THRESHOLD.
+    """
+
+    def __init__(self, llm_service: Optional[LLMService] = None,
+                 bank_registry: Optional[BankRegistry] = None, mode: Optional[str] = None):
+        self.config = Config()
+        self.llm_service = llm_service
+        self.bank_registry = bank_registry
+        self.mode = mode or self.config.BENFORD_MONITOR_MODE
+        self.analyzer = BenfordAnalyzer()
+        self.logger = logging.getLogger(__name__)
+
+        if self.mode not in ("decay", "tumbling"):
+            raise ValueError(f"Unknown Benford monitor mode: {self.mode}")
+
+        # (scope, key) -> tracking state
+        self.counts: Dict[Tuple[str, str], np.ndarray] = {}
+        self.seen: Dict[Tuple[str, str], int] = {}
+        self.deviating: Dict[Tuple[str, str], bool] = {}
+        self.recent_amounts: Dict[Tuple[str, str], Deque[float]] = {}
+
+        self.state_path = self.config.BENFORD_MONITOR_STATE_PATH
+        if self.state_path and os.path.exists(self.state_path):
+            self.restore(self.state_path)
+
+    def observe(self, messages: List[SWIFTMessage]) -> Dict[str, Any]:
+        """
+        Feed a processed batch through the monitor.
+
+        Histograms are updated in arrival order, the LLM reviews only the
+        keys that newly crossed the threshold, each crossing is noted on the
+        message that triggered it, and the state is snapshotted to
+        Config.BENFORD_MONITOR_STATE_PATH so the next run continues from it.
+        """
+        events = self.update_many(messages)
+        reviews = self.review_events(events)
+
+        by_id = {message.message_id: message for message in messages}
+        for event in reviews or events:
+            by_id[event["message_id"]].fraud_statements.append({"benford_deviation": event})
+
+        if self.state_path:
+            self.snapshot(self.state_path)
+
+        return {"events": events, "reviews": reviews, **self.get_status()}
+
+    def update(self, message: SWIFTMessage) -> List[Dict[str, Any]]:
+        """
+        Add one message to every histogram it belongs to and return new events
+        """
+        try:
+            digit = message.get_first_digit()
+            amount = float(message.amount)
+        except ValueError:
+            return []
+        if digit == 0:
+            return []
+
+        events = []
+        for tracked in self._keys_for(message):
+            event = self._update_key(tracked, digit, amount)
+            if event:
+                event["message_id"] = message.message_id
+                events.append(event)
+
+        return events
+
+    def update_many(self, messages: List[SWIFTMessage]) -> List[Dict[str, Any]]:
+        """Feed messages in arrival order and collect the events raised"""
+        return [event for message in messages for event in self.update(message)]
+
+    def review_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ask the LLM to interpret each newly deviating key
+        """
+        if not self.llm_service:
+            return []
+
+        reviews = []
+        for event in events:
+            amounts = list(self.recent_amounts.get((event["scope"], event["key"]), []))
+            analysis = self.llm_service.analyze_benford_deviation(
+                amounts, event["chi_square"], event["p_value"]
+            )
+            reviews.append({**event, "analysis": analysis})
+
+        return reviews
+
+    def snapshot(self, path: str):
+        """Write all histograms and crossing state to a JSON file"""
+        state = {
+            "mode": self.mode,
+            "keys": [
+                {
+                    "scope": scope,
+                    "key": key,
+                    "counts": self.counts[(scope, key)].tolist(),
+                    "seen": self.seen[(scope, key)],
+                    "deviating": self.deviating[(scope, key)],
+                    "recent_amounts": list(self.recent_amounts[(scope, key)])
+                }
+                for scope, key in self.counts
+            ]
+        }
+
+        with open(path, "w") as f:
+            json.dump(state, f)
+
+    def restore(self, path: str):
+        """Replace the current state with a snapshot written by snapshot()"""
+        with open(path) as f:
+            state = json.load(f)
+
+        self.mode = state["mode"]
+        self.counts.clear()
+        self.seen.clear()
+        self.deviating.clear()
+        self.recent_amounts.clear()
+
+        for entry in state["keys"]:
+            tracked = (entry["scope"], entry["key"])
+            self.counts[tracked] = np.array(entry["counts"], dtype=float)
+            self.seen[tracked] = entry["seen"]
+            self.deviating[tracked] = entry["deviating"]
+            self.recent_amounts[tracked] = deque(entry["recent_amounts"], maxlen=self.config.BENFORD_WINDOW_SIZE)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Keys currently tracked and those in a deviating state"""
+        return {
+            "tracked": len(self.counts),
+            "deviating": sorted(f"{scope}:{key}" for (scope, key), flag in self.deviating.items() if flag)
+        }
+
+    def _keys_for(self, message: SWIFTMessage) -> List[Tuple[str, str]]:
+        """Histograms a message contributes to"""
+        keys = [("sender_bic", message.sender_bic)]
+
+        if self.bank_registry:
+            for bic in {message.sender_bic, message.receiver_bic}:
+                bank = self.bank_registry.get_bank_by_bic(bic)
+                if bank:
+                    keys.append(("bank", bank.bic_code))
+
+        return keys
+
+    def _update_key(self, tracked: Tuple[str, str], digit: int, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Constant-time histogram update followed by a crossing check
+        """
+        counts = self.counts.get(tracked)
+        if counts is None:
+            counts = self.counts[tracked] = np.zeros(len(FIRST_DIGITS))
+            self.seen[tracked] = 0
+            self.deviating[tracked] = False
+            self.recent_amounts[tracked] = deque(maxlen=self.config.BENFORD_WINDOW_SIZE)
+
+        if self.mode == "decay":
+            counts *= self.config.BENFORD_DECAY
+        counts[digit - 1] += 1
+        self.seen[tracked] += 1
+        self.recent_amounts[tracked].append(amount)
+
+        # Tumbling windows are only tested, then cleared, once they are full
+        if self.mode == "tumbling" and self.seen[tracked] % self.config.BENFORD_WINDOW_SIZE:
+            return None
+
+        result = self.analyzer.test_counts(counts)
+        if self.mode == "tumbling":
+            counts[:] = 0
+
+        if self.deviating[tracked]:
+            if result["p_value"] >= self.config.BENFORD_RECOVERY_THRESHOLD:
+                self.deviating[tracked] = False
+            return None
+
+        if not result["deviates"]:
+            return None
+
+        self.deviating[tracked] = True
+        self.logger.info(f"Benford deviation for {tracked[0]} {tracked[1]}: p={result['p_value']}")
+        return {"scope": tracked[0], "key": tracked[1], **result}
@@ -0,0 +1,84 @@
+"""
+Destinations for streamed LLM output
+"""
+
+import queue
+import sys
+from abc import ABC, abstractmethod
+from typing import Optional, TextIO
+
+
+class StreamSink(ABC):
+    """
+    Receives the chunks of a streamed response as they arrive.
+
+    write is called once per chunk and end once per response, so a sink can
+    be shared by several responses; close releases the sink itself.
+    Subclasses must implement write.
+    """
+
+    @abstractmethod
+    def write(self, chunk: str):
+        """Receive one chunk of a response"""
+
+    def end(self):
+        """A response has finished"""
+
+    def close(self):
+        """No more responses will be written"""
+
+
+class ConsoleSink(StreamSink):
+    """Prints chunks as they arrive"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stdout
+
+    def write(self, chunk: str):
+        self.stream.write(chunk)
+        self.stream.flush()
+
+    def end(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    """Appends chunks to a file, so long reports never sit in memory whole"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, chunk: str):
+        self.file.write(chunk)
+
+    def end(self):
+        self.file.write("\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class QueueSink(StreamSink):
+    """
+    Puts chunks on a queue for a consumer thread.
+
+    The end of each response is marked with END_OF_RESPONSE and closing the
+    sink with None.
+    """
+
+    END_OF_RESPONSE = ""
+
+    def __init__(self, chunks: Optional[queue.Queue] = None):
+        self.queue = chunks if chunks is not None else queue.Queue()
+
+    def write(self, chunk: str):
+        self.queue.put(chunk)
+
+    def end(self):
+        self.queue.put(self.END_OF_RESPONSE)
+
+    def close(self):
+        self.queue.put(None)
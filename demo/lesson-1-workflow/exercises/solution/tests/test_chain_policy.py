@@ -0,0 +1,145 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from agents.prompt_chaining import PromptChainingAgent
+from config import Config
+from models.swift_message import SWIFTMessage
+from services.chain_policy import ChainExitPolicy, ExitRule
+
+
+def make_message(amount="2500.00"):
+    return SWIFTMessage(
+        message_type="MT103",
+        reference="INV2024001",
+        amount=amount,
+        currency="USD",
+        sender_bic="DEUTDEFF",
+        receiver_bic="CHASUS33",
+        value_date="240115"
+    )
+
+
+GREEN = {"triage_decision": "GREEN", "requires_deep_analysis": False, "confidence": 0.95}
+BLOCK = {"risk_recommendation": "BLOCK", "confidence_level": 0.95}
+
+
+@pytest.fixture(autouse=True)
+def early_exit_enabled(monkeypatch):
+    monkeypatch.setattr(Config, "PROMPT_CHAIN_EARLY_EXIT", True)
+
+
+@pytest.fixture
+def policy():
+    return ChainExitPolicy()
+
+
+def test_default_rules_are_loaded_in_order(policy):
+    assert [rule.name for rule in policy.rules] == ["clear_green_low_value", "confident_block"]
+
+
+def test_clear_green_low_value_matches(policy):
+    rule = policy.check("screener", make_message(), GREEN)
+
+    assert rule.name == "clear_green_low_value"
+    assert rule.chain_analysis(GREEN)["final_decision"] == "APPROVE"
+    assert rule.chain_analysis(GREEN)["confidence_score"] == 0.95
+
+
+@pytest.mark.parametrize("output, amount", [
+    ({**GREEN, "triage_decision": "YELLOW"}, "2500.00"),
+    ({**GREEN, "requires_deep_analysis": True}, "2500.00"),
+    ({**GREEN, "requires_deep_analysis": None}, "2500.00"),
+    ({**GREEN, "confidence": 0.79}, "2500.00"),
+    ({**GREEN, "confidence": None}, "2500.00"),
+    (GREEN, "10000.01"),
+    (GREEN, "not a number"),
+])
+def test_clear_green_low_value_non_matches(policy, output, amount):
+    assert policy.check("screener", make_message(amount), output) is None
+
+
+def test_clear_green_low_value_boundaries(policy):
+    assert policy.check("screener", make_message("10000.00"), {**GREEN, "confidence": 0.8}) is not None
+
+
+def test_confident_block_matches(policy):
+    rule = policy.check("risk_assessor", make_message("250000.00"), BLOCK)
+
+    assert rule.name == "confident_block"
+    analysis = rule.chain_analysis(BLOCK)
+    assert analysis["final_decision"] == "HOLD"
+    assert analysis["risk_level"] == "HIGH"
+    assert analysis["recommended_actions"] == ["Manual compliance review"]
+
+
+@pytest.mark.parametrize("output", [
+    {**BLOCK, "risk_recommendation": "INVESTIGATE"},
+    {**BLOCK, "confidence_level": 0.89},
+    {"risk_recommendation": "BLOCK", "confidence": 0.99},
+])
+def test_confident_block_non_matches(policy, output):
+    assert policy.check("risk_assessor", make_message(), output) is None
+
+
+def test_rules_only_apply_after_their_step(policy):
+    assert policy.check("risk_assessor", make_message(), GREEN) is None
+    assert policy.check("screener", make_message(), BLOCK) is None
+
+
+def test_disabled_early_exit_never_matches(policy, monkeypatch):
+    monkeypatch.setattr(Config, "PROMPT_CHAIN_EARLY_EXIT", False)
+
+    assert policy.check("screener", make_message(), GREEN) is None
+    assert policy.get_stats()["clear_green_low_value"]["checked"] == 0
+
+
+def test_list_values_match_any_of_them():
+    rule = ExitRule("any_green_or_yellow", "screener", "APPROVE", when={"triage_decision": ["GREEN", "YELLOW"]})
+
+    assert rule.matches(make_message(), {"triage_decision": "YELLOW"})
+    assert not rule.matches(make_message(), {"triage_decision": "RED"})
+
+
+def test_stats_count_checks_and_exits(policy):
+    policy.check("screener", make_message(), GREEN)
+    policy.check("screener", make_message(), {**GREEN, "triage_decision": "RED"})
+
+    stats = policy.get_stats()["clear_green_low_value"]
+    assert (stats["checked"], stats["exits"], stats["exit_rate"]) == (2, 1, 0.5)
+
+
+class StepClient:
+    """Chat client answering every chain step with the same JSON"""
+
+    base_url = "http://fake-chain/"
+
+    def __init__(self, content):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.content = json.dumps(content)
+
+    def create(self, **params):
+        self.calls += 1
+        return ChatCompletion.model_validate({
+            "id": "chain", "object": "chat.completion", "created": 0, "model": params["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.content}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        })
+
+
+@pytest.mark.parametrize("mode", ["sequential", "parallel"])
+def test_chain_stops_after_the_screener_when_a_rule_matches(monkeypatch, mode):
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "LLM_CASCADE_ENABLED", False)
+    client = StepClient(GREEN)
+
+    message = PromptChainingAgent(client=client).analyze_transaction_chain(make_message(), mode=mode)
+
+    assert message.processing_status != "ERROR", message.validation_errors
+    assert client.calls == 1
+    assert message.chain_metadata["early_exit"] == {"rule": "clear_green_low_value", "after": "screener"}
+    assert message.fraud_status == "CLEAN"
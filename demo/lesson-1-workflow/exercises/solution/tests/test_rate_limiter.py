@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from services import rate_limiter
+from services.rate_limiter import RateLimiter, TokenBucket
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def completion(prompt_tokens, completion_tokens):
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            total_tokens=prompt_tokens + completion_tokens)
+    return SimpleNamespace(usage=usage)
+
+
+def fail(error):
+    def send():
+        raise error
+    return send
+
+
+@pytest.fixture(autouse=True)
+def limiter_settings(monkeypatch, fake_time):
+    monkeypatch.setattr(rate_limiter, "time", fake_time)
+    monkeypatch.setattr(Config, "LLM_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(Config, "LLM_DEFAULT_COMPLETION_TOKENS", 100)
+    monkeypatch.setattr(Config, "LLM_COMPLETION_ESTIMATE_WEIGHT", 0.5)
+    monkeypatch.setattr(Config, "LLM_CONCURRENCY_INITIAL", 8)
+    monkeypatch.setattr(Config, "LLM_CONCURRENCY_MIN", 1)
+    monkeypatch.setattr(Config, "LLM_CONCURRENCY_MAX", 64)
+    monkeypatch.setattr(Config, "LLM_CONCURRENCY_COOLDOWN", 5.0)
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+
+PARAMS = {"messages": [{"role": "user", "content": "x" * 400}]}
+
+
+def test_estimate_counts_the_prompt_and_the_completion_estimate(limiter):
+    assert limiter.estimate_tokens(PARAMS) == 100 + 100
+    assert limiter.estimate_tokens({**PARAMS, "max_tokens": 20}) == 100 + 20
+
+
+def test_success_settles_the_estimate_against_reported_usage(limiter):
+    limiter.call(PARAMS, lambda: completion(100, 40))
+
+    assert limiter.tokens.tokens == pytest.approx(6000 - 140)
+    assert limiter.in_flight == 0
+
+
+def test_completions_move_the_running_estimate(limiter):
+    limiter.call(PARAMS, lambda: completion(100, 300))
+
+    assert limiter.completion_estimate == pytest.approx(100 + 0.5 * (300 - 100))
+
+
+def test_failed_request_refunds_its_reservation(limiter):
+    with pytest.raises(StatusError):
+        limiter.call(PARAMS, fail(StatusError(400)))
+
+    assert limiter.tokens.tokens == pytest.approx(6000)
+    assert limiter.in_flight == 0
+    assert limiter.completion_estimate == 100
+
+
+def test_success_adds_one_slot_per_window(limiter):
+    limiter.call(PARAMS, lambda: completion(100, 100))
+
+    assert limiter.concurrency_limit == pytest.approx(8 + 1 / 8)
+
+
+@pytest.mark.parametrize("error", [StatusError(429), StatusError(503), TimeoutError()])
+def test_overload_halves_the_concurrency_limit(limiter, error):
+    with pytest.raises(type(error)):
+        limiter.call(PARAMS, fail(error))
+
+    assert limiter.concurrency_limit == pytest.approx(4)
+    assert limiter.get_stats()["overloaded"] == 1
+
+
+def test_client_errors_leave_the_concurrency_limit_alone(limiter):
+    with pytest.raises(StatusError):
+        limiter.call(PARAMS, fail(StatusError(400)))
+
+    assert limiter.concurrency_limit == pytest.approx(8)
+
+
+def test_overload_decreases_at_most_once_per_cooldown(limiter, fake_time):
+    for _ in range(3):
+        with pytest.raises(StatusError):
+            limiter.call(PARAMS, fail(StatusError(429)))
+    assert limiter.concurrency_limit == pytest.approx(4)
+
+    fake_time.advance(Config.LLM_CONCURRENCY_COOLDOWN)
+    with pytest.raises(StatusError):
+        limiter.call(PARAMS, fail(StatusError(429)))
+    assert limiter.concurrency_limit == pytest.approx(2)
+
+
+def test_concurrency_limit_never_drops_below_the_minimum(limiter, fake_time):
+    for _ in range(10):
+        with pytest.raises(StatusError):
+            limiter.call(PARAMS, fail(StatusError(429)))
+        fake_time.advance(Config.LLM_CONCURRENCY_COOLDOWN)
+
+    assert limiter.concurrency_limit == Config.LLM_CONCURRENCY_MIN
+
+
+def test_empty_bucket_reports_the_wait_until_refill(limiter):
+    limiter.tokens.tokens = 0
+
+    # 6000 tokens per minute refill at 100 per second
+    assert limiter._try_acquire(200) == pytest.approx(2.0)
+    assert limiter.in_flight == 0
+
+
+def test_full_concurrency_waits_for_a_release(limiter):
+    limiter.in_flight = int(limiter.concurrency_limit)
+
+    assert limiter._try_acquire(1) == Config.LLM_RATE_LIMIT_POLL_INTERVAL
+
+
+def test_bucket_refills_up_to_its_capacity():
+    bucket = TokenBucket(60)
+    bucket.tokens = 0
+
+    bucket.refill(bucket.updated_at + 30)
+    assert bucket.tokens == pytest.approx(30)
+
+    bucket.refill(bucket.updated_at + 600)
+    assert bucket.tokens == pytest.approx(60)
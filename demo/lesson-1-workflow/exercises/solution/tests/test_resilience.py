@@ -0,0 +1,215 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from config import Config
+from services import resilience
+from services.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+
+class StatusError(Exception):
+    """An API error carrying an HTTP status and optional headers"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch, fake_time):
+    monkeypatch.setattr(resilience, "time", fake_time)
+    monkeypatch.setattr(Config, "LLM_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(Config, "LLM_BREAKER_RESET_TIMEOUT", 30.0)
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_DELAY", 0.5)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_DELAY", 8.0)
+
+
+def open_breaker(breaker):
+    for _ in range(Config.LLM_BREAKER_FAILURE_THRESHOLD):
+        breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test")
+
+    for _ in range(Config.LLM_BREAKER_FAILURE_THRESHOLD - 1):
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()["opened"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test")
+
+    for _ in range(Config.LLM_BREAKER_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["consecutive_failures"] == 1
+
+
+def test_open_breaker_rejects_until_the_reset_timeout(fake_time):
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT - 0.1)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_half_open_lets_a_single_probe_through(fake_time):
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT)
+
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_successful_probe_closes_the_breaker(fake_time):
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT)
+
+    breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["consecutive_failures"] == 0
+    breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker_for_another_timeout(fake_time):
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT)
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT - 0.1)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    fake_time.advance(0.1)
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_released_probe_frees_the_half_open_slot(fake_time):
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+    fake_time.advance(Config.LLM_BREAKER_RESET_TIMEOUT)
+
+    breaker.allow()
+    breaker.release_probe()
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+@pytest.mark.parametrize("error, transient", [
+    (openai.APIConnectionError(request=None), True),
+    (TimeoutError(), True),
+    (StatusError(408), True),
+    (StatusError(409), True),
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (StatusError(503), True),
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (StatusError(404), False),
+    (ValueError("bad response"), False),
+])
+def test_transient_errors(error, transient):
+    assert ResilientCaller.is_transient(error) is transient
+
+
+def test_transient_errors_are_retried_then_count_once_against_the_breaker(fake_time):
+    breaker = CircuitBreaker("test")
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise StatusError(503)
+
+    with pytest.raises(StatusError):
+        ResilientCaller().call(breaker, send)
+
+    assert len(calls) == Config.LLM_MAX_RETRIES + 1
+    assert len(fake_time.sleeps) == Config.LLM_MAX_RETRIES
+    assert breaker.get_stats()["failures"] == 1
+
+
+def test_retry_that_succeeds_records_a_success(fake_time):
+    breaker = CircuitBreaker("test")
+    responses = iter([StatusError(429), "ok"])
+
+    def send():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert ResilientCaller().call(breaker, send) == "ok"
+    assert breaker.get_stats()["successes"] == 1
+    assert breaker.get_stats()["failures"] == 0
+
+
+def test_non_transient_errors_are_not_retried_or_counted(fake_time):
+    breaker = CircuitBreaker("test")
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        ResilientCaller().call(breaker, send)
+
+    assert len(calls) == 1
+    assert fake_time.sleeps == []
+    assert breaker.get_stats()["failures"] == 0
+
+
+def test_open_breaker_fails_fast_without_calling():
+    breaker = CircuitBreaker("test")
+    open_breaker(breaker)
+
+    with pytest.raises(CircuitOpenError):
+        ResilientCaller().call(breaker, lambda: pytest.fail("send called while open"))
+
+
+def test_backoff_stays_within_decorrelated_jitter_bounds():
+    caller = ResilientCaller()
+    previous = Config.LLM_RETRY_BASE_DELAY
+
+    for _ in range(200):
+        delay = caller._next_delay(previous, StatusError(503))
+        assert Config.LLM_RETRY_BASE_DELAY <= delay <= min(Config.LLM_RETRY_MAX_DELAY, previous * 3)
+        previous = delay
+
+
+def test_backoff_is_never_shorter_than_retry_after():
+    caller = ResilientCaller()
+
+    delay = caller._next_delay(Config.LLM_RETRY_BASE_DELAY, StatusError(429, {"retry-after": "12"}))
+    assert delay == 12.0
+
+    delay = caller._next_delay(Config.LLM_RETRY_BASE_DELAY, StatusError(429, {"retry-after": "soon"}))
+    assert Config.LLM_RETRY_BASE_DELAY <= delay <= Config.LLM_RETRY_BASE_DELAY * 3
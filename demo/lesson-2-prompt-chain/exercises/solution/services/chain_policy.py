@@ -0,0 +1,108 @@
+"""
+Early-exit rules for multi-step LLM chains
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from services.config import Config
+from services.swift_message import SWIFTMessage
+
+
+class ExitRule:
+    """
+    A declarative condition that ends a chain after one of its steps.
+
+    The rule matches when every field in when equals the step's output (a
+    list matches any of its values), the output's confidence field reaches
+    min_confidence and the message amount is at most max_amount. A matching
+    rule supplies the decision the skipped steps would have produced.
+    """
+
+    def __init__(self, name: str, after: str, decision: str, when: Optional[Dict[str, Any]] = None,
+                 risk_level: str = "LOW", max_amount: Optional[float] = None,
+                 min_confidence: Optional[float] = None, confidence_field: str = "confidence",
+                 recommended_actions: Optional[List[str]] = None):
+        self.name = name
+        self.after = after
+        self.decision = decision
+        self.when = when or {}
+        self.risk_level = risk_level
+        self.max_amount = max_amount
+        self.min_confidence = min_confidence
+        self.confidence_field = confidence_field
+        self.recommended_actions = recommended_actions or []
+
+    def matches(self, message: SWIFTMessage, output: Dict[str, Any]) -> bool:
+        for field, expected in self.when.items():
+            allowed = expected if isinstance(expected, list) else [expected]
+            if output.get(field) not in allowed:
+                return False
+
+        if self.min_confidence is not None:
+            confidence = output.get(self.confidence_field)
+            if not isinstance(confidence, (int, float)) or confidence < self.min_confidence:
+                return False
+
+        if self.max_amount is not None:
+            try:
+                if float(message.amount) > self.max_amount:
+                    return False
+            except (TypeError, ValueError):
+                return False
+
+        return True
+
+    def chain_analysis(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        """The chain_analysis reported in place of the final reviewer's"""
+        confidence = output.get(self.confidence_field)
+        return {
+            "final_decision": self.decision,
+            "confidence_score": confidence if isinstance(confidence, (int, float)) else 0.5,
+            "risk_level": self.risk_level,
+            "consensus_reasoning": f"Early exit after {self.after} by rule {self.name}",
+            "recommended_actions": list(self.recommended_actions)
+        }
+
+
+class ChainExitPolicy:
+    """
+    Ordered early-exit rules checked as a chain's steps complete.
+
+    Rules come from Config.PROMPT_CHAIN_EXIT_RULES unless given; after each
+    step the rules attached to it are tried in order and the first match
+    ends the chain. Counts of checks and exits are kept per rule.
+    """
+
+    def __init__(self, rules: Optional[List[ExitRule]] = None):
+        self.config = Config()
+        if rules is None:
+            rules = [ExitRule(**rule) for rule in self.config.PROMPT_CHAIN_EXIT_RULES]
+        self.rules = rules
+        self.stats: Dict[str, Dict[str, int]] = {rule.name: {"checked": 0, "exits": 0} for rule in rules}
+        self._lock = threading.Lock()
+
+    def check(self, step: str, message: SWIFTMessage, output: Dict[str, Any]) -> Optional[ExitRule]:
+        """The first rule attached to step that matches its output, if any"""
+        if not self.config.PROMPT_CHAIN_EARLY_EXIT:
+            return None
+
+        for rule in self.rules:
+            if rule.after != step:
+                continue
+            matched = rule.matches(message, output)
+            with self._lock:
+                self.stats[rule.name]["checked"] += 1
+                self.stats[rule.name]["exits"] += matched
+            if matched:
+                return rule
+        return None
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Checks and exits, and the exit rate, per rule"""
+        with self._lock:
+            stats = {name: dict(counts) for name, counts in self.stats.items()}
+
+        for counts in stats.values():
+            counts["exit_rate"] = counts["exits"] / counts["checked"] if counts["checked"] else 0.0
+        return stats
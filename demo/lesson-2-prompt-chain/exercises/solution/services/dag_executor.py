@@ -0,0 +1,131 @@
+"""
+Dependency-graph execution of multi-step LLM pipelines
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.config import Config
+
+
+class DAGExecutor:
+    """
+    Runs the steps of a dependency graph.
+
+    A graph maps each step to the steps whose results it needs. In parallel
+    mode every step is submitted as soon as its dependencies are done, so
+    independent steps overlap; in sequential mode the steps run one after
+    another in dependency order on the calling thread. Each step is called
+    as run_step(step, results) with the results completed so far. An
+    optional stop(step, results) is asked after every completed step; once
+    it returns True no further steps start, so the remaining ones are
+    skipped.
+    """
+
+    _shared: Optional["DAGExecutor"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.config = Config()
+        self.max_workers = max_workers or self.config.PROMPT_CHAIN_MAX_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_shared(cls) -> "DAGExecutor":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dag-step")
+            return self._executor
+
+    def run(self, graph: Dict[str, List[str]], run_step: Callable[[str, Dict[str, Any]], Any],
+            parallel: bool = True, stop: Optional[Callable[[str, Dict[str, Any]], bool]] = None
+            ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+        """
+        Results and timings per step. Timings hold each step's start
+        (seconds after the run began) and latency; steps skipped by stop
+        have neither.
+        """
+        order = self.order(graph)
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+
+        def timed(step: str, available: Dict[str, Any]) -> Any:
+            step_started = time.perf_counter()
+            try:
+                return run_step(step, available)
+            finally:
+                timings[step] = {
+                    "start": step_started - started,
+                    "latency": time.perf_counter() - step_started
+                }
+
+        if not parallel:
+            for step in order:
+                results[step] = timed(step, dict(results))
+                if stop is not None and stop(step, dict(results)):
+                    break
+            return results, timings
+
+        pending = list(order)
+        running: Dict[Future, str] = {}
+        stopped = False
+
+        while pending or running:
+            for step in [step for step in pending if all(dep in results for dep in graph[step])]:
+                pending.remove(step)
+                running[self.executor.submit(timed, step, dict(results))] = step
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            error: Optional[BaseException] = None
+            for future in done:
+                step = running.pop(future)
+                try:
+                    results[step] = future.result()
+                except BaseException as e:
+                    error = error or e
+                    continue
+                if not stopped and stop is not None and stop(step, dict(results)):
+                    # Steps already in flight still finish; nothing new starts
+                    stopped = True
+                    pending.clear()
+
+            if error is not None:
+                # Let the steps already in flight finish (or queue their deferred request) first
+                wait(running)
+                raise error
+
+        return results, timings
+
+    @staticmethod
+    def order(graph: Dict[str, List[str]]) -> List[str]:
+        """Steps in dependency order, keeping the graph's order among independent steps"""
+        for step, deps in graph.items():
+            unknown = [dep for dep in deps if dep not in graph]
+            if unknown:
+                raise ValueError(f"Step {step} depends on unknown steps {unknown}")
+
+        order: List[str] = []
+        while len(order) < len(graph):
+            ready = [step for step, deps in graph.items()
+                     if step not in order and all(dep in order for dep in deps)]
+            if not ready:
+                raise ValueError(f"Dependency cycle among {[step for step in graph if step not in order]}")
+            order.extend(ready)
+        return order
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
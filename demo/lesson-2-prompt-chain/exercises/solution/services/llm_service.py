@@ -2,8 +2,10 @@
 LLM service for fraud analysis and SWIFT message correction using OpenAI
 """
 
+from typing import Optional
 
 from openai import OpenAI
+from services.llm_client import LLMClientRegistry
 from services.config import Config
 
 
@@ -12,13 +14,13 @@ class LLMService:
     Service for LLM-based fraud analysis and SWIFT message correction
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[OpenAI] = None):
         self.config = Config()
         
-        # Initialize OpenAI client
+        # Use the injected client, or the shared pooled one
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        self.client = client or LLMClientRegistry.get_client()
         self.model = self.config.OPENAI_MODEL
         
     
@@ -0,0 +1,94 @@
+"""
+Small-model-first execution of structured LLM steps
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from services.config import Config
+from services.resilience import CircuitOpenError
+from services.response_parser import ResponseParseError, ResponseParser, ResponseSchema
+
+
+class ModelCascade:
+    """
+    Runs configured steps on a small model first.
+
+    A step listed in Config.LLM_CASCADE_STEPS is sent to
+    LLM_CASCADE_SMALL_MODEL; its answer is kept when it validates against
+    the step's schema and its confidence field reaches
+    LLM_CASCADE_CONFIDENCE_THRESHOLD. Otherwise (invalid JSON, failed
+    validation, missing or low confidence, or the small model's circuit
+    breaker open) the step is sent again to the primary model. Every other
+    step goes straight to the primary model.
+    """
+
+    _shared: Optional["ModelCascade"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.config = Config()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def get_shared(cls) -> "ModelCascade":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def run(self, step: str, schema: ResponseSchema, send: Callable[[str], Optional[str]],
+            primary_model: Optional[str] = None) -> Dict[str, Any]:
+        """
+        The parsed response of a step. send(model) issues the request on
+        the given model and returns the response text.
+        """
+        primary_model = primary_model or self.config.OPENAI_MODEL
+        confidence_field = self.config.LLM_CASCADE_STEPS.get(step)
+
+        if not self.config.LLM_CASCADE_ENABLED or confidence_field is None:
+            return ResponseParser.parse_response(schema, send(primary_model))
+
+        try:
+            result = ResponseParser.parse_response(schema, send(self.config.LLM_CASCADE_SMALL_MODEL))
+        except ResponseParseError:
+            self._count(step, "escalated_invalid")
+            return ResponseParser.parse_response(schema, send(primary_model))
+        except CircuitOpenError:
+            self._count(step, "escalated_unavailable")
+            return ResponseParser.parse_response(schema, send(primary_model))
+
+        confidence = result.get(confidence_field)
+        if not isinstance(confidence, (int, float)) or confidence < self.config.LLM_CASCADE_CONFIDENCE_THRESHOLD:
+            self._count(step, "escalated_low_confidence")
+            return ResponseParser.parse_response(schema, send(primary_model))
+
+        self._count(step, "accepted")
+        return result
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Small-model answers kept and escalated, and the escalation rate, per step"""
+        with self._lock:
+            stats = {step: dict(counts) for step, counts in self.stats.items()}
+
+        for counts in stats.values():
+            escalated = (counts["escalated_invalid"] + counts["escalated_low_confidence"]
+                         + counts["escalated_unavailable"])
+            total = counts["accepted"] + escalated
+            counts["escalation_rate"] = escalated / total if total else 0.0
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def _count(self, step: str, outcome: str):
+        with self._lock:
+            counts = self.stats.setdefault(step, {
+                "accepted": 0,
+                "escalated_invalid": 0,
+                "escalated_low_confidence": 0,
+                "escalated_unavailable": 0
+            })
+            counts[outcome] += 1
@@ -6,14 +6,339 @@ with different specializations collaborate through conversation to analyze
 SWIFT transactions, creating a more thorough and contextual fraud analysis.
 """
 
-import json
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Literal, Optional
 
 from openai import OpenAI
+from services.chain_policy import ChainExitPolicy
+from services.dag_executor import DAGExecutor
+from services.deferred_batch import DeferredBatch
+from services.llm_client import LLMClientRegistry, create_chat_completion
+from services.model_cascade import ModelCascade
+from services.prompt_templates import PromptRegistry, PromptTemplate
+from services.resilience import CircuitOpenError
+from services.response_parser import LLMResponse, ResponseSchema
 from services.swift_message import SWIFTMessage
 from services.config import Config
 
 
+Priority = Literal["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+
+class ScreenerResponse(LLMResponse):
+    triage_decision: Literal["GREEN", "YELLOW", "RED"]
+    immediate_concerns: List[str] = []
+    requires_deep_analysis: Optional[bool] = None
+    escalation_priority: Optional[Priority] = None
+    focus_areas: List[str] = []
+    confidence: Optional[float] = None
+
+
+class TechnicalValidation(LLMResponse):
+    format_compliance: Optional[Literal["VALID", "MINOR_ISSUES", "MAJOR_ISSUES", "INVALID"]] = None
+
+
+class TechnicalAnalystResponse(LLMResponse):
+    technical_validation: Optional[TechnicalValidation] = None
+    technical_concerns: List[str] = []
+    agrees_with_screener: Optional[bool] = None
+
+
+class RiskAssessment(LLMResponse):
+    behavioral_score: Optional[float] = None
+    contextual_factors: List[str] = []
+
+
+class RiskAssessorResponse(LLMResponse):
+    risk_assessment: Optional[RiskAssessment] = None
+    risk_recommendation: Literal["APPROVE", "INVESTIGATE", "BLOCK"]
+    confidence_level: Optional[float] = None
+
+
+class ComplianceOfficerResponse(LLMResponse):
+    compliance_status: Literal["COMPLIANT", "QUESTIONABLE", "NON_COMPLIANT", "REQUIRES_INVESTIGATION"]
+    regulatory_concerns: List[str] = []
+    policy_violations: List[str] = []
+    legal_risk: Optional[Priority] = None
+
+
+class FinalReviewerResponse(LLMResponse):
+    final_decision: Literal["APPROVE", "HOLD", "REJECT"]
+    confidence_score: Optional[float] = None
+    risk_level: Optional[Priority] = None
+    recommended_actions: List[str] = []
+
+
+SCREENER = ResponseSchema("screener", ScreenerResponse)
+TECHNICAL_ANALYST = ResponseSchema("technical_analyst", TechnicalAnalystResponse)
+RISK_ASSESSOR = ResponseSchema("risk_assessor", RiskAssessorResponse)
+COMPLIANCE_OFFICER = ResponseSchema("compliance_officer", ComplianceOfficerResponse)
+FINAL_REVIEWER = ResponseSchema("final_reviewer", FinalReviewerResponse)
+
+
+PromptRegistry.register(PromptTemplate(
+    name="chain.initial_screener",
+    system="""
+        You are an Initial Transaction Screener with 15+ years experience in SWIFT fraud detection.
+        Your role is to quickly triage transactions and flag obvious red flags. You work fast but thoroughly.
+        Focus on immediate risk indicators and provide clear direction for deeper analysis.
+    """,
+    instructions="""
+        INITIAL SCREENING ASSESSMENT
+
+        Perform initial triage assessment of the transaction below. Respond with JSON:
+        {
+            "triage_decision": "GREEN|YELLOW|RED",
+            "immediate_concerns": ["list of immediate red flags"],
+            "requires_deep_analysis": true/false,
+            "escalation_priority": "LOW|MEDIUM|HIGH|CRITICAL",
+            "initial_reasoning": "Quick assessment reasoning",
+            "focus_areas": ["areas that need deeper analysis"],
+            "time_sensitivity": "How urgent is this review?",
+            "confidence": 0.0-1.0
+        }
+    """,
+    dynamic="""
+        Transaction: {message.message_id}
+        Type: {message.message_type}
+        Amount: {message.amount} {message.currency}
+        Route: {message.sender_bic} → {message.receiver_bic}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="chain.technical_analyst",
+    system="""
+        You are a Technical SWIFT Analyst specializing in message format validation and technical compliance.
+        You examine SWIFT messages for technical irregularities, format violations, and technical fraud indicators.
+        You build upon the initial screener's assessment with detailed technical analysis.
+    """,
+    instructions="""
+        TECHNICAL ANALYSIS REQUEST
+
+        Perform detailed technical analysis of the transaction below, building on the initial screener's assessment. Respond with JSON:
+        {
+            "technical_validation": {
+                "format_compliance": "VALID|MINOR_ISSUES|MAJOR_ISSUES|INVALID",
+                "bic_validation": "Analysis of BIC codes",
+                "amount_analysis": "Analysis of amount patterns",
+                "reference_check": "Reference number validation"
+            },
+            "technical_concerns": ["specific technical red flags"],
+            "data_integrity": "Assessment of data consistency",
+            "agrees_with_screener": true/false,
+            "technical_reasoning": "Detailed technical analysis",
+            "recommend_next_step": "What should the risk assessor focus on?"
+        }
+    """,
+    dynamic="""
+        TRANSACTION DETAILS:
+        Message ID: {message.message_id}
+        Type: {message.message_type}
+        Reference: {message.reference}
+        Amount: {message.amount} {message.currency}
+        Sender BIC: {message.sender_bic}
+        Receiver BIC: {message.receiver_bic}
+        Value Date: {message.value_date}
+
+        INITIAL SCREENER ASSESSMENT:
+        Triage: {triage}
+        Priority: {priority}
+        Focus Areas: {focus_areas}
+        Initial Concerns: {concerns}
+    """
+))
+
+RISK_ASSESSOR_OUTPUT = """
+        Respond with JSON:
+        {
+            "risk_assessment": {
+                "behavioral_score": 0.0-1.0,
+                "pattern_analysis": "Analysis of suspicious patterns",
+                "contextual_factors": ["relevant risk factors"],
+                "historical_comparison": "How this compares to known patterns"
+            },
+            "agent_consensus": "Do you agree with previous agents' assessments?",
+            "risk_recommendation": "APPROVE|INVESTIGATE|BLOCK",
+            "confidence_level": 0.0-1.0,
+            "risk_reasoning": "Detailed risk assessment reasoning",
+            "escalation_advice": "What should compliance focus on?"
+        }
+"""
+
+PromptRegistry.register(PromptTemplate(
+    name="chain.risk_assessor",
+    system="""
+        You are a Risk Assessment Specialist focused on behavioral patterns and risk profiling.
+        You analyze transaction patterns, risk behaviors, and contextual factors that indicate potential fraud.
+        You consider both the initial screening and technical analysis in your assessment.
+    """,
+    instructions="""
+        RISK PATTERN ANALYSIS
+
+        Perform risk behavior analysis of the transaction below, taking the previous analysis chain into account.
+    """ + RISK_ASSESSOR_OUTPUT,
+    dynamic="""
+        TRANSACTION CONTEXT:
+        Message: {message.message_id} ({message.message_type})
+        Amount: {message.amount} {message.currency}
+        Banks: {message.sender_bic} → {message.receiver_bic}
+
+        PREVIOUS ANALYSIS CHAIN:
+
+        SCREENER SAYS: {triage} priority
+        - Concerns: {concerns}
+        - Focus Areas: {focus_areas}
+
+        TECHNICAL ANALYST SAYS: {format_compliance}
+        - Technical Concerns: {technical_concerns}
+        - Data Integrity: {data_integrity}
+        - Agrees with Screener: {agrees_with_screener}
+    """
+))
+
+# Runs alongside the technical analyst in the parallel chain, so it only sees the screener
+PromptRegistry.register(PromptTemplate(
+    name="chain.risk_assessor_screener_only",
+    system="""
+        You are a Risk Assessment Specialist focused on behavioral patterns and risk profiling.
+        You analyze transaction patterns, risk behaviors, and contextual factors that indicate potential fraud.
+        You build upon the initial screener's assessment; a technical analyst reviews the message format separately.
+    """,
+    instructions="""
+        RISK PATTERN ANALYSIS
+
+        Perform risk behavior analysis of the transaction below, taking the initial screening into account.
+    """ + RISK_ASSESSOR_OUTPUT,
+    dynamic="""
+        TRANSACTION CONTEXT:
+        Message: {message.message_id} ({message.message_type})
+        Amount: {message.amount} {message.currency}
+        Banks: {message.sender_bic} → {message.receiver_bic}
+
+        SCREENER SAYS: {triage} priority
+        - Concerns: {concerns}
+        - Focus Areas: {focus_areas}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="chain.compliance_officer",
+    system="""
+        You are a Compliance Officer specializing in financial regulations and anti-money laundering.
+        You review transactions for regulatory compliance, legal requirements, and policy violations.
+        You consider all previous analysis in making compliance recommendations.
+    """,
+    instructions="""
+        COMPLIANCE REVIEW
+
+        Perform compliance assessment of the transaction below, using the agent consultation summary. Respond with JSON:
+        {
+            "compliance_status": "COMPLIANT|QUESTIONABLE|NON_COMPLIANT|REQUIRES_INVESTIGATION",
+            "regulatory_concerns": ["specific regulatory issues"],
+            "aml_assessment": "Anti-money laundering evaluation",
+            "policy_violations": ["any policy violations detected"],
+            "legal_risk": "LOW|MEDIUM|HIGH|CRITICAL",
+            "required_documentation": ["additional documentation needed"],
+            "compliance_reasoning": "Detailed compliance analysis",
+            "final_recommendation": "What action should be taken?"
+        }
+    """,
+    dynamic="""
+        TRANSACTION: {message.message_id}
+        Amount: {message.amount} {message.currency}
+        Route: {message.sender_bic} → {message.receiver_bic}
+
+        AGENT CONSULTATION SUMMARY:
+
+        SCREENER (Triage): {triage}
+        - Priority: {priority}
+        - Immediate Concerns: {concerns}
+
+        TECHNICAL ANALYST: {format_compliance}
+        - Technical Issues: {technical_concerns}
+        - Recommends: {recommend_next_step}
+
+        RISK ASSESSOR: {risk_recommendation}
+        - Risk Score: {behavioral_score}
+        - Pattern Concerns: {contextual_factors}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="chain.final_reviewer",
+    system="""
+        You are the Final Reviewing Authority for SWIFT transaction analysis.
+        Your role is to synthesize all expert opinions, resolve conflicts, and make the final decision.
+        You must provide clear reasoning and actionable recommendations.
+    """,
+    instructions="""
+        FINAL REVIEW AND DECISION
+
+        SYNTHESIZE THE EXPERT OPINIONS BELOW AND MAKE FINAL DECISION. Respond with JSON:
+        {
+            "final_decision": "APPROVE|HOLD|REJECT",
+            "confidence_score": 0.0-1.0,
+            "risk_level": "LOW|MEDIUM|HIGH|CRITICAL",
+            "consensus_reasoning": "How you weighed all expert opinions",
+            "conflict_resolution": "How you resolved any conflicting opinions",
+            "recommended_actions": ["specific actions to take"],
+            "business_impact": "Potential impact of this decision",
+            "review_timeline": "When this should be reviewed again",
+            "expert_agreement": "Level of agreement among experts",
+            "decision_factors": ["key factors that influenced final decision"]
+        }
+    """,
+    dynamic="""
+        TRANSACTION: {message.message_id}
+        Amount: {message.amount} {message.currency}
+
+        EXPERT TEAM CONSULTATION RESULTS:
+
+        🔍 INITIAL SCREENER:
+        - Decision: {triage}
+        - Priority: {priority}
+        - Concerns: {concerns}
+
+        🔧 TECHNICAL ANALYST:
+        - Validation: {format_compliance}
+        - Issues: {technical_concerns}
+        - Agrees with Screener: {agrees_with_screener}
+
+        📊 RISK ASSESSOR:
+        - Recommendation: {risk_recommendation}
+        - Risk Score: {behavioral_score}
+        - Confidence: {confidence_level}
+
+        ⚖️ COMPLIANCE OFFICER:
+        - Status: {compliance_status}
+        - Legal Risk: {legal_risk}
+        - Final Rec: {final_recommendation}
+    """
+))
+
+
+# Roles each role of the chain waits for, per execution mode
+CHAIN_GRAPHS = {
+    "sequential": {
+        "screener": [],
+        "technical_analyst": ["screener"],
+        "risk_assessor": ["screener", "technical_analyst"],
+        "compliance_officer": ["screener", "technical_analyst", "risk_assessor"],
+        "final_reviewer": ["screener", "technical_analyst", "risk_assessor", "compliance_officer"]
+    },
+    "parallel": {
+        "screener": [],
+        "technical_analyst": ["screener"],
+        "risk_assessor": ["screener"],
+        "compliance_officer": ["screener", "technical_analyst", "risk_assessor"],
+        "final_reviewer": ["screener", "technical_analyst", "risk_assessor", "compliance_officer"]
+    }
+}
+
+
 class PromptChainingAgent:
     """
     Implements prompt chaining pattern for enhanced SWIFT transaction analysis.
@@ -26,59 +351,82 @@ class PromptChainingAgent:
     5. Final Reviewer - Synthesizes all findings
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[OpenAI] = None, exit_policy: Optional[ChainExitPolicy] = None):
         self.config = Config()
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        # Use the injected client, or the shared pooled one
+        self.client = client or LLMClientRegistry.get_client()
         self.model = self.config.OPENAI_MODEL
+        
+        self.exit_policy = exit_policy or ChainExitPolicy()
+        self.stage_limits = {
+            step: threading.BoundedSemaphore(limit) for step, limit in self.config.PROMPT_CHAIN_STAGE_LIMITS.items()
+        }
+        
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
     
-    def analyze_transaction_chain(self, message: SWIFTMessage) -> Dict[str, Any]:
+    def analyze_transaction_chain(self, message: SWIFTMessage, mode: Optional[str] = None,
+                                  executor: Optional[DAGExecutor] = None) -> Dict[str, Any]:
         """
-        Main method that runs the complete prompt chain analysis
+        Main method that runs the complete prompt chain analysis.
+
+        mode is "sequential" (every role sees all earlier output) or
+        "parallel" (the technical analyst and a screener-only risk assessor
+        run concurrently); it defaults to Config.PROMPT_CHAIN_MODE. The
+        chain stops early when an exit rule of self.exit_policy matches a
+        step's output; the rule then supplies the chain analysis. Steps run
+        on executor, or on the shared DAGExecutor.
         """
+        mode = mode or self.config.PROMPT_CHAIN_MODE
+        graph = CHAIN_GRAPHS[mode]
+        exits = []
+
+        def stop(step: str, results: Dict[str, Any]) -> bool:
+            rule = self.exit_policy.check(step, message, results[step])
+            if rule is not None:
+                exits.append(rule)
+            return rule is not None
 
-        chain_results = {}
-    
         try:
-            # Step 1: Initial Screener
-            screener_result = self._run_initial_screener(message)
-            chain_results["screener"] = screener_result
-            
-            # Step 2: Technical Analyst (uses screener output)
-            technical_result = self._run_technical_analyst(message, screener_result)
-            chain_results["technical_analyst"] = technical_result
-            
-            # Step 3: Risk Assessor (uses both previous outputs)
-            risk_result = self._run_risk_assessor(message, screener_result, technical_result)
-            chain_results["risk_assessor"] = risk_result
-            
-            # Step 4: Compliance Officer (uses all previous context)
-            compliance_result = self._run_compliance_officer(message, chain_results)
-            chain_results["compliance_officer"] = compliance_result
-            
-            # Step 5: Final Reviewer (synthesizes all findings)
-            final_result = self._run_final_reviewer(message, chain_results)
-            chain_results["final_reviewer"] = final_result
+            started = time.perf_counter()
+            chain_results, step_timings = (executor or DAGExecutor.get_shared()).run(
+                graph, lambda step, results: self._run_step(step, message, results),
+                parallel=mode == "parallel", stop=stop
+            )
+            wall_time = time.perf_counter() - started
+            self._record_timings(step_timings, wall_time)
             
-            # Compile final result
-            result = {
-                "transaction_id": message.message_id,
-                "chain_analysis": {
+            if exits:
+                chain_analysis = exits[0].chain_analysis(chain_results[exits[0].after])
+            else:
+                final_result = chain_results["final_reviewer"]
+                chain_analysis = {
                     "final_decision": final_result.get("final_decision", "HOLD"),
                     "confidence_score": final_result.get("confidence_score", 0.5),
                     "risk_level": final_result.get("risk_level", "MEDIUM"),
                     "consensus_reasoning": final_result.get("consensus_reasoning", ""),
                     "recommended_actions": final_result.get("recommended_actions", [])
-                },
+                }
+            
+            # Compile final result
+            result = {
+                "transaction_id": message.message_id,
+                "chain_analysis": chain_analysis,
                 "agent_perspectives": chain_results,
                 "chain_metadata": {
                     "steps_completed": len(chain_results),
+                    "steps_skipped": [step for step in graph if step not in chain_results],
+                    "early_exit": {"rule": exits[0].name, "after": exits[0].after} if exits else None,
+                    "mode": mode,
+                    "wall_time": wall_time,
+                    "step_timings": step_timings
                 }
             }
             
             setattr(message, 'chain_analysis', result.get('chain_analysis', {}))
             setattr(message, 'agent_perspectives', result.get('agent_perspectives', {}))
+            setattr(message, 'chain_metadata', result.get('chain_metadata', {}))
             
             # Update fraud status based on chain decision
             final_decision = result.get('chain_analysis', {}).get('final_decision', 'HOLD')
@@ -96,315 +444,232 @@ class PromptChainingAgent:
 
         return message         
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Chains run and the mean latency of every step and of the whole chain"""
+        with self._stats_lock:
+            stats = {step: dict(totals) for step, totals in self.stats.items()}
+
+        for totals in stats.values():
+            totals["latency_mean"] = totals["latency_total"] / totals["runs"] if totals["runs"] else 0.0
+        return stats
+    
+    def analyze_transactions(self, messages: List[SWIFTMessage], mode: Optional[str] = None,
+                             progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[SWIFTMessage]:
+        """
+        Run the chain over many messages as a pipeline.
+
+        Every message runs its own chain, and each of its steps starts as
+        soon as that message's previous steps are done, without waiting for
+        the other messages. At most Config.PROMPT_CHAIN_BATCH_CONCURRENCY
+        steps run at once across all messages, and
+        Config.PROMPT_CHAIN_STAGE_LIMITS caps individual steps, so wall time
+        grows with the chain depth rather than with messages x depth until
+        the concurrency is saturated. progress is called with the completed
+        and total counts after each message finishes.
+        """
+        concurrency = self.config.PROMPT_CHAIN_BATCH_CONCURRENCY
+        executor = DAGExecutor(max_workers=concurrency)
+        started = time.perf_counter()
+        completed = 0
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chain") as chains:
+                futures = [chains.submit(self.analyze_transaction_chain, message, mode, executor) for message in messages]
+                for future in as_completed(futures):
+                    future.result()
+                    completed += 1
+                    if progress is not None:
+                        elapsed = time.perf_counter() - started
+                        progress({
+                            "completed": completed,
+                            "total": len(messages),
+                            "elapsed": elapsed,
+                            "messages_per_second": completed / elapsed if elapsed else 0.0
+                        })
+        finally:
+            executor.shutdown()
+
+        return messages
+    
+    def _run_step(self, step: str, message: SWIFTMessage, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one role of the chain within its stage limit"""
+        limit = self.stage_limits.get(step)
+        if limit is None:
+            return self._dispatch_step(step, message, results)
+        with limit:
+            return self._dispatch_step(step, message, results)
+    
+    def _dispatch_step(self, step: str, message: SWIFTMessage, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one role of the chain on the results of the roles it depends on"""
+        if step == "screener":
+            return self._run_initial_screener(message)
+        if step == "technical_analyst":
+            return self._run_technical_analyst(message, results["screener"])
+        if step == "risk_assessor":
+            return self._run_risk_assessor(message, results["screener"], results.get("technical_analyst"))
+        if step == "compliance_officer":
+            return self._run_compliance_officer(message, results)
+        if step == "final_reviewer":
+            return self._run_final_reviewer(message, results)
+        raise ValueError(f"Unknown chain step: {step}")
+    
+    def _record_timings(self, step_timings: Dict[str, Dict[str, float]], wall_time: float):
+        with self._stats_lock:
+            for step, latency in [*((step, timing["latency"]) for step, timing in step_timings.items()),
+                                  ("chain", wall_time)]:
+                totals = self.stats.setdefault(step, {"runs": 0, "latency_total": 0.0})
+                totals["runs"] += 1
+                totals["latency_total"] += latency
+    
+    def analyze_transactions_deferred(self, messages: Optional[List[SWIFTMessage]] = None,
+                                      batch: Optional[DeferredBatch] = None) -> Dict[str, Any]:
+        """
+        Run one deferred round of the chain over many messages.
+
+        Each round gets every chain one step further: steps already answered
+        in an ingested batch result replay instantly, and the next step's
+        request is written to the batch request file. Call again without
+        messages after ingesting the results to resume from the saved inputs.
+        """
+        batch = batch or DeferredBatch()
+        return batch.run(self.analyze_transaction_chain, messages)
+    
     def _run_initial_screener(self, message: SWIFTMessage) -> Dict[str, Any]:
         """Step 1: Initial triage and quick assessment"""
         
-        system_prompt = """You are an Initial Transaction Screener with 15+ years experience in SWIFT fraud detection.
-        Your role is to quickly triage transactions and flag obvious red flags. You work fast but thoroughly.
-        Focus on immediate risk indicators and provide clear direction for deeper analysis."""
-        
-        user_prompt = f"""
-        INITIAL SCREENING ASSESSMENT
-        
-        Transaction: {message.message_id}
-        Type: {message.message_type} 
-        Amount: {message.amount} {message.currency}
-        Route: {message.sender_bic} → {message.receiver_bic}
-        
-        
-        Perform initial triage assessment. Respond with JSON:
-        {{
-            "triage_decision": "GREEN|YELLOW|RED",
-            "immediate_concerns": ["list of immediate red flags"],
-            "requires_deep_analysis": true/false,
-            "escalation_priority": "LOW|MEDIUM|HIGH|CRITICAL",
-            "initial_reasoning": "Quick assessment reasoning",
-            "focus_areas": ["areas that need deeper analysis"],
-            "time_sensitivity": "How urgent is this review?"
-        }}
-        """
+        messages = PromptRegistry.get_shared().render("chain.initial_screener", message=message)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            return self._complete("initial_screener", message, messages, SCREENER)
             
-            content = response.choices[0].message.content
-            if content:
-                return json.loads(content)
-            else:
-                return {"error": "No response from screener", "triage_decision": "RED"}
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {"error": str(e), "triage_decision": "RED"}
     
     def _run_technical_analyst(self, message: SWIFTMessage, screener_result: Dict[str, Any]) -> Dict[str, Any]:
         """Step 2: Deep technical validation and format analysis"""
         
-        system_prompt = """You are a Technical SWIFT Analyst specializing in message format validation and technical compliance.
-        You examine SWIFT messages for technical irregularities, format violations, and technical fraud indicators.
-        You build upon the initial screener's assessment with detailed technical analysis."""
-        
-        user_prompt = f"""
-        TECHNICAL ANALYSIS REQUEST
-        
-        TRANSACTION DETAILS:
-        Message ID: {message.message_id}
-        Type: {message.message_type}
-        Reference: {message.reference}
-        Amount: {message.amount} {message.currency}
-        Sender BIC: {message.sender_bic}
-        Receiver BIC: {message.receiver_bic}
-        Value Date: {message.value_date}
-        
-        INITIAL SCREENER ASSESSMENT:
-        Triage: {screener_result.get('triage_decision', 'UNKNOWN')}
-        Priority: {screener_result.get('escalation_priority', 'UNKNOWN')}
-        Focus Areas: {screener_result.get('focus_areas', [])}
-        Initial Concerns: {screener_result.get('immediate_concerns', [])}
-        
-        Perform detailed technical analysis. Respond with JSON:
-        {{
-            "technical_validation": {{
-                "format_compliance": "VALID|MINOR_ISSUES|MAJOR_ISSUES|INVALID",
-                "bic_validation": "Analysis of BIC codes",
-                "amount_analysis": "Analysis of amount patterns",
-                "reference_check": "Reference number validation"
-            }},
-            "technical_concerns": ["specific technical red flags"],
-            "data_integrity": "Assessment of data consistency",
-            "agrees_with_screener": true/false,
-            "technical_reasoning": "Detailed technical analysis",
-            "recommend_next_step": "What should the risk assessor focus on?"
-        }}
-        """
+        messages = PromptRegistry.get_shared().render(
+            "chain.technical_analyst",
+            message=message,
+            triage=screener_result.get('triage_decision', 'UNKNOWN'),
+            priority=screener_result.get('escalation_priority', 'UNKNOWN'),
+            focus_areas=screener_result.get('focus_areas', []),
+            concerns=screener_result.get('immediate_concerns', [])
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            return self._complete("technical_analyst", message, messages, TECHNICAL_ANALYST)
             
-            content = response.choices[0].message.content
-            if content:
-                return json.loads(content)
-            else:
-                return {"error": "No response from technical analyst"}
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {"error": str(e)}
     
-    def _run_risk_assessor(self, message: SWIFTMessage, screener_result: Dict[str, Any], technical_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Step 3: Risk pattern analysis and behavioral assessment"""
-        
-        system_prompt = """You are a Risk Assessment Specialist focused on behavioral patterns and risk profiling.
-        You analyze transaction patterns, risk behaviors, and contextual factors that indicate potential fraud.
-        You consider both the initial screening and technical analysis in your assessment."""
-        
-        user_prompt = f"""
-        RISK PATTERN ANALYSIS
-        
-        TRANSACTION CONTEXT:
-        Message: {message.message_id} ({message.message_type})
-        Amount: {message.amount} {message.currency}  
-        Banks: {message.sender_bic} → {message.receiver_bic}
-        
-        PREVIOUS ANALYSIS CHAIN:
-        
-        SCREENER SAYS: {screener_result.get('triage_decision', 'UNKNOWN')} priority
-        - Concerns: {screener_result.get('immediate_concerns', [])}
-        - Focus Areas: {screener_result.get('focus_areas', [])}
-        
-        TECHNICAL ANALYST SAYS: {technical_result.get('technical_validation', {}).get('format_compliance', 'UNKNOWN')}
-        - Technical Concerns: {technical_result.get('technical_concerns', [])}
-        - Data Integrity: {technical_result.get('data_integrity', 'Unknown')}
-        - Agrees with Screener: {technical_result.get('agrees_with_screener', 'Unknown')}
-        
-        Now perform risk behavior analysis. Respond with JSON:
-        {{
-            "risk_assessment": {{
-                "behavioral_score": 0.0-1.0,
-                "pattern_analysis": "Analysis of suspicious patterns",
-                "contextual_factors": ["relevant risk factors"],
-                "historical_comparison": "How this compares to known patterns"
-            }},
-            "agent_consensus": "Do you agree with previous agents' assessments?",
-            "risk_recommendation": "APPROVE|INVESTIGATE|BLOCK",
-            "confidence_level": 0.0-1.0,
-            "risk_reasoning": "Detailed risk assessment reasoning",
-            "escalation_advice": "What should compliance focus on?"
-        }}
-        """
+    def _run_risk_assessor(self, message: SWIFTMessage, screener_result: Dict[str, Any],
+                           technical_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Step 3: Risk pattern analysis and behavioral assessment; without technical_result it works from the screener alone"""
+        
+        if technical_result is None:
+            messages = PromptRegistry.get_shared().render(
+                "chain.risk_assessor_screener_only",
+                message=message,
+                triage=screener_result.get('triage_decision', 'UNKNOWN'),
+                concerns=screener_result.get('immediate_concerns', []),
+                focus_areas=screener_result.get('focus_areas', [])
+            )
+        else:
+            messages = PromptRegistry.get_shared().render(
+                "chain.risk_assessor",
+                message=message,
+                triage=screener_result.get('triage_decision', 'UNKNOWN'),
+                concerns=screener_result.get('immediate_concerns', []),
+                focus_areas=screener_result.get('focus_areas', []),
+                format_compliance=technical_result.get('technical_validation', {}).get('format_compliance', 'UNKNOWN'),
+                technical_concerns=technical_result.get('technical_concerns', []),
+                data_integrity=technical_result.get('data_integrity', 'Unknown'),
+                agrees_with_screener=technical_result.get('agrees_with_screener', 'Unknown')
+            )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            return self._complete("risk_assessor", message, messages, RISK_ASSESSOR)
             
-            content = response.choices[0].message.content
-            if content:
-                return json.loads(content)
-            else:
-                return {"error": "No response from risk assessor"}
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {"error": str(e)}
     
     def _run_compliance_officer(self, message: SWIFTMessage, chain_results: Dict[str, Any]) -> Dict[str, Any]:
         """Step 4: Regulatory compliance and legal assessment"""
         
-        system_prompt = """You are a Compliance Officer specializing in financial regulations and anti-money laundering.
-        You review transactions for regulatory compliance, legal requirements, and policy violations.
-        You consider all previous analysis in making compliance recommendations."""
-        
         screener = chain_results.get("screener", {})
         technical = chain_results.get("technical_analyst", {})
         risk = chain_results.get("risk_assessor", {})
         
-        user_prompt = f"""
-        COMPLIANCE REVIEW
-        
-        TRANSACTION: {message.message_id}
-        Amount: {message.amount} {message.currency}
-        Route: {message.sender_bic} → {message.receiver_bic}
-        
-        AGENT CONSULTATION SUMMARY:
-        
-        SCREENER (Triage): {screener.get('triage_decision', 'UNKNOWN')}
-        - Priority: {screener.get('escalation_priority', 'UNKNOWN')}
-        - Immediate Concerns: {screener.get('immediate_concerns', [])}
-        
-        TECHNICAL ANALYST: {technical.get('technical_validation', {}).get('format_compliance', 'UNKNOWN')}
-        - Technical Issues: {technical.get('technical_concerns', [])}
-        - Recommends: {technical.get('recommend_next_step', 'Standard review')}
-        
-        RISK ASSESSOR: {risk.get('risk_recommendation', 'UNKNOWN')}
-        - Risk Score: {risk.get('risk_assessment', {}).get('behavioral_score', 'Unknown')}
-        - Pattern Concerns: {risk.get('risk_assessment', {}).get('contextual_factors', [])}
-        
-        Perform compliance assessment. Respond with JSON:
-        {{
-            "compliance_status": "COMPLIANT|QUESTIONABLE|NON_COMPLIANT|REQUIRES_INVESTIGATION",
-            "regulatory_concerns": ["specific regulatory issues"],
-            "aml_assessment": "Anti-money laundering evaluation",
-            "policy_violations": ["any policy violations detected"],
-            "legal_risk": "LOW|MEDIUM|HIGH|CRITICAL",
-            "required_documentation": ["additional documentation needed"],
-            "compliance_reasoning": "Detailed compliance analysis",
-            "final_recommendation": "What action should be taken?"
-        }}
-        """
+        messages = PromptRegistry.get_shared().render(
+            "chain.compliance_officer",
+            message=message,
+            triage=screener.get('triage_decision', 'UNKNOWN'),
+            priority=screener.get('escalation_priority', 'UNKNOWN'),
+            concerns=screener.get('immediate_concerns', []),
+            format_compliance=technical.get('technical_validation', {}).get('format_compliance', 'UNKNOWN'),
+            technical_concerns=technical.get('technical_concerns', []),
+            recommend_next_step=technical.get('recommend_next_step', 'Standard review'),
+            risk_recommendation=risk.get('risk_recommendation', 'UNKNOWN'),
+            behavioral_score=risk.get('risk_assessment', {}).get('behavioral_score', 'Unknown'),
+            contextual_factors=risk.get('risk_assessment', {}).get('contextual_factors', [])
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            content = response.choices[0].message.content
-            if content:
-                return json.loads(content)
-            else:
-                return {"error": "No response from compliance officer"}
+            return self._complete("compliance_officer", message, messages, COMPLIANCE_OFFICER)
             
-        except Exception as e:
+        except CircuitOpenError as e:
             return {"error": str(e)}
     
     def _run_final_reviewer(self, message: SWIFTMessage, chain_results: Dict[str, Any]) -> Dict[str, Any]:
         """Step 5: Final synthesis and decision making"""
         
-        system_prompt = """You are the Final Reviewing Authority for SWIFT transaction analysis.
-        Your role is to synthesize all expert opinions, resolve conflicts, and make the final decision.
-        You must provide clear reasoning and actionable recommendations."""
-        
         screener = chain_results.get("screener", {})
         technical = chain_results.get("technical_analyst", {})
         risk = chain_results.get("risk_assessor", {})
         compliance = chain_results.get("compliance_officer", {})
         
-        user_prompt = f"""
-        FINAL REVIEW AND DECISION
-        
-        TRANSACTION: {message.message_id}
-        Amount: {message.amount} {message.currency}
-        
-        EXPERT TEAM CONSULTATION RESULTS:
-        
-        🔍 INITIAL SCREENER:
-        - Decision: {screener.get('triage_decision', 'UNKNOWN')}
-        - Priority: {screener.get('escalation_priority', 'UNKNOWN')}
-        - Concerns: {screener.get('immediate_concerns', [])}
-        
-        🔧 TECHNICAL ANALYST:
-        - Validation: {technical.get('technical_validation', {}).get('format_compliance', 'UNKNOWN')}
-        - Issues: {technical.get('technical_concerns', [])}
-        - Agrees with Screener: {technical.get('agrees_with_screener', 'Unknown')}
-        
-        📊 RISK ASSESSOR:
-        - Recommendation: {risk.get('risk_recommendation', 'UNKNOWN')}
-        - Risk Score: {risk.get('risk_assessment', {}).get('behavioral_score', 'Unknown')}
-        - Confidence: {risk.get('confidence_level', 'Unknown')}
-        
-        ⚖️ COMPLIANCE OFFICER:
-        - Status: {compliance.get('compliance_status', 'UNKNOWN')}
-        - Legal Risk: {compliance.get('legal_risk', 'UNKNOWN')}
-        - Final Rec: {compliance.get('final_recommendation', 'Unknown')}
-        
-        SYNTHESIZE ALL EXPERT OPINIONS AND MAKE FINAL DECISION. Respond with JSON:
-        
-        {{
-            "final_decision": "APPROVE|HOLD|REJECT",
-            "confidence_score": 0.0-1.0,
-            "risk_level": "LOW|MEDIUM|HIGH|CRITICAL", 
-            "consensus_reasoning": "How you weighed all expert opinions",
-            "conflict_resolution": "How you resolved any conflicting opinions",
-            "recommended_actions": ["specific actions to take"],
-            "business_impact": "Potential impact of this decision",
-            "review_timeline": "When this should be reviewed again",
-            "expert_agreement": "Level of agreement among experts",
-            "decision_factors": ["key factors that influenced final decision"]
-        }}
-        """
+        messages = PromptRegistry.get_shared().render(
+            "chain.final_reviewer",
+            message=message,
+            triage=screener.get('triage_decision', 'UNKNOWN'),
+            priority=screener.get('escalation_priority', 'UNKNOWN'),
+            concerns=screener.get('immediate_concerns', []),
+            format_compliance=technical.get('technical_validation', {}).get('format_compliance', 'UNKNOWN'),
+            technical_concerns=technical.get('technical_concerns', []),
+            agrees_with_screener=technical.get('agrees_with_screener', 'Unknown'),
+            risk_recommendation=risk.get('risk_recommendation', 'UNKNOWN'),
+            behavioral_score=risk.get('risk_assessment', {}).get('behavioral_score', 'Unknown'),
+            confidence_level=risk.get('confidence_level', 'Unknown'),
+            compliance_status=compliance.get('compliance_status', 'UNKNOWN'),
+            legal_risk=compliance.get('legal_risk', 'UNKNOWN'),
+            final_recommendation=compliance.get('final_recommendation', 'Unknown')
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            return self._complete("final_reviewer", message, messages, FINAL_REVIEWER)
+            
+        except CircuitOpenError as e:
+            return {"error": str(e)}
+    
+    def _complete(self, step: str, message: SWIFTMessage, messages: List[Dict[str, str]],
+                  schema: ResponseSchema) -> Dict[str, Any]:
+        """
+        Run one step of the chain through the model cascade and return the
+        parsed response. The step methods fall back only on CircuitOpenError;
+        any other failure ends the chain and is recorded on the message.
+        """
+        def send(model: str) -> Optional[str]:
+            response = create_chat_completion(
+                self.client,
+                agent="PromptChainingAgent",
+                step=step,
+                message_id=message.message_id,
+                model=model,
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.1
             )
-            
-            content = response.choices[0].message.content
-            if content:
-                return json.loads(content)
-            else:
-                return {"error": "No response from final reviewer"}
-            
-        except Exception as e:
-            return {"error": str(e)}
-    
\ No newline at end of file
+            return response.choices[0].message.content
+
+        return ModelCascade.get_shared().run(step, schema, send, self.model)
@@ -0,0 +1,183 @@
+"""
+Content-addressed cache for deterministic LLM responses
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from services.config import Config
+
+
+class ResponseCache:
+    """
+    Two-tier response cache keyed on the full request content.
+
+    The key is a hash of (model, messages, response_format, temperature), so a
+    replayed prompt maps to the same entry no matter which agent sends it.
+    Entries live in an in-memory LRU and, when a path is configured, in a
+    SQLite file that survives restarts. Both tiers honour the same TTL.
+    """
+
+    _shared: Optional["ResponseCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.LLM_CACHE_TTL
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        db_path = db_path or Config.LLM_CACHE_PATH
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "rejected": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    @classmethod
+    def get_shared(cls) -> "ResponseCache":
+        """Get the process-wide cache, creating it on first use"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def is_cacheable(params: Dict[str, Any]) -> bool:
+        """Only near-deterministic, non-streaming requests are worth caching"""
+        temperature = params.get("temperature", 1.0)
+        return (
+            Config.LLM_CACHE_ENABLED
+            and not params.get("stream", False)
+            and temperature is not None
+            and temperature <= Config.LLM_CACHE_MAX_TEMPERATURE
+        )
+
+    def accepts(self, params: Dict[str, Any], response: Any) -> bool:
+        """
+        Whether a response is complete enough to be served again.
+
+        Responses cut short (finish_reason other than "stop") are never
+        stored, nor are JSON-mode responses whose content is not valid JSON,
+        so a truncated or malformed answer is retried instead of being
+        replayed for the whole TTL.
+        """
+        choice = response.choices[0] if response.choices else None
+        content = choice.message.content if choice is not None else None
+        accepted = choice is not None and choice.finish_reason == "stop" and bool(content)
+
+        if accepted and (params.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+            try:
+                json.loads(content)
+            except ValueError:
+                accepted = False
+
+        if not accepted:
+            with self._lock:
+                self.stats["rejected"] += 1
+        return accepted
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """Hash the fields that determine the response into a stable key"""
+        content = {
+            "model": params.get("model"),
+            "messages": params.get("messages"),
+            "response_format": params.get("response_format"),
+            "temperature": params.get("temperature")
+        }
+        canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response, checking memory first and then disk"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if now - created_at <= self.ttl:
+                        self._store_in_memory(key, created_at, value)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expirations"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a response in every configured tier"""
+        created_at = time.time()
+
+        with self._lock:
+            self._store_in_memory(key, created_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, created_at)
+                )
+                self._db.commit()
+            self.stats["stores"] += 1
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the overall hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._memory)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _store_in_memory(self, key: str, created_at: float, value: str):
+        """Insert into the LRU tier, evicting the oldest entries past capacity"""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
@@ -0,0 +1,187 @@
+"""
+Typed parsing of structured LLM responses
+"""
+
+import json
+import re
+import threading
+import types
+from typing import Any, Dict, List, Literal, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+from services.config import Config
+
+
+class LLMResponse(BaseModel):
+    """
+    Base of the agent response schemas.
+
+    Only the fields the pipeline relies on are declared; anything else the
+    model returns is kept as is.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+
+class ResponseParseError(ValueError):
+    """A response that could not be parsed or validated, even after repair"""
+
+    def __init__(self, schema: str, content: Optional[str], error: Exception):
+        super().__init__(f"Invalid {schema} response: {error}")
+        self.schema = schema
+        self.content = content
+        self.error = error
+
+
+class ResponseSchema:
+    """
+    One agent response schema with its validator compiled up front.
+
+    Agents declare their schemas at import time, so the pydantic-core
+    validator (and its JSON decoder) is built once per schema rather than
+    on every call.
+    """
+
+    def __init__(self, name: str, model: Type[LLMResponse]):
+        self.name = name
+        self.model = model
+        self.adapter = TypeAdapter(model)
+
+    def dump(self, value: LLMResponse) -> Dict[str, Any]:
+        """The validated response as a plain dict, leaving out fields the model did not fill in"""
+        return self.adapter.dump_python(value, mode="json", exclude_none=True)
+
+
+# Any JSON object, for responses whose shape is left to the model
+JSON_OBJECT = ResponseSchema("json_object", LLMResponse)
+
+
+class ResponseParser:
+    """
+    Parses and validates structured responses against their schema.
+
+    Responses are first validated straight from the raw text by the compiled
+    validator. Only when that fails is the local repair pass run: Markdown
+    code fences and prose around the JSON object are stripped, trailing
+    commas removed and enum values matched case-insensitively. A response
+    that still does not validate raises ResponseParseError, which the
+    agents' existing fallbacks handle.
+    """
+
+    _shared: Optional["ResponseParser"] = None
+    _shared_lock = threading.Lock()
+
+    _FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+    _TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+    def __init__(self):
+        self.config = Config()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def get_shared(cls) -> "ResponseParser":
+        """Process-wide parser the agents record their parse outcomes in"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def parse_response(cls, schema: ResponseSchema, content: Optional[str]) -> Dict[str, Any]:
+        """Parse with the shared parser"""
+        return cls.get_shared().parse(schema, content)
+
+    def parse(self, schema: ResponseSchema, content: Optional[str]) -> Dict[str, Any]:
+        """
+        The response validated against schema, as a dict
+        """
+        text = content or "{}"
+        try:
+            value = schema.adapter.validate_json(text)
+            self._count(schema, "parsed")
+            return schema.dump(value)
+        except ValidationError as e:
+            error: Exception = e
+
+        if self.config.LLM_RESPONSE_REPAIR:
+            try:
+                data = self._fix_enum_case(schema.model, json.loads(self.repair(text)))
+                value = schema.adapter.validate_python(data)
+                self._count(schema, "repaired")
+                return schema.dump(value)
+            except (ValueError, ValidationError) as e:
+                error = e
+
+        self._count(schema, "failed")
+        raise ResponseParseError(schema.name, content, error)
+
+    @classmethod
+    def repair(cls, text: str) -> str:
+        """Fix the textual defects that commonly break otherwise usable JSON"""
+        fenced = cls._FENCE.search(text)
+        if fenced:
+            text = fenced.group(1)
+
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            text = text[start:end + 1]
+
+        return cls._TRAILING_COMMA.sub(r"\1", text)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Parsed, repaired and failed counts per schema"""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def _count(self, schema: ResponseSchema, outcome: str):
+        with self._lock:
+            counts = self.stats.setdefault(schema.name, {"parsed": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+
+    @classmethod
+    def _fix_enum_case(cls, model: Type[BaseModel], data: Any) -> Any:
+        """Match the enum fields of data to their declared values, ignoring case and separators"""
+        if not isinstance(data, dict):
+            return data
+
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            if key in data:
+                data[key] = cls._fix_value(field.annotation, data[key])
+        return data
+
+    @classmethod
+    def _fix_value(cls, annotation: Any, value: Any) -> Any:
+        origin = get_origin(annotation)
+
+        if origin is Literal:
+            if isinstance(value, str):
+                wanted = cls._canonical(value)
+                for choice in get_args(annotation):
+                    if isinstance(choice, str) and cls._canonical(choice) == wanted:
+                        return choice
+            return value
+
+        if origin in (Union, types.UnionType):
+            for arg in get_args(annotation):
+                value = cls._fix_value(arg, value)
+            return value
+
+        if origin in (list, List) and isinstance(value, list):
+            item_type = get_args(annotation)[0] if get_args(annotation) else Any
+            return [cls._fix_value(item_type, item) for item in value]
+
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return cls._fix_enum_case(annotation, value)
+
+        return value
+
+    @staticmethod
+    def _canonical(value: str) -> str:
+        return re.sub(r"[\s\-]+", "_", value.strip()).upper()
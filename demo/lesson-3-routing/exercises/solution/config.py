@@ -21,6 +21,87 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = "gpt-4o"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
     BASE_URL = "https://openai.vocareum.com/v1"
+    LLM_BASE_URL = os.getenv("LLM_BASE_URL")  # Endpoint override for every pooled client, e.g. the local simulator
+
+    # HTTP connection pool settings (shared OpenAI client)
+    HTTP_MAX_CONNECTIONS = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+    HTTP_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+
+    # LLM response cache settings
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_MAX_ENTRIES = 10000
+    LLM_CACHE_TTL = 24 * 60 * 60  # Seconds before a cached response expires
+    LLM_CACHE_MAX_TEMPERATURE = 0.1  # Only near-deterministic calls are cached
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # SQLite file for the on-disk tier; unset keeps memory only
+
+    # Single-flight settings
+    LLM_SINGLE_FLIGHT_ENABLED = True  # Identical concurrent requests share one API call
+    LLM_SINGLE_FLIGHT_MAX_TEMPERATURE = 0.1  # Higher temperatures expect independent samples
+
+    # Rate limiting settings (shared by every LLM call)
+    # Set both limits to your account's tier; the client throttles itself to them, so a
+    # low tier (e.g. 500 RPM / 30,000 TPM) caps every batch pipeline at a few calls per second
+    LLM_RATE_LIMIT_ENABLED = True
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "5000"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "800000"))
+    LLM_DEFAULT_COMPLETION_TOKENS = 150  # Completion estimate until real completions have been seen
+    LLM_COMPLETION_ESTIMATE_WEIGHT = 0.1  # Weight of each observed completion in the running estimate
+    LLM_CONCURRENCY_INITIAL = 8  # Starting AIMD concurrency limit
+    LLM_CONCURRENCY_MIN = 1
+    LLM_CONCURRENCY_MAX = 64
+    LLM_CONCURRENCY_COOLDOWN = 5.0  # Seconds between multiplicative decreases
+    LLM_RATE_LIMIT_POLL_INTERVAL = 0.05  # Seconds between admission checks while waiting
+
+    # Resilience settings
+    LLM_REQUEST_TIMEOUT = 30.0  # Seconds per API request attempt
+    LLM_MAX_RETRIES = 3  # Retries of transient errors (timeouts, 429, 5xx)
+    LLM_RETRY_BASE_DELAY = 0.5  # Seconds; decorrelated jitter starts here
+    LLM_RETRY_MAX_DELAY = 8.0  # Seconds; cap on a single backoff
+    LLM_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failed calls that open the breaker
+    LLM_BREAKER_RESET_TIMEOUT = 30.0  # Seconds open before a probe call is allowed
+
+    # LLM usage accounting
+    LLM_METRICS_MAX_RECORDS = 100000  # Most recent calls kept for summaries
+    LLM_PRICING = {  # USD per million tokens
+        "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+        "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60}
+    }
+
+    # Deferred batch execution
+    LLM_DEFERRED_DIR = os.getenv("LLM_DEFERRED_DIR", "deferred_batch")  # Saved inputs, batch request and result files
+    LLM_DEFERRED_MAX_ROUNDS = 10  # Request/result rounds before run_until_complete gives up
+    LLM_DEFERRED_LOCAL_WORKERS = 8  # Concurrent requests of the local stand-in batch runner
+    LLM_BATCH_PRICE_FACTOR = 0.5  # Batch API price relative to synchronous calls
+
+    # Local OpenAI-compatible simulator (python -m services.llm_simulator)
+    LLM_SIMULATOR_HOST = "127.0.0.1"
+    LLM_SIMULATOR_PORT = 8089
+    LLM_SIMULATOR_SEED = 42  # Fixed seed for repeatable benchmark runs
+    LLM_SIMULATOR_LATENCY_DISTRIBUTION = "lognormal"  # "fixed", "uniform" or "lognormal"
+    LLM_SIMULATOR_LATENCY_MEDIAN = 0.8  # Seconds to first token
+    LLM_SIMULATOR_LATENCY_SIGMA = 0.5  # Spread of the lognormal distribution
+    LLM_SIMULATOR_SECONDS_PER_TOKEN = 0.01  # Generation time per completion token
+    LLM_SIMULATOR_TEXT_TOKENS = 150  # Length of free-text responses
+    LLM_SIMULATOR_RATE_LIMIT_RATE = 0.0  # Share of requests answered with 429
+    LLM_SIMULATOR_SERVER_ERROR_RATE = 0.0  # Share of requests answered with 500/502/503
+    LLM_SIMULATOR_RETRY_AFTER = 1  # Seconds sent in Retry-After with injected 429s
+    LLM_SIMULATOR_REQUESTS_PER_MINUTE = 0  # Enforced request limit; 0 disables it
+
+    # Structured response parsing
+    LLM_RESPONSE_REPAIR = True  # Repair code fences, trailing commas and enum case before rejecting a response
+
+    # Prompt templates
+    LLM_PREFIX_CACHE_MIN_TOKENS = 1024  # Shortest prompt prefix the provider caches automatically
+
+    # Model cascade
+    LLM_CASCADE_ENABLED = False  # Opt in to try the small model first on the steps below
+    LLM_CASCADE_SMALL_MODEL = os.getenv("LLM_CASCADE_SMALL_MODEL", "gpt-4o-mini")
+    LLM_CASCADE_CONFIDENCE_THRESHOLD = 0.8  # Small-model answers below this confidence are escalated
+    LLM_CASCADE_STEPS = {  # Cascaded step -> its confidence field
+        "initial_screener": "confidence",
+        "main_llm_initial_analysis": "confidence"
+    }
     
     # SWIFT validation settings
     SWIFT_STANDARDS = {
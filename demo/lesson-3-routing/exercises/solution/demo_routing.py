@@ -8,6 +8,7 @@ Main LLM → Specialized LLM → Main LLM → Complete
 from typing import List
 from services.swift_message import SWIFTMessage
 from services.lmm_routing_agent import LLMRoutingAgent
+from services.llm_metrics import LLMMetrics
 
 
 class LLMRoutingDemo:
@@ -47,6 +48,13 @@ class LLMRoutingDemo:
         
         print("\n" + "=" * 90)
         print("LLM ROUTING PATTERN DEMONSTRATION COMPLETE")
+        print()
+        
+        print("🤖 LLM USAGE BY ROUTING STEP:")
+        for step, stats in LLMMetrics.get_shared().summary(by="step").items():
+            print(f"   {step}: {stats['calls']} calls, {stats['total_tokens']:,} tokens, "
+                  f"p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s, "
+                  f"wait p95 {stats['wait_p95']:.2f}s, ${stats['cost']:.4f}")
     
     
     def _create_test_scenarios(self) -> List[tuple]:
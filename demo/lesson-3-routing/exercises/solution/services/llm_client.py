@@ -0,0 +1,318 @@
+"""
+Shared OpenAI client registry with pooled HTTP connections
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
+
+from config import Config
+from services.deferred_batch import DeferredBatch
+from services.llm_metrics import LLMMetrics
+from services.rate_limiter import RateLimiter
+from services.resilience import CircuitBreaker, ResilientCaller
+from services.response_cache import ResponseCache
+from services.single_flight import SingleFlight
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of OpenAI clients.
+
+    Agents share one client per (api_key, base_url) pair, so HTTP connections
+    and TLS sessions are pooled and kept alive across calls instead of being
+    rebuilt for every agent instance. Config.LLM_BASE_URL, when set, points
+    every client without an explicit base_url at another endpoint, such as
+    the local simulator.
+    """
+
+    _clients: Dict[Tuple[str, Optional[str]], OpenAI] = {}
+    _async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # event loop -> clients
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+        """
+        Get the shared client for the given credentials, creating it on first use
+        """
+        key = (api_key or Config.OPENAI_API_KEY, base_url or Config.LLM_BASE_URL)
+
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    client = OpenAI(
+                        api_key=key[0],
+                        base_url=key[1],
+                        http_client=cls._create_http_client(),
+                        max_retries=0  # Retries are handled in the shared call path
+                    )
+                    cls._clients[key] = client
+
+        return client
+
+    @classmethod
+    def get_async_client(cls, api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """
+        Get the shared async client for the running event loop.
+
+        Async connection pools are bound to the loop that created them, so
+        clients are pooled per loop rather than per process.
+        """
+        loop = asyncio.get_running_loop()
+        key = (api_key or Config.OPENAI_API_KEY, base_url or Config.LLM_BASE_URL)
+
+        with cls._lock:
+            loop_clients = cls._async_clients.setdefault(loop, {})
+            client = loop_clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=key[0],
+                    base_url=key[1],
+                    http_client=httpx.AsyncClient(limits=cls._create_limits()),
+                    max_retries=0  # Retries are handled in the shared call path
+                )
+                loop_clients[key] = client
+
+        return client
+
+    @classmethod
+    def close_all(cls):
+        """Close every pooled client and release its connections"""
+        with cls._lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients.clear()
+
+    @staticmethod
+    def _create_http_client() -> httpx.Client:
+        """Create an HTTP client with keep-alive and the configured pool limits"""
+        return httpx.Client(limits=LLMClientRegistry._create_limits())
+
+    @staticmethod
+    def _create_limits() -> httpx.Limits:
+        """Connection pool limits shared by sync and async clients"""
+        return httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+        )
+
+
+_resilient_caller = ResilientCaller()
+
+
+def _send(client: OpenAI, params: Dict[str, Any], outcome: Optional[Dict[str, Any]] = None) -> ChatCompletion:
+    """
+    Make the API request with a timeout, retrying transient errors behind the
+    endpoint's circuit breaker; every attempt waits for the shared rate limiter.
+
+    When given, outcome["sent_at"] is set as each attempt goes out, so time
+    spent waiting on the limiter and backing off can be told apart from the
+    API's own latency.
+    """
+    request = {"timeout": Config.LLM_REQUEST_TIMEOUT, **params}
+    breaker = CircuitBreaker.for_endpoint(str(client.base_url), params.get("model"))
+    limiter = RateLimiter.get_shared()
+
+    def attempt() -> ChatCompletion:
+        if outcome is not None:
+            outcome["sent_at"] = time.perf_counter()
+        return client.chat.completions.create(**request)
+
+    return _resilient_caller.call(breaker, lambda: limiter.call(params, attempt))
+
+
+async def _asend(client: AsyncOpenAI, params: Dict[str, Any],
+                 outcome: Optional[Dict[str, Any]] = None) -> ChatCompletion:
+    """Async counterpart of _send"""
+    request = {"timeout": Config.LLM_REQUEST_TIMEOUT, **params}
+    breaker = CircuitBreaker.for_endpoint(str(client.base_url), params.get("model"))
+    limiter = RateLimiter.get_shared()
+
+    async def attempt() -> ChatCompletion:
+        if outcome is not None:
+            outcome["sent_at"] = time.perf_counter()
+        return await client.chat.completions.create(**request)
+
+    return await _resilient_caller.acall(breaker, lambda: limiter.acall(params, attempt))
+
+
+def _timings(started: float, outcome: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    Split the time since started into API latency and the wait before the
+    last attempt went out; calls that never reached the API have no wait
+    """
+    finished = time.perf_counter()
+    sent_at = outcome.get("sent_at", started)
+    return finished - sent_at, sent_at - started
+
+
+def create_chat_completion(client: OpenAI, *, agent: Optional[str] = None, step: Optional[str] = None,
+                           message_id: Optional[str] = None, **params) -> ChatCompletion:
+    """
+    Send a chat completion request through the shared call path.
+
+    Near-deterministic requests are served from the response cache when an
+    identical request has been answered before, and identical requests
+    already in flight share that single API call. Every call is recorded in
+    LLMMetrics under the given agent, step and message, with the API's
+    latency kept apart from time spent rate limited or backing off.
+    """
+    outcome = {"source": "api"}
+    started = time.perf_counter()
+    try:
+        response = _complete(client, params, outcome)
+    except Exception as e:
+        latency, wait = _timings(started, outcome)
+        LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency,
+                                       source=outcome["source"], error=e, wait=wait)
+        raise
+
+    latency, wait = _timings(started, outcome)
+    LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency,
+                                   response.usage, outcome["source"], wait=wait)
+    return response
+
+
+async def acreate_chat_completion(client: AsyncOpenAI, *, agent: Optional[str] = None, step: Optional[str] = None,
+                                  message_id: Optional[str] = None, **params) -> ChatCompletion:
+    """
+    Async counterpart of create_chat_completion, sharing the same cache
+    """
+    outcome = {"source": "api"}
+    started = time.perf_counter()
+    try:
+        response = await _acomplete(client, params, outcome)
+    except Exception as e:
+        latency, wait = _timings(started, outcome)
+        LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency,
+                                       source=outcome["source"], error=e, wait=wait)
+        raise
+
+    latency, wait = _timings(started, outcome)
+    LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency,
+                                   response.usage, outcome["source"], wait=wait)
+    return response
+
+
+def stream_chat_completion(client: OpenAI, *, agent: Optional[str] = None, step: Optional[str] = None,
+                           message_id: Optional[str] = None, **params) -> Iterator[str]:
+    """
+    Stream a chat completion through the shared call path, yielding content
+    as it arrives.
+
+    The request is opened with the same timeout, retries, circuit breaker
+    and rate limiting as create_chat_completion; once chunks are flowing it
+    is not retried. Streams bypass the cache and single-flight, and are
+    recorded in LLMMetrics when they end, with their time to first token.
+    """
+    outcome = {"source": "api"}
+    usage = None
+    first_token = None
+    started = time.perf_counter()
+
+    try:
+        deferred = DeferredBatch.get_active()
+        if deferred is not None:
+            response, replayed = deferred.resolve(params)
+            outcome["source"] = "replayed" if replayed else "deferred"
+            usage = response.usage
+            first_token = time.perf_counter() - started
+            yield response.choices[0].message.content or ""
+        else:
+            request = {**params, "stream": True, "stream_options": {"include_usage": True}}
+            with _send(client, request, outcome) as stream:
+                for chunk in stream:
+                    usage = chunk.usage or usage
+                    for choice in chunk.choices:
+                        if choice.delta.content:
+                            if first_token is None:
+                                first_token = time.perf_counter() - outcome["sent_at"]
+                            yield choice.delta.content
+    except Exception as e:
+        latency, wait = _timings(started, outcome)
+        LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency,
+                                       source=outcome["source"], error=e, wait=wait)
+        raise
+
+    latency, wait = _timings(started, outcome)
+    LLMMetrics.get_shared().record(agent, step, message_id, params.get("model"), latency, usage,
+                                   outcome["source"], first_token_latency=first_token, wait=wait)
+
+
+def _complete(client: OpenAI, params: Dict[str, Any], outcome: Dict[str, Any]) -> ChatCompletion:
+    """Serve a request from a deferred batch, the cache, an in-flight twin or the API"""
+    deferred = DeferredBatch.get_active()
+    if deferred is not None:
+        response, replayed = deferred.resolve(params)
+        outcome["source"] = "replayed" if replayed else "deferred"
+        return response
+
+    cache = ResponseCache.get_shared()
+    cacheable = cache.is_cacheable(params)
+    coalescable = SingleFlight.is_coalescable(params)
+    if not cacheable and not coalescable:
+        return _send(client, params, outcome)
+
+    key = cache.make_key(params)
+    if cacheable:
+        cached = cache.get(key)
+        if cached is not None:
+            outcome["source"] = "cache"
+            return ChatCompletion.model_validate_json(cached)
+
+    def call() -> ChatCompletion:
+        outcome["source"] = "api"
+        response = _send(client, params, outcome)
+        if cacheable and cache.accepts(params, response):
+            cache.set(key, response.model_dump_json())
+        return response
+
+    if coalescable:
+        # Stays "coalesced" unless this caller ends up making the request itself
+        outcome["source"] = "coalesced"
+        return SingleFlight.get_shared().do(f"{client.base_url}|{key}", call)
+    return call()
+
+
+async def _acomplete(client: AsyncOpenAI, params: Dict[str, Any], outcome: Dict[str, Any]) -> ChatCompletion:
+    """Async counterpart of _complete"""
+    deferred = DeferredBatch.get_active()
+    if deferred is not None:
+        response, replayed = deferred.resolve(params)
+        outcome["source"] = "replayed" if replayed else "deferred"
+        return response
+
+    cache = ResponseCache.get_shared()
+    cacheable = cache.is_cacheable(params)
+    coalescable = SingleFlight.is_coalescable(params)
+    if not cacheable and not coalescable:
+        return await _asend(client, params, outcome)
+
+    key = cache.make_key(params)
+    if cacheable:
+        cached = cache.get(key)
+        if cached is not None:
+            outcome["source"] = "cache"
+            return ChatCompletion.model_validate_json(cached)
+
+    async def call() -> ChatCompletion:
+        outcome["source"] = "api"
+        response = await _asend(client, params, outcome)
+        if cacheable and cache.accepts(params, response):
+            cache.set(key, response.model_dump_json())
+        return response
+
+    if coalescable:
+        # Stays "coalesced" unless this caller ends up making the request itself
+        outcome["source"] = "coalesced"
+        return await SingleFlight.get_shared().ado(f"{client.base_url}|{key}", call)
+    return await call()
@@ -2,10 +2,13 @@
 LLM service for fraud analysis and SWIFT message correction using OpenAI
 """
 
-import json
-from typing import Dict, List, Any
+import logging
+from typing import Dict, List, Any, Optional
 
 from openai import OpenAI
+from services.llm_client import LLMClientRegistry, create_chat_completion
+from services.resilience import CircuitOpenError
+from services.response_parser import JSON_OBJECT, ResponseParser
 from services.swift_message import SWIFTMessage
 from config import Config
 
@@ -15,13 +18,14 @@ class LLMService:
     Service for LLM-based fraud analysis and SWIFT message correction
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[OpenAI] = None):
         self.config = Config()
+        self.logger = logging.getLogger(__name__)
         
-        # Initialize OpenAI client
+        # Use the injected client, or the shared pooled one
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        self.client = client or LLMClientRegistry.get_client()
         self.model = self.config.OPENAI_MODEL
     
     def get_swift_correction(self, prompt: str) -> Dict[str, Any]:
@@ -29,7 +33,10 @@ class LLMService:
         Get SWIFT message corrections from LLM
         """
         try:
-            response = self.client.chat.completions.create(
+            response = create_chat_completion(
+                self.client,
+                agent="LLMService",
+                step="get_swift_correction",
                 model=self.model,
                 messages=[
                     {
@@ -48,12 +55,12 @@ class LLMService:
                 temperature=0.1
             )
             
-            result = json.loads(response.choices[0].message.content or "{}")
+            result = ResponseParser.parse_response(JSON_OBJECT, response.choices[0].message.content)
             
             return result
             
-        except Exception as e:
-            self.logger.error(f"LLM SWIFT correction failed: {str(e)}")
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM SWIFT correction skipped: {str(e)}")
             return {}
 
     
@@ -157,19 +164,36 @@ Respond with JSON in this exact format:
     
     def batch_analyze_transactions(self, messages: List[SWIFTMessage]) -> Dict[str, Any]:
         """
-        Perform batch analysis of multiple transactions for patterns
+        Perform batch analysis of multiple transactions for patterns.
+        
+        Amounts that do not parse are left out of the amount statistics and
+        counted in the prompt; a batch with no parseable amount is not sent.
         """
+        # Create summary of transaction patterns
+        amounts = []
+        for msg in messages:
+            try:
+                amounts.append(float(msg.amount))
+            except (TypeError, ValueError):
+                continue
+        currencies = [msg.currency for msg in messages]
+        bics = [(msg.sender_bic, msg.receiver_bic) for msg in messages]
+        
+        if not amounts:
+            self.logger.warning(f"LLM batch analysis skipped: no parseable amount in {len(messages)} transactions")
+            return {
+                "analysis": "Insufficient data for batch analysis",
+                "patterns": [],
+                "recommendations": ["Manual review required"]
+            }
+        
         try:
-            # Create summary of transaction patterns
-            amounts = [float(msg.amount) for msg in messages]
-            currencies = [msg.currency for msg in messages]
-            bics = [(msg.sender_bic, msg.receiver_bic) for msg in messages]
-            
             prompt = f"""
 Analyze this batch of {len(messages)} SWIFT transactions for suspicious patterns:
 
 SUMMARY STATISTICS:
 - Total Transactions: {len(messages)}
+- Unparseable Amounts: {len(messages) - len(amounts)} (excluded from the amount statistics)
 - Amount Range: ${min(amounts):,.2f} - ${max(amounts):,.2f}
 - Average Amount: ${sum(amounts)/len(amounts):,.2f}
 - Unique Currencies: {len(set(currencies))}
@@ -190,7 +214,10 @@ Look for patterns that might indicate:
 Respond with JSON format analysis of suspicious patterns found.
 """
             
-            response = self.client.chat.completions.create(
+            response = create_chat_completion(
+                self.client,
+                agent="LLMService",
+                step="batch_analyze_transactions",
                 model=self.model,
                 messages=[
                     {
@@ -207,16 +234,16 @@ Respond with JSON format analysis of suspicious patterns found.
                 temperature=0.1
             )
             
-            result = json.loads(response.choices[0].message.content or "{}")
+            result = ResponseParser.parse_response(JSON_OBJECT, response.choices[0].message.content)
             
             self.logger.info("LLM batch analysis completed")
             
             return result
             
-        except Exception as e:
-            self.logger.error(f"LLM batch analysis failed: {str(e)}")
+        except CircuitOpenError as e:
+            self.logger.warning(f"LLM batch analysis skipped: {str(e)}")
             return {
-                "analysis": "Batch analysis failed",
+                "analysis": "Batch analysis unavailable",
                 "patterns": [],
                 "recommendations": ["Manual review required"]
             }
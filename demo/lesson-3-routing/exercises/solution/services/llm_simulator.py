@@ -0,0 +1,418 @@
+"""
+Local OpenAI-compatible simulator for load and latency testing
+
+Run with `python -m services.llm_simulator` and set LLM_BASE_URL to
+http://127.0.0.1:8089/v1 to point every pooled client at it.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from services.rate_limiter import TokenBucket
+
+
+class ResponseSynthesizer:
+    """
+    Builds schema-valid responses for the agents' prompts.
+
+    Most agents document their response as a JSON template in the prompt
+    ("APPROVE|HOLD|REJECT", 0.0-1.0, true/false, lists and nested objects),
+    so the template is parsed and filled with a random value of the right
+    shape. The few agents that describe their format in prose have their
+    own responders, and correction prompts echo the current field values.
+    """
+
+    ENUM = re.compile(r"^[A-Z0-9_]+(\|[A-Z0-9_]+)+$")
+    MESSAGE_ID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def synthesize(self, body: Dict[str, Any]) -> str:
+        """Response content for a chat completion request body"""
+        prompt = "\n".join(str(message.get("content") or "") for message in body.get("messages", []))
+        response_format = (body.get("response_format") or {}).get("type", "text")
+
+        if response_format != "json_object":
+            return self._text(body)
+
+        for marker, responder in (
+            ('"results"', self._packed_verdicts),
+            ('"misspelled"', self._spelling),
+            ('"total_fraud_score"', self._aggregation),
+            ("<tasks>", self._orchestration)
+        ):
+            if marker in prompt:
+                return json.dumps(responder(prompt))
+
+        template = self._parse_template(prompt)
+        if template is None:
+            return json.dumps({"analysis": "Simulated analysis", "patterns": [], "recommendations": []})
+        return json.dumps(self._instantiate(template, "", prompt))
+
+    def _parse_template(self, prompt: str) -> Optional[Any]:
+        """The documented JSON template after the last mention of JSON, made parseable"""
+        start = prompt.find("{", prompt.rfind("JSON"))
+        if start < 0:
+            return None
+
+        depth = 0
+        for end in range(start, len(prompt)):
+            depth += {"{": 1, "}": -1}.get(prompt[end], 0)
+            if depth == 0:
+                break
+        text = prompt[start:end + 1]
+
+        text = re.sub(r"\btrue/false\b", '"__bool__"', text)
+        text = re.sub(r'"[^"]*"(?:\s*\|\s*"[^"]*")+',
+                      lambda match: '"' + "|".join(re.findall(r'"([^"]*)"', match.group(0))) + '"', text)
+        text = re.sub(r'(?<![\w".])(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)(?![\w"])', r'"__range__\1__\2"', text)
+        text = re.sub(r",\s*([}\]])", r"\1", text)
+
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+    def _instantiate(self, template: Any, key: str, prompt: str) -> Any:
+        """Fill a template value with a random value of the same shape"""
+        if isinstance(template, dict):
+            return {name: self._instantiate(value, name, prompt) for name, value in template.items()}
+
+        if isinstance(template, list):
+            if template and isinstance(template[0], dict):
+                return [self._instantiate(template[0], key, prompt)]
+            return [f"Simulated {key.replace('_', ' ')} {index + 1}" for index in range(self.rng.randint(0, 3))]
+
+        if not isinstance(template, str):
+            return template
+
+        if template == "__bool__":
+            return self.rng.random() < 0.5
+        if template.startswith("__range__"):
+            low, high = template[len("__range__"):].split("__")
+            if "." in low or "." in high:
+                return round(self.rng.uniform(float(low), float(high)), 2)
+            return self.rng.randint(int(low), int(high))
+        if self.ENUM.match(template):
+            return self.rng.choice(template.split("|"))
+        if template.startswith("corrected_"):
+            return self._echo_field(template[len("corrected_"):], prompt) or template
+
+        return f"Simulated {key.replace('_', ' ')}"
+
+    @staticmethod
+    def _echo_field(field: str, prompt: str) -> Optional[str]:
+        """Current value of a field from a "Sender BIC: ..." style prompt line"""
+        label = field.replace("_", " ").replace("bic", "BIC")
+        match = re.search(rf"^\s*-?\s*{label}:\s*(\S+)", prompt, re.IGNORECASE | re.MULTILINE)
+        return match.group(1) if match else None
+
+    def _packed_verdicts(self, prompt: str) -> Dict[str, Any]:
+        """FraudDetector packed mode: one verdict per message_id in the table"""
+        message_ids = list(dict.fromkeys(self.MESSAGE_ID.findall(prompt)))
+        return {"results": [
+            {"message_id": message_id, "fraud": self.rng.choice(["YES", "NO"]), "reasoning": "Simulated reasoning"}
+            for message_id in message_ids
+        ]}
+
+    def _spelling(self, prompt: str) -> Dict[str, Any]:
+        """FraudPatternDetectionAgent.check_spelling"""
+        misspelled = self.rng.random() < 0.2
+        return {"misspelled": misspelled, "words": ["recieve"] if misspelled else []}
+
+    def _aggregation(self, prompt: str) -> Dict[str, Any]:
+        """FraudAggAgent"""
+        return {"thought": "Simulated review of the detector statements", "total_fraud_score": self.rng.randint(1, 100)}
+
+    def _orchestration(self, prompt: str) -> Dict[str, Any]:
+        """Orchestrator: an analysis and four typed tasks"""
+        task_types = ["data extraction", "amount report", "currency report", "settlement review"]
+        return {
+            "analysis": "Simulated analysis of the transactions",
+            "tasks": [{"type": task_type, "description": f"Simulated {task_type} task"} for task_type in task_types]
+        }
+
+    def _text(self, body: Dict[str, Any]) -> str:
+        """Free text of roughly LLM_SIMULATOR_TEXT_TOKENS tokens"""
+        tokens = min(body.get("max_tokens") or Config.LLM_SIMULATOR_TEXT_TOKENS, Config.LLM_SIMULATOR_TEXT_TOKENS)
+        words = ["Simulated", "analysis", "of", "the", "SWIFT", "transaction", "shows", "no", "unusual", "pattern."]
+        return " ".join(words[index % len(words)] for index in range(max(tokens * 3 // 4, 1)))
+
+
+class LLMSimulator:
+    """
+    OpenAI-compatible chat completions endpoint served locally.
+
+    Responses come from ResponseSynthesizer after a latency drawn from the
+    configured distribution (time to first token plus a per-token
+    generation time). A configurable share of requests fails with 429
+    (with Retry-After) or 5xx, and an optional requests-per-minute limit
+    answers 429 once exhausted. Prompt and completion tokens are counted
+    at ~4 characters per token, as in RateLimiter.estimate_tokens. A fixed
+    seed makes a benchmark run repeatable.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, seed: Optional[int] = None):
+        self.config = Config()
+        self.host = host or self.config.LLM_SIMULATOR_HOST
+        self.port = port if port is not None else self.config.LLM_SIMULATOR_PORT
+
+        self.rng = random.Random(seed if seed is not None else self.config.LLM_SIMULATOR_SEED)
+        self.synthesizer = ResponseSynthesizer(self.rng)
+        self.requests = (TokenBucket(self.config.LLM_SIMULATOR_REQUESTS_PER_MINUTE)
+                         if self.config.LLM_SIMULATOR_REQUESTS_PER_MINUTE else None)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_total": 0.0
+        }
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure as LLM_BASE_URL"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def handle(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, str], Any]:
+        """
+        Status, headers and payload for one chat completion request; the
+        payload is a list of chunks for streaming requests
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            error = self._injected_error()
+            if error is None:
+                content = self.synthesizer.synthesize(body)
+                first_token = self._sample_latency()
+
+        if error is not None:
+            return error
+
+        prompt_tokens = self._count_tokens("".join(str(m.get("content") or "") for m in body.get("messages", [])))
+        completion_tokens = self._count_tokens(content)
+        latency = first_token + completion_tokens * self.config.LLM_SIMULATOR_SECONDS_PER_TOKEN
+
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["latency_total"] += latency
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+
+        if body.get("stream"):
+            time.sleep(first_token)
+            return 200, {}, self._chunks(body, content, usage)
+
+        time.sleep(latency)
+        return 200, {}, {
+            "id": f"chatcmpl-sim-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", self.config.OPENAI_MODEL),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }],
+            "usage": usage
+        }
+
+    def start(self) -> "LLMSimulator":
+        """Serve on a background thread, e.g. from a benchmark script"""
+        self._server = self._create_server()
+        threading.Thread(target=self._server.serve_forever, name="llm-simulator", daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        self._server = self._create_server()
+        print(f"LLM simulator listening on {self.base_url}")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        """Stop a server started with start()"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request, error and token counters"""
+        with self._lock:
+            stats = dict(self.stats)
+        served = stats["requests"] - stats["rate_limited"] - stats["server_errors"]
+        stats["latency_mean"] = stats["latency_total"] / served if served else 0.0
+        return stats
+
+    def _injected_error(self) -> Optional[Tuple[int, Dict[str, str], Any]]:
+        """A 429 or 5xx response when the limits or the injection rates call for one"""
+        if self.requests is not None:
+            now = time.monotonic()
+            self.requests.refill(now)
+            wait = self.requests.wait_time(1)
+            if wait > 0:
+                self.stats["rate_limited"] += 1
+                return self._error(429, "rate_limit_exceeded", "Rate limit reached for requests", math.ceil(wait))
+            self.requests.tokens -= 1
+
+        draw = self.rng.random()
+        if draw < self.config.LLM_SIMULATOR_RATE_LIMIT_RATE:
+            self.stats["rate_limited"] += 1
+            return self._error(429, "rate_limit_exceeded", "Rate limit reached for requests",
+                               self.config.LLM_SIMULATOR_RETRY_AFTER)
+        if draw < self.config.LLM_SIMULATOR_RATE_LIMIT_RATE + self.config.LLM_SIMULATOR_SERVER_ERROR_RATE:
+            self.stats["server_errors"] += 1
+            return self._error(self.rng.choice([500, 502, 503]), "server_error", "The server had an error")
+        return None
+
+    @staticmethod
+    def _error(status: int, error_type: str, message: str,
+               retry_after: Optional[int] = None) -> Tuple[int, Dict[str, str], Any]:
+        """An error response in the OpenAI error format"""
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        return status, headers, {"error": {"message": message, "type": error_type, "code": error_type}}
+
+    def _sample_latency(self) -> float:
+        """Time to first token from the configured distribution. Caller holds the lock."""
+        median = self.config.LLM_SIMULATOR_LATENCY_MEDIAN
+        distribution = self.config.LLM_SIMULATOR_LATENCY_DISTRIBUTION
+
+        if distribution == "fixed":
+            return median
+        if distribution == "uniform":
+            return self.rng.uniform(0, 2 * median)
+        return median * math.exp(self.config.LLM_SIMULATOR_LATENCY_SIGMA * self.rng.gauss(0, 1))
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        """~4 characters per token"""
+        return max(len(text) // 4, 1)
+
+    def _chunks(self, body: Dict[str, Any], content: str, usage: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Streaming chunks of about one token each, ending with a usage chunk"""
+        completion_id = f"chatcmpl-sim-{uuid.uuid4().hex}"
+        model = body.get("model", self.config.OPENAI_MODEL)
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+
+        pieces = [content[start:start + 4] for start in range(0, len(content), 4)]
+        chunks = [chunk({"role": "assistant", "content": ""})]
+        chunks.extend(chunk({"content": piece}) for piece in pieces)
+        chunks.append(chunk({}, "stop"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunks.append({**chunk({}), "choices": [], "usage": usage})
+        return chunks
+
+    def _create_server(self) -> ThreadingHTTPServer:
+        """HTTP server whose handler routes requests to this simulator"""
+        handler = type("Handler", (_SimulatorHandler,), {"simulator": self})
+        server = ThreadingHTTPServer((self.host, self.port), handler)
+        server.daemon_threads = True
+        self.port = server.server_address[1]
+        return server
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    """HTTP front end of LLMSimulator"""
+
+    simulator: LLMSimulator
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {}, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+            return
+
+        length = int(self.headers.get("content-length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {}, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        status, headers, payload = self.simulator.handle(body)
+        if status == 200 and isinstance(payload, list):
+            self._send_stream(payload)
+        else:
+            self._send_json(status, headers, payload)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path.endswith("/stats"):
+            self._send_json(200, {}, self.simulator.get_stats())
+        elif path.endswith("/models"):
+            models = [{"id": model, "object": "model", "owned_by": "simulator"} for model in Config.LLM_PRICING]
+            self._send_json(200, {}, {"object": "list", "data": models})
+        else:
+            self._send_json(404, {}, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+    def log_message(self, format, *args):
+        """Keep the console quiet under load"""
+
+    def _send_json(self, status: int, headers: Dict[str, str], payload: Any):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, chunks: List[Dict[str, Any]]):
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(Config.LLM_SIMULATOR_SECONDS_PER_TOKEN)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM simulator")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    LLMSimulator(args.host, args.port, args.seed).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
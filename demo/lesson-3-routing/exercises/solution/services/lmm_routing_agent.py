@@ -6,13 +6,306 @@ routing to specialized LLMs and handles final processing.
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Literal, Optional
 from openai import OpenAI
+from services.llm_client import LLMClientRegistry, create_chat_completion
+from services.model_cascade import ModelCascade
+from services.prompt_templates import PromptRegistry, PromptTemplate
+from services.resilience import CircuitOpenError
+from services.response_parser import LLMResponse, ResponseSchema
 
 from services.swift_message import SWIFTMessage
 from config import Config
 
 
+Severity = Literal["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+
+class RoutingDecisionResponse(LLMResponse):
+    specialist_llm: Literal["PROCESSING", "FRAUD_DETECTION", "BALANCE_CHECK", "MESSAGE_VALIDATION"]
+    routing_reason: str = ""
+    priority: Optional[Literal["HIGH", "MEDIUM", "LOW"]] = None
+    key_concerns: List[str] = []
+    confidence: Optional[float] = None
+
+
+class ProcessingResponse(LLMResponse):
+    processing_decision: Literal["APPROVE", "HOLD", "REJECT"]
+    compliance_status: Optional[Literal["COMPLIANT", "NON_COMPLIANT", "REVIEW_REQUIRED"]] = None
+    recommendations: List[str] = []
+
+
+class FraudDetectionResponse(LLMResponse):
+    fraud_risk: Severity
+    fraud_score: Optional[float] = None
+    fraud_indicators: List[str] = []
+    recommended_action: Optional[Literal["APPROVE", "INVESTIGATE", "REJECT", "ESCALATE"]] = None
+    confidence_level: Optional[float] = None
+
+
+class BalanceCheckResponse(LLMResponse):
+    balance_status: Literal["SUFFICIENT", "INSUFFICIENT", "MARGINAL", "UNKNOWN"]
+    authorization_needed: Optional[Literal["NONE", "MANAGER", "SENIOR", "BOARD"]] = None
+    recommendations: List[str] = []
+
+
+class MessageValidationResponse(LLMResponse):
+    validation_status: Literal["VALID", "INVALID", "WARNING", "CORRECTABLE"]
+    format_errors: List[str] = []
+    compliance_issues: List[str] = []
+    severity: Optional[Severity] = None
+    can_auto_correct: Optional[bool] = None
+
+
+class FinalProcessingResponse(LLMResponse):
+    final_decision: Literal["APPROVE", "REJECT", "HOLD", "ESCALATE"]
+    decision_confidence: Optional[float] = None
+    processing_status: Optional[Literal["COMPLETED", "PENDING", "FAILED", "REVIEW_REQUIRED"]] = None
+    fraud_status: Optional[Literal["CLEAN", "SUSPICIOUS", "FRAUDULENT", "HELD"]] = None
+    escalation_needed: Optional[bool] = None
+
+
+ROUTING_DECISION = ResponseSchema("routing_decision", RoutingDecisionResponse)
+PROCESSING = ResponseSchema("processing", ProcessingResponse)
+FRAUD_DETECTION = ResponseSchema("fraud_detection", FraudDetectionResponse)
+BALANCE_CHECK = ResponseSchema("balance_check", BalanceCheckResponse)
+MESSAGE_VALIDATION = ResponseSchema("message_validation", MessageValidationResponse)
+FINAL_PROCESSING = ResponseSchema("final_processing", FinalProcessingResponse)
+
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.main_llm_initial_analysis",
+    system="""
+        You are the Main LLM Coordinator for SWIFT transaction processing. Your role is to analyze incoming messages and route them to the appropriate specialist LLM for detailed processing. Be decisive and accurate in your routing.
+    """,
+    instructions="""
+        Analyze this SWIFT message and determine which specialized processing is needed.
+
+        Choose ONE of these specialized processors:
+        1. PROCESSING - For standard transaction processing
+        2. FRAUD_DETECTION - For suspicious patterns or high-risk transactions
+        3. BALANCE_CHECK - For verifying account balances and funds availability
+        4. MESSAGE_VALIDATION - For format issues or compliance violations
+
+        Respond with JSON:
+        {
+            "specialist_llm": "PROCESSING|FRAUD_DETECTION|BALANCE_CHECK|MESSAGE_VALIDATION",
+            "routing_reason": "Brief explanation of why this specialist was chosen",
+            "priority": "HIGH|MEDIUM|LOW",
+            "key_concerns": ["list", "of", "main", "issues", "to", "address"],
+            "analysis_summary": "Summary of initial message analysis",
+            "confidence": 0.0-1.0
+        }
+    """,
+    dynamic="""
+        SWIFT Message Details:
+        - Message ID: {message.message_id}
+        - Type: {message.message_type}
+        - Amount: {message.currency} {message.amount}
+        - From: {message.sender_bic}
+        - To: {message.receiver_bic}
+        - Reference: {message.reference}
+        - Value Date: {message.value_date}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.processing_llm",
+    system="""
+        You are the Processing Specialist LLM. Your expertise is in standard SWIFT transaction processing, compliance checks, fee calculations, and processing workflows. Focus on efficient and compliant transaction processing.
+    """,
+    instructions="""
+        Process this SWIFT transaction for completion.
+
+        Perform standard processing checks:
+        - Transaction limits and restrictions
+        - Business hours and processing windows
+        - Regulatory compliance requirements
+        - Standard processing fees and calculations
+
+        Respond with JSON:
+        {
+            "processing_decision": "APPROVE|HOLD|REJECT",
+            "processing_notes": "Detailed processing analysis",
+            "fees_calculated": "Processing fees if applicable",
+            "compliance_status": "COMPLIANT|NON_COMPLIANT|REVIEW_REQUIRED",
+            "estimated_processing_time": "Time estimate for completion",
+            "recommendations": ["list", "of", "recommendations"]
+        }
+    """,
+    dynamic="""
+        Transaction Details:
+        - ID: {message.message_id}
+        - Type: {message.message_type}
+        - Amount: {message.currency} {message.amount}
+        - Route: {message.sender_bic} → {message.receiver_bic}
+        - Reference: {message.reference}
+
+        Key Concerns from Main LLM: {key_concerns}
+        Priority: {priority}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.fraud_detection_llm",
+    system="""
+        You are the Fraud Detection Specialist LLM. Your expertise is in identifying fraudulent patterns, money laundering schemes, and suspicious transaction behaviors in SWIFT messages. Be thorough and vigilant.
+    """,
+    instructions="""
+        Analyze this SWIFT transaction for fraud indicators and suspicious patterns.
+
+        Perform deep fraud analysis:
+        - Amount patterns and structuring indicators
+        - Geographic risk factors
+        - BIC code analysis and reputation
+        - Transaction timing patterns
+        - Reference pattern analysis
+        - Value date anomalies
+
+        Respond with JSON:
+        {
+            "fraud_risk": "LOW|MEDIUM|HIGH|CRITICAL",
+            "fraud_score": 0.0-1.0,
+            "fraud_indicators": ["list", "of", "specific", "indicators"],
+            "risk_factors": ["geographic", "temporal", "behavioral", "technical"],
+            "recommended_action": "APPROVE|INVESTIGATE|REJECT|ESCALATE",
+            "confidence_level": 0.0-1.0,
+            "investigation_notes": "Detailed fraud analysis findings"
+        }
+    """,
+    dynamic="""
+        Transaction Details:
+        - ID: {message.message_id}
+        - Type: {message.message_type}
+        - Amount: {message.currency} {message.amount}
+        - Route: {message.sender_bic} → {message.receiver_bic}
+        - Reference: {message.reference}
+        - Value Date: {message.value_date}
+
+        Key Concerns from Main LLM: {key_concerns}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.balance_check_llm",
+    system="""
+        You are the Balance Check Specialist LLM. Your expertise is in verifying account balances, funds availability, credit facilities, and ensuring sufficient funds for SWIFT transactions. Be precise and conservative.
+    """,
+    instructions="""
+        Verify funds availability and account balance for this SWIFT transaction.
+
+        Perform balance verification:
+        - Account balance sufficiency
+        - Available vs. total balance
+        - Pending transaction impacts
+        - Credit facilities and overdraft limits
+        - Multi-currency balance considerations
+        - Regulatory reserve requirements
+
+        Respond with JSON:
+        {
+            "balance_status": "SUFFICIENT|INSUFFICIENT|MARGINAL|UNKNOWN",
+            "available_balance": "Estimated available balance",
+            "required_amount": "Amount needed for transaction",
+            "balance_after_transaction": "Projected balance after transaction",
+            "overdraft_required": true/false,
+            "authorization_needed": "NONE|MANAGER|SENIOR|BOARD",
+            "balance_notes": "Detailed balance analysis",
+            "recommendations": ["balance", "related", "recommendations"]
+        }
+    """,
+    dynamic="""
+        Transaction Details:
+        - ID: {message.message_id}
+        - Amount: {message.currency} {message.amount}
+        - Sender: {message.sender_bic}
+        - Receiver: {message.receiver_bic}
+
+        Key Concerns from Main LLM: {key_concerns}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.message_validation_llm",
+    system="""
+        You are the Message Validation Specialist LLM. Your expertise is in SWIFT message format validation, compliance checking, and ensuring messages meet all technical and regulatory requirements. Be thorough and precise.
+    """,
+    instructions="""
+        Validate this SWIFT message format and compliance requirements.
+
+        Perform comprehensive validation:
+        - SWIFT message format compliance
+        - BIC code format and validity
+        - Currency code validation
+        - Amount format and precision
+        - Value date format and business rules
+        - Reference format and uniqueness
+        - Regulatory compliance requirements
+
+        Respond with JSON:
+        {
+            "validation_status": "VALID|INVALID|WARNING|CORRECTABLE",
+            "format_errors": ["list", "of", "format", "errors"],
+            "compliance_issues": ["regulatory", "compliance", "issues"],
+            "suggested_corrections": {"field": "corrected_value"},
+            "severity": "LOW|MEDIUM|HIGH|CRITICAL",
+            "can_auto_correct": true/false,
+            "validation_notes": "Detailed validation analysis",
+            "next_steps": ["required", "actions"]
+        }
+    """,
+    dynamic="""
+        Message Details:
+        - ID: {message.message_id}
+        - Type: {message.message_type}
+        - Amount: {message.currency} {message.amount}
+        - Sender BIC: {message.sender_bic}
+        - Receiver BIC: {message.receiver_bic}
+        - Reference: {message.reference}
+        - Value Date: {message.value_date}
+
+        Key Concerns from Main LLM: {key_concerns}
+    """
+))
+
+PromptRegistry.register(PromptTemplate(
+    name="routing.main_llm_final_processing",
+    system="""
+        You are the Main LLM Coordinator completing final processing. Your role is to synthesize specialist recommendations and make final decisions on SWIFT transactions. Be decisive and comprehensive.
+    """,
+    instructions="""
+        Complete final processing for this SWIFT transaction based on specialist analysis.
+
+        Make final decision considering:
+        - Specialist LLM recommendations
+        - Overall transaction risk
+        - Regulatory compliance
+        - Business impact
+        - Processing efficiency
+
+        Respond with JSON:
+        {
+            "final_decision": "APPROVE|REJECT|HOLD|ESCALATE",
+            "decision_confidence": 0.0-1.0,
+            "processing_status": "COMPLETED|PENDING|FAILED|REVIEW_REQUIRED",
+            "fraud_status": "CLEAN|SUSPICIOUS|FRAUDULENT|HELD",
+            "final_notes": "Comprehensive final analysis",
+            "action_items": ["required", "follow", "up", "actions"],
+            "escalation_needed": true/false,
+            "processing_time_estimate": "Estimated completion time"
+        }
+    """,
+    dynamic="""
+        Original Message: {message.message_id}
+        Initial Routing: {specialist}
+        Routing Reason: {routing_reason}
+
+        Specialist LLM Results:
+        {specialist_results}
+    """
+))
+
+
 class LLMRoutingAgent:
     """
     LLM-based routing agent that uses a main LLM to coordinate routing to specialized LLMs.
@@ -20,11 +313,11 @@ class LLMRoutingAgent:
     Flow: Message → Main LLM → Specialized LLM → Main LLM → Complete
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[OpenAI] = None):
         self.config = Config()
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        # Use the injected client, or the shared pooled one
+        self.client = client or LLMClientRegistry.get_client()
         self.model = self.config.OPENAI_MODEL
     
     def route_message(self, message: SWIFTMessage) -> SWIFTMessage:
@@ -55,58 +348,12 @@ class LLMRoutingAgent:
         """
         Main LLM analyzes the message and determines which specialized LLM to route to
         """
-        prompt = f"""
-Analyze this SWIFT message and determine which specialized processing is needed.
-
-SWIFT Message Details:
-- Message ID: {message.message_id}
-- Type: {message.message_type}
-- Amount: {message.currency} {message.amount}
-- From: {message.sender_bic}
-- To: {message.receiver_bic}
-- Reference: {message.reference}
-- Value Date: {message.value_date}
-
-Choose ONE of these specialized processors:
-1. PROCESSING - For standard transaction processing
-2. FRAUD_DETECTION - For suspicious patterns or high-risk transactions
-3. BALANCE_CHECK - For verifying account balances and funds availability
-4. MESSAGE_VALIDATION - For format issues or compliance violations
-
-Respond with JSON:
-{{
-    "specialist_llm": "PROCESSING|FRAUD_DETECTION|BALANCE_CHECK|MESSAGE_VALIDATION",
-    "routing_reason": "Brief explanation of why this specialist was chosen",
-    "priority": "HIGH|MEDIUM|LOW",
-    "key_concerns": ["list", "of", "main", "issues", "to", "address"],
-    "analysis_summary": "Summary of initial message analysis"
-}}
-"""
+        messages = PromptRegistry.get_shared().render("routing.main_llm_initial_analysis", message=message)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Main LLM Coordinator for SWIFT transaction processing. "
-                        "Your role is to analyze incoming messages and route them to the appropriate "
-                        "specialist LLM for detailed processing. Be decisive and accurate in your routing."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            result = json.loads(response.choices[0].message.content or "{}")
+            return self._complete("main_llm_initial_analysis", message, messages, ROUTING_DECISION)
             
-            return result
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             # Default to processing if analysis fails
             return {
                 "specialist_llm": "PROCESSING",
@@ -138,60 +385,17 @@ Respond with JSON:
         """
         Processing LLM - Handles standard transaction processing
         """
-        prompt = f"""
-Process this SWIFT transaction for completion.
-
-Transaction Details:
-- ID: {message.message_id}
-- Type: {message.message_type}
-- Amount: {message.currency} {message.amount}
-- Route: {message.sender_bic} → {message.receiver_bic}
-- Reference: {message.reference}
-
-Key Concerns from Main LLM: {routing_decision.get('key_concerns', [])}
-Priority: {routing_decision.get('priority', 'MEDIUM')}
-
-Perform standard processing checks:
-- Transaction limits and restrictions
-- Business hours and processing windows
-- Regulatory compliance requirements
-- Standard processing fees and calculations
-
-Respond with JSON:
-{{
-    "processing_decision": "APPROVE|HOLD|REJECT",
-    "processing_notes": "Detailed processing analysis",
-    "fees_calculated": "Processing fees if applicable",
-    "compliance_status": "COMPLIANT|NON_COMPLIANT|REVIEW_REQUIRED",
-    "estimated_processing_time": "Time estimate for completion",
-    "recommendations": ["list", "of", "recommendations"]
-}}
-"""
+        messages = PromptRegistry.get_shared().render(
+            "routing.processing_llm",
+            message=message,
+            key_concerns=routing_decision.get('key_concerns', []),
+            priority=routing_decision.get('priority', 'MEDIUM')
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Processing Specialist LLM. Your expertise is in standard "
-                        "SWIFT transaction processing, compliance checks, fee calculations, and processing "
-                        "workflows. Focus on efficient and compliant transaction processing."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            return self._complete("processing_llm", message, messages, PROCESSING)
             
-            result = json.loads(response.choices[0].message.content or "{}")
-            
-            return result
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {
                 "processing_decision": "HOLD",
                 "processing_notes": f"Processing LLM error: {str(e)}",
@@ -203,63 +407,16 @@ Respond with JSON:
         """
         Fraud Detection LLM - Specializes in detecting fraudulent patterns
         """
-        prompt = f"""
-Analyze this SWIFT transaction for fraud indicators and suspicious patterns.
-
-Transaction Details:
-- ID: {message.message_id}
-- Type: {message.message_type}
-- Amount: {message.currency} {message.amount}
-- Route: {message.sender_bic} → {message.receiver_bic}
-- Reference: {message.reference}
-- Value Date: {message.value_date}
-
-Key Concerns from Main LLM: {routing_decision.get('key_concerns', [])}
-
-Perform deep fraud analysis:
-- Amount patterns and structuring indicators
-- Geographic risk factors
-- BIC code analysis and reputation
-- Transaction timing patterns
-- Reference pattern analysis
-- Value date anomalies
-
-Respond with JSON:
-{{
-    "fraud_risk": "LOW|MEDIUM|HIGH|CRITICAL",
-    "fraud_score": 0.0-1.0,
-    "fraud_indicators": ["list", "of", "specific", "indicators"],
-    "risk_factors": ["geographic", "temporal", "behavioral", "technical"],
-    "recommended_action": "APPROVE|INVESTIGATE|REJECT|ESCALATE",
-    "confidence_level": 0.0-1.0,
-    "investigation_notes": "Detailed fraud analysis findings"
-}}
-"""
+        messages = PromptRegistry.get_shared().render(
+            "routing.fraud_detection_llm",
+            message=message,
+            key_concerns=routing_decision.get('key_concerns', [])
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Fraud Detection Specialist LLM. Your expertise is in "
-                        "identifying fraudulent patterns, money laundering schemes, and suspicious "
-                        "transaction behaviors in SWIFT messages. Be thorough and vigilant."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            result = json.loads(response.choices[0].message.content or "{}")
-            
-            return result
+            return self._complete("fraud_detection_llm", message, messages, FRAUD_DETECTION)
             
-        except Exception as e:
+        except CircuitOpenError as e:
             return {
                 "fraud_risk": "HIGH",
                 "fraud_score": 0.8,
@@ -272,62 +429,16 @@ Respond with JSON:
         """
         Balance Check LLM - Verifies account balances and funds availability
         """
-        prompt = f"""
-Verify funds availability and account balance for this SWIFT transaction.
-
-Transaction Details:
-- ID: {message.message_id}
-- Amount: {message.currency} {message.amount}
-- Sender: {message.sender_bic}
-- Receiver: {message.receiver_bic}
-
-Key Concerns from Main LLM: {routing_decision.get('key_concerns', [])}
-
-Perform balance verification:
-- Account balance sufficiency
-- Available vs. total balance
-- Pending transaction impacts
-- Credit facilities and overdraft limits
-- Multi-currency balance considerations
-- Regulatory reserve requirements
-
-Respond with JSON:
-{{
-    "balance_status": "SUFFICIENT|INSUFFICIENT|MARGINAL|UNKNOWN",
-    "available_balance": "Estimated available balance",
-    "required_amount": "Amount needed for transaction",
-    "balance_after_transaction": "Projected balance after transaction",
-    "overdraft_required": true/false,
-    "authorization_needed": "NONE|MANAGER|SENIOR|BOARD",
-    "balance_notes": "Detailed balance analysis",
-    "recommendations": ["balance", "related", "recommendations"]
-}}
-"""
+        messages = PromptRegistry.get_shared().render(
+            "routing.balance_check_llm",
+            message=message,
+            key_concerns=routing_decision.get('key_concerns', [])
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Balance Check Specialist LLM. Your expertise is in "
-                        "verifying account balances, funds availability, credit facilities, and "
-                        "ensuring sufficient funds for SWIFT transactions. Be precise and conservative."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            result = json.loads(response.choices[0].message.content or "{}")
+            return self._complete("balance_check_llm", message, messages, BALANCE_CHECK)
             
-            return result
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {
                 "balance_status": "UNKNOWN",
                 "authorization_needed": "MANAGER",
@@ -339,66 +450,16 @@ Respond with JSON:
         """
         Message Validation LLM - Checks message format and compliance
         """
-        prompt = f"""
-Validate this SWIFT message format and compliance requirements.
-
-Message Details:
-- ID: {message.message_id}
-- Type: {message.message_type}
-- Amount: {message.currency} {message.amount}
-- Sender BIC: {message.sender_bic}
-- Receiver BIC: {message.receiver_bic}
-- Reference: {message.reference}
-- Value Date: {message.value_date}
-
-Key Concerns from Main LLM: {routing_decision.get('key_concerns', [])}
-
-Perform comprehensive validation:
-- SWIFT message format compliance
-- BIC code format and validity
-- Currency code validation
-- Amount format and precision
-- Value date format and business rules
-- Reference format and uniqueness
-- Regulatory compliance requirements
-
-Respond with JSON:
-{{
-    "validation_status": "VALID|INVALID|WARNING|CORRECTABLE",
-    "format_errors": ["list", "of", "format", "errors"],
-    "compliance_issues": ["regulatory", "compliance", "issues"],
-    "suggested_corrections": {{"field": "corrected_value"}},
-    "severity": "LOW|MEDIUM|HIGH|CRITICAL",
-    "can_auto_correct": true/false,
-    "validation_notes": "Detailed validation analysis",
-    "next_steps": ["required", "actions"]
-}}
-"""
+        messages = PromptRegistry.get_shared().render(
+            "routing.message_validation_llm",
+            message=message,
+            key_concerns=routing_decision.get('key_concerns', [])
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Message Validation Specialist LLM. Your expertise is in "
-                        "SWIFT message format validation, compliance checking, and ensuring messages "
-                        "meet all technical and regulatory requirements. Be thorough and precise."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            return self._complete("message_validation_llm", message, messages, MESSAGE_VALIDATION)
             
-            result = json.loads(response.choices[0].message.content or "{}")
-            
-            return result
-            
-        except Exception as e:
+        except CircuitOpenError as e:
             return {
                 "validation_status": "INVALID",
                 "format_errors": [f"Validation LLM error: {str(e)}"],
@@ -412,60 +473,18 @@ Respond with JSON:
         """
         Main LLM performs final processing after receiving specialized LLM results
         """
-        prompt = f"""
-Complete final processing for this SWIFT transaction based on specialist analysis.
-
-Original Message: {message.message_id}
-Initial Routing: {routing_decision.get('specialist_llm', 'UNKNOWN')}
-Routing Reason: {routing_decision.get('routing_reason', 'Unknown')}
-
-Specialist LLM Results:
-{json.dumps(specialized_result, indent=2)}
-
-Make final decision considering:
-- Specialist LLM recommendations
-- Overall transaction risk
-- Regulatory compliance
-- Business impact
-- Processing efficiency
-
-Respond with JSON:
-{{
-    "final_decision": "APPROVE|REJECT|HOLD|ESCALATE",
-    "decision_confidence": 0.0-1.0,
-    "processing_status": "COMPLETED|PENDING|FAILED|REVIEW_REQUIRED",
-    "fraud_status": "CLEAN|SUSPICIOUS|FRAUDULENT|HELD",
-    "final_notes": "Comprehensive final analysis",
-    "action_items": ["required", "follow", "up", "actions"],
-    "escalation_needed": true/false,
-    "processing_time_estimate": "Estimated completion time"
-}}
-"""
+        messages = PromptRegistry.get_shared().render(
+            "routing.main_llm_final_processing",
+            message=message,
+            specialist=routing_decision.get('specialist_llm', 'UNKNOWN'),
+            routing_reason=routing_decision.get('routing_reason', 'Unknown'),
+            specialist_results=json.dumps(specialized_result, indent=2)
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are the Main LLM Coordinator completing final processing. "
-                        "Your role is to synthesize specialist recommendations and make final "
-                        "decisions on SWIFT transactions. Be decisive and comprehensive."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            result = json.loads(response.choices[0].message.content or "{}")
-            
-            return result
+            return self._complete("main_llm_final_processing", message, messages, FINAL_PROCESSING)
             
-        except Exception as e:
+        except CircuitOpenError as e:
             return {
                 "final_decision": "HOLD",
                 "processing_status": "REVIEW_REQUIRED",
@@ -496,4 +515,26 @@ Respond with JSON:
         # Add final notes to validation errors for tracking
         final_notes = final_result.get('final_notes', 'LLM processing completed')
         if final_notes:
-            message.validation_errors.append(f"LLM Processing: {final_notes}")
\ No newline at end of file
+            message.validation_errors.append(f"LLM Processing: {final_notes}")
+    
+    def _complete(self, step: str, message: SWIFTMessage, messages: List[Dict[str, str]],
+                  schema: ResponseSchema) -> Dict[str, Any]:
+        """
+        Run one LLM step through the model cascade and return the parsed
+        response. The step methods fall back only on CircuitOpenError; any
+        other failure aborts the routing and is recorded on the message.
+        """
+        def send(model: str) -> Optional[str]:
+            response = create_chat_completion(
+                self.client,
+                agent="LLMRoutingAgent",
+                step=step,
+                message_id=message.message_id,
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            return response.choices[0].message.content
+        
+        return ModelCascade.get_shared().run(step, schema, send, self.model)
@@ -1,16 +1,36 @@
 
 from services.llm_service import LLMService
+from services.llm_client import create_chat_completion
+from services.prompt_serializer import PromptSerializer, FRAUD_AMOUNT_FIELDS, FRAUD_PATTERN_FIELDS
+from services.response_parser import LLMResponse, ResponseParser, ResponseSchema
 from config import Config
 from models.swift_message import SWIFTMessage
-from typing import Dict, List, Tuple, Any
-import json
+from typing import Dict, List, Tuple, Any, Optional
+
+
+# Free-text fields checked by the misspelling rule
+SPELLING_FIELDS = ["ordering_customer", "beneficiary", "remittance_info"]
+
+
+class SpellingCheckResponse(LLMResponse):
+    misspelled: bool
+    words: List[str] = []
+
+
+class FraudAggregateResponse(LLMResponse):
+    thought: str = ""
+    total_fraud_score: float
+
+
+SPELLING_CHECK = ResponseSchema("spelling_check", SpellingCheckResponse)
+FRAUD_AGGREGATE = ResponseSchema("fraud_aggregate", FraudAggregateResponse)
 
     
 class FraudAmountDetectionAgent:
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
         
     def create_prompt(self, message: SWIFTMessage)-> str:
         """
@@ -20,7 +40,7 @@ class FraudAmountDetectionAgent:
 
 Please grade the following SWIFT message for fraud using the rules below.
 
-{message}
+{PromptSerializer.serialize(message, FRAUD_AMOUNT_FIELDS)}
 
 Rules 
 
@@ -33,11 +53,15 @@ Please return your evaluation of the risk according to the rules plus the total
 """
         return prompt
     
-    def respond(self, prompt: str) -> Dict[str, Any]:
+    def respond(self, prompt: str, message_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get SWIFT message corrections from LLM
         """
-        response = self.llm_service.client.chat.completions.create(
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudAmountDetectionAgent",
+            step="respond",
+            message_id=message_id,
             model=self.llm_service.model,
             messages=[
                 {
@@ -60,9 +84,9 @@ Please return your evaluation of the risk according to the rules plus the total
     
 class FraudPatternDetectionAgent:
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
         
     def create_prompt(self, message: SWIFTMessage)-> str:
         """
@@ -72,7 +96,7 @@ class FraudPatternDetectionAgent:
 
 Please grade the following SWIFT message for fraud using the rules below to detect risk risky fraud patterns.
 
-{message}
+{PromptSerializer.serialize(message, FRAUD_PATTERN_FIELDS)}
 
 Rules 
 
@@ -86,11 +110,15 @@ Please return your evaluation of the risk according to the rules plus the total
 """
         return prompt
     
-    def respond(self, prompt: str) -> Dict[str, Any]:
+    def respond(self, prompt: str, message_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get SWIFT message corrections from LLM
         """
-        response = self.llm_service.client.chat.completions.create(
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudPatternDetectionAgent",
+            step="respond",
+            message_id=message_id,
             model=self.llm_service.model,
             messages=[
                 {
@@ -111,13 +139,62 @@ Please return your evaluation of the risk according to the rules plus the total
         
         return result
     
+    def has_free_text(self, message: SWIFTMessage) -> bool:
+        """
+        Whether the message has free-text fields the misspelling rule can check
+        """
+        return any(getattr(message, field, None) for field in SPELLING_FIELDS)
+    
+    def check_spelling(self, message: SWIFTMessage) -> Dict[str, Any]:
+        """
+        Ask the LLM only about the misspelling rule, which needs language understanding
+        """
+        fields = "\n".join(
+            f"{field}: {getattr(message, field)}"
+            for field in SPELLING_FIELDS if getattr(message, field, None)
+        )
+        prompt = f"""
+
+Check the following free-text fields of a SWIFT message for misspelled words.
+Names of people, companies and places are not misspellings.
+
+{fields}
+
+Respond in JSON with "misspelled" (true or false) and "words" listing any misspelled words.
+
+"""
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudPatternDetectionAgent",
+            step="check_spelling",
+            message_id=message.message_id,
+            model=self.llm_service.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a SWIFT message fraud detection expert. "
+                    "Your task is to investigate SWIFT messages for possibilities of fraud"
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            response_format={"type": "json_object"},
+            temperature=0
+        )
+        
+        result = ResponseParser.parse_response(SPELLING_CHECK, response.choices[0].message.content)
+        
+        return result
+    
 class FraudAggAgent:
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
         
-    def create_prompt(self, message: SWIFTMessage) -> str:
+    def create_prompt(self, statements: List[Dict[str, Any]]) -> str:
         """
         Create prompt for LLM correction
         """
@@ -125,7 +202,7 @@ class FraudAggAgent:
 
 Please review the following messages and tell me if a Swift transaction with these messages is fraudulent or not.
 
-{message}
+{PromptSerializer.serialize_data(statements)}
 
 Please respond in json format with "thought" that contains the final review and "total_fraud_score" which contains your assessment from 1 to 100
 on what you think the fraud score should be.  100 being highest. 
@@ -133,11 +210,15 @@ on what you think the fraud score should be.  100 being highest.
 """
         return prompt
     
-    def respond(self, prompt: str) -> Dict[str, Any]:
+    def respond(self, prompt: str, message_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get SWIFT message corrections from LLM
         """
-        response = self.llm_service.client.chat.completions.create(
+        response = create_chat_completion(
+            self.llm_service.client,
+            agent="FraudAggAgent",
+            step="respond",
+            message_id=message_id,
             model=self.llm_service.model,
             messages=[
                 {
@@ -154,7 +235,7 @@ on what you think the fraud score should be.  100 being highest.
             temperature=0
         )
         
-        result = json.loads(response.choices[0].message.content or "{}")
+        result = ResponseParser.parse_response(FRAUD_AGGREGATE, response.choices[0].message.content)
          
         return result
     
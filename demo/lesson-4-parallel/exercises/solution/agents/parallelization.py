@@ -2,12 +2,17 @@
 Parallelization Agent Pattern for concurrent SWIFT message processing
 """
 
-from typing import List, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 import time
+from functools import partial
 
 from models.swift_message import SWIFTMessage
+from models.swift_batch import SWIFTBatch
 from config import Config
+from services.llm_service import LLMService
+from services.deferred_batch import DeferredBatch, DeferredRequest
+from services.fraud_rules import FraudRuleEngine
 from agents.base_agents import FraudAmountDetectionAgent, FraudPatternDetectionAgent, FraudAggAgent
 
 
@@ -16,46 +21,104 @@ class ParallelizationAgent:
     Parallelization pattern implementation for processing multiple SWIFT messages concurrently
     """
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
         self.max_workers = self.config.MAX_WORKERS
         self.batch_size = self.config.BATCH_SIZE
+        
+        # Agents hold no per-message state, so one instance of each is reused
+        self.llm_service = llm_service or LLMService()
+        self.fraud_agents = [
+            FraudAmountDetectionAgent(self.llm_service),
+            FraudPatternDetectionAgent(self.llm_service)
+        ]
+        self.fraud_supervisor = FraudAggAgent(self.llm_service)
+        self.rule_engine = FraudRuleEngine()
+        
+        # One long-lived pool shared by every call, sized by MAX_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fraud-agent")
     
     def process_messages_parallel(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
         """
-        Process messages in parallel using threading
+        Process messages in parallel using threading.
+        
+        Every detector call of a batch is submitted to the shared pool at once,
+        so up to MAX_WORKERS LLM calls run across messages. Batches of
+        BATCH_SIZE messages bound how much work is queued at a time, and results
+        are attached to their message as they complete.
         """
 
         processed_messages = []
         
-        for msg in messages:
-        
-            list_of_agents = [FraudAmountDetectionAgent(), FraudPatternDetectionAgent()]
-
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit batch processing tasks
-                future_to_batch = {
-                    executor.submit(self._process_msg, msg, agent): agent_idx
-                    for agent_idx, agent in enumerate(list_of_agents)
-                }
+        for batch_start in range(0, len(messages), self.batch_size):
+            batch = messages[batch_start:batch_start + self.batch_size]
+            
+            future_to_msg = {
+                self.executor.submit(task): batch[position]
+                for position, task in self._start_detection(batch)
+            }
+            
+            # Collect results as they complete
+            for future in as_completed(future_to_msg):
+                msg = future_to_msg[future]
                 
-                # Collect results as they complete
-                completed_batches = 0
-                for future in as_completed(future_to_batch):
-                    
-                    try:
-                        batch_results = future.result()
-                        msg.fraud_statements.append(batch_results)
-                        completed_batches += 1
-    
-                    except Exception as e:
-                        msg.processing_status = "ERROR"
-                        msg.validation_errors.append(f"Parallel processing error: {str(e)}")
+                try:
+                    msg.fraud_statements.append(future.result())
 
-                processed_messages.append(msg)
+                except Exception as e:
+                    msg.processing_status = "ERROR"
+                    msg.validation_errors.append(f"Parallel processing error: {str(e)}")
+            
+            processed_messages.extend(batch)
             
         return processed_messages
     
+    def _start_detection(self, batch: List[SWIFTMessage]) -> List[Tuple[int, Callable]]:
+        """
+        Start fraud detection for a batch and return the LLM calls still to run,
+        each with the position in the batch of the message it belongs to.
+        
+        With the rule engine enabled, the deterministic amount and BIC rules are
+        scored locally for the whole batch, and only messages with free text
+        need an LLM call for the misspelling rule.
+        """
+        if not self.config.FRAUD_RULE_ENGINE_ENABLED:
+            return [
+                (position, partial(self._process_msg, msg, agent))
+                for position, msg in enumerate(batch)
+                for agent in self.fraud_agents
+            ]
+        
+        pattern_agent = self.fraud_agents[1]
+        columns = SWIFTBatch.from_messages(batch)
+        amount_results = self.rule_engine.score_amount_rules(columns)
+        pattern_results = self.rule_engine.score_pattern_rules(columns)
+        
+        tasks = []
+        for position, (msg, amount_result, pattern_result) in enumerate(zip(batch, amount_results, pattern_results)):
+            msg.fraud_statements.append(amount_result)
+            
+            if self.config.FRAUD_SPELLING_CHECK_WITH_LLM and pattern_agent.has_free_text(msg):
+                tasks.append((position, partial(self._check_spelling, msg, pattern_result)))
+            else:
+                msg.fraud_statements.append(pattern_result)
+        
+        return tasks
+    
+    def _check_spelling(self, message: SWIFTMessage, pattern_result: dict) -> dict:
+        """
+        Complete a pattern breakdown with the LLM's verdict on the misspelling rule
+        """
+        print(f"Checking spelling of {message.message_id} in Parallel")
+        spelling = self.fraud_agents[1].check_spelling(message)
+        return self.rule_engine.set_rule_result(pattern_result, "Rule 3", spelling.get("misspelled", False))
+    
+    def shutdown(self):
+        """
+        Release the worker threads of the shared pool
+        """
+        self.executor.shutdown(wait=True)
+    
     def _process_msg(self, message: SWIFTMessage, fraud_agent) -> List[SWIFTMessage]:
         """
         Process a single messge with one agent
@@ -64,7 +127,7 @@ class ParallelizationAgent:
         try:
             # Process message through routing agent (includes fraud detection)
             prompt  = fraud_agent.create_prompt(message)
-            response = fraud_agent.respond(prompt)
+            response = fraud_agent.respond(prompt, message.message_id)
             
         except Exception as e:
             message.processing_status = "ERROR"
@@ -74,26 +137,110 @@ class ParallelizationAgent:
         return response
     
     def aggregrate_fraud (self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
-            """
-            Process all fraud messages and denote a message as fraud or not.
-            """
-            fraud_supervior = FraudAggAgent()
-            processed_messages = []
+        """
+        Process all fraud messages and denote a message as fraud or not.
+        """
+        return list(self.executor.map(self._aggregate_msg, messages))
+    
+    def process_messages_pipelined(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
+        """
+        Detect and aggregate fraud as one streaming pipeline.
+        
+        A message's FraudAggAgent call is queued the moment both of its detector
+        results arrive, so aggregations overlap with each other and with the
+        detection of later messages. At most BATCH_SIZE messages are in flight.
+        """
+        outstanding = {}  # message index -> detector results still to arrive
+        pending = {}      # future -> (stage, message index)
+        next_index = 0
+        
+        while next_index < len(messages) or pending:
+            # Admit new messages while the window has room
+            admit_count = min(self.batch_size - len(outstanding), len(messages) - next_index)
+            if admit_count > 0:
+                admitted = range(next_index, next_index + admit_count)
+                for index in admitted:
+                    outstanding[index] = 0
+                
+                for position, task in self._start_detection([messages[index] for index in admitted]):
+                    index = admitted[position]
+                    outstanding[index] += 1
+                    pending[self.executor.submit(task)] = ("detect", index)
+                
+                # Messages fully scored by the rule engine go straight to aggregation
+                for index in admitted:
+                    if outstanding[index] == 0:
+                        pending[self.executor.submit(self._aggregate_msg, messages[index])] = ("aggregate", index)
+                
+                next_index += admit_count
             
-            for msg in messages:    
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                stage, index = pending.pop(future)
+                msg = messages[index]
+                
+                if stage == "aggregate":
+                    del outstanding[index]
+                    continue
+                
                 try:
-                    print(f"Aggregrating fraud for {msg.message_id}")
-                    prompt = fraud_supervior.create_prompt(msg.fraud_statements)
-                    response = fraud_supervior.respond(prompt)
-                    if response['total_fraud_score'] > 50:
-                        msg.mark_as_fraudulent(response['total_score'], response['thought'])
-                    msg.fraud_status = "PROCESSED"
-                    msg.fraud_score = response['total_fraud_score']
-                    processed_messages.append(msg)
+                    msg.fraud_statements.append(future.result())
 
                 except Exception as e:
                     msg.processing_status = "ERROR"
                     msg.validation_errors.append(f"Parallel processing error: {str(e)}")
-                    processed_messages.append(msg)
-            
-            return processed_messages
\ No newline at end of file
+                
+                outstanding[index] -= 1
+                if outstanding[index] == 0:
+                    pending[self.executor.submit(self._aggregate_msg, msg)] = ("aggregate", index)
+        
+        return list(messages)
+    
+    def process_messages_deferred(self, messages: Optional[List[SWIFTMessage]] = None,
+                                  batch: Optional[DeferredBatch] = None) -> dict:
+        """
+        Run one deferred round of detection and aggregation.
+        
+        Detector requests are written to the batch request file in the first
+        round and aggregation requests in the next. Call again without
+        messages after ingesting each result file to resume from the saved
+        inputs; completed messages are keyed by message_id.
+        """
+        batch = batch or DeferredBatch()
+        return batch.run(self._process_deferred, messages)
+    
+    def _process_deferred(self, msg: SWIFTMessage) -> SWIFTMessage:
+        """
+        Detect and aggregate fraud for one message inline, queueing every
+        detector request of the message before giving up the round
+        """
+        deferred = None
+        for _, task in self._start_detection([msg]):
+            try:
+                msg.fraud_statements.append(task())
+            except DeferredRequest as e:
+                deferred = e
+        
+        if deferred is not None:
+            raise deferred
+        return self._aggregate_msg(msg)
+    
+    def _aggregate_msg(self, msg: SWIFTMessage) -> SWIFTMessage:
+        """
+        Aggregate the detector statements of one message into a fraud decision
+        """
+        try:
+            print(f"Aggregrating fraud for {msg.message_id}")
+            prompt = self.fraud_supervisor.create_prompt(msg.fraud_statements)
+            response = self.fraud_supervisor.respond(prompt, msg.message_id)
+            if response['total_fraud_score'] > 50:
+                msg.mark_as_fraudulent(response['total_fraud_score'], response['thought'])
+            msg.fraud_status = "PROCESSED"
+            msg.fraud_score = response['total_fraud_score']
+
+        except Exception as e:
+            msg.processing_status = "ERROR"
+            msg.validation_errors.append(f"Parallel processing error: {str(e)}")
+        
+        return msg
@@ -10,6 +10,7 @@ from config import Config
 from models.swift_message import SWIFTMessage
 from services.swift_generator import SWIFTGenerator
 from agents.parallelization import ParallelizationAgent
+from services.benford import BenfordMonitor
 
 
 class SWIFTProcessingSystem:
@@ -21,6 +22,9 @@ class SWIFTProcessingSystem:
         
         # Initialize agent patterns
         self.parallelization_agent = ParallelizationAgent()
+        self.benford_monitor = BenfordMonitor(
+            self.parallelization_agent.llm_service, self.swift_generator.bank_registry
+        )
     
     def generate_swift_messages(self) -> List[SWIFTMessage]:
         """Generate 1000 SWIFT messages across 30 banks"""
@@ -32,17 +36,23 @@ class SWIFTProcessingSystem:
         
         return messages
     
+    def monitor_benford(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
+        """Step 2: Update the streaming Benford histograms per sender BIC and bank"""
+        
+        # New deviations are added to the message's fraud statements before aggregation
+        result = self.benford_monitor.observe(messages)
+        print(f"Benford monitor: {result['tracked']} keys tracked, {len(result['events'])} new deviations")
+        
+        return messages
+    
     def process_with_parallelization(self, messages: List[SWIFTMessage]) -> List[SWIFTMessage]:
-        """Step 2: Process messages in parallel with fraud detection routing"""
+        """Step 3: Process messages in parallel with fraud detection routing"""
         
-        fraud_messages = self.parallelization_agent.process_messages_parallel(
+        # Each message is aggregated as soon as its own detectors finish
+        processed_messages = self.parallelization_agent.process_messages_pipelined(
             messages 
         )
         
-        processed_messages = self.parallelization_agent.aggregrate_fraud(
-            fraud_messages 
-        )
-        
         return processed_messages
     
     
@@ -53,13 +63,19 @@ class SWIFTProcessingSystem:
             # Step 1: Generate SWIFT messages
             messages = self.generate_swift_messages()
             
-            # Step 2: Parallelization 
+            # Step 2: Benford monitoring
+            messages = self.monitor_benford(messages)
+            
+            # Step 3: Parallelization 
             processed_messages = self.process_with_parallelization(messages)
             print(processed_messages)
             
             
         except Exception as e:
             raise
+        
+        finally:
+            self.parallelization_agent.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""
+Columnar batch representation of SWIFT messages for vectorized processing
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from models.swift_message import SWIFTMessage
+
+
+# Fields stored as categorical codes: few distinct values, many rows
+CATEGORICAL_FIELDS = ["message_type", "currency", "sender_bic", "receiver_bic"]
+
+
+class SWIFTBatch:
+    """
+    Columnar container for a batch of SWIFT messages.
+
+    Amounts are parsed once into integer minor units (cents), and low
+    cardinality fields are stored as integer codes into a categories array,
+    so validation, fraud scoring and statistics can run as NumPy array
+    operations. Other string fields are only materialized when asked for.
+    """
+
+    def __init__(self, messages: List[SWIFTMessage]):
+        self._messages = list(messages)
+        self._strings: Dict[str, np.ndarray] = {}
+
+        parsed = [self._parse_amount(msg.amount) for msg in self._messages]
+        self.amount_minor = np.array([minor for minor, _, _ in parsed], dtype=np.int64)
+        self.amount_decimals = np.array([decimals for _, decimals, _ in parsed], dtype=np.int8)
+        self.amount_valid = np.array([valid for _, _, valid in parsed], dtype=bool)
+
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, np.ndarray] = {}
+        for field in CATEGORICAL_FIELDS:
+            values = np.array([getattr(msg, field) or "" for msg in self._messages], dtype=str)
+            self.categories[field], self.codes[field] = np.unique(values, return_inverse=True)
+
+    @classmethod
+    def from_messages(cls, messages: List[SWIFTMessage]) -> "SWIFTBatch":
+        """Build a columnar batch from message objects"""
+        return cls(messages)
+
+    def to_messages(self) -> List[SWIFTMessage]:
+        """The message objects backing this batch, in batch order"""
+        return list(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Amounts in major units as floats, for statistics and display"""
+        return self.amount_minor / 100.0
+
+    def decode(self, field: str) -> np.ndarray:
+        """Decode a categorical column back into its string values"""
+        return self.categories[field][self.codes[field]]
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        String column for any message field, built on first access
+        """
+        if field in self.codes:
+            return self.decode(field)
+
+        if field not in self._strings:
+            self._strings[field] = np.array(
+                [getattr(msg, field) or "" for msg in self._messages], dtype=str
+            )
+        return self._strings[field]
+
+    def select(self, mask: np.ndarray) -> "SWIFTBatch":
+        """New batch holding only the rows where mask is true"""
+        return SWIFTBatch([msg for msg, keep in zip(self._messages, mask) if keep])
+
+    def total_amount(self) -> float:
+        """Sum of all parseable amounts"""
+        return float(self.amount_minor[self.amount_valid].sum()) / 100.0
+
+    def leading_digits(self, count: int = 1) -> np.ndarray:
+        """
+        Leading digits of each amount, as used in Benford's law analysis.
+
+        Matches SWIFTMessage.get_first_digit for count=1. Amounts that are zero,
+        unparseable, or too short to have `count` significant digits give 0.
+        """
+        minor = np.where(self.amount_valid, self.amount_minor, 0)
+        positive = minor > 0
+
+        magnitude = np.zeros(len(minor), dtype=np.int64)
+        magnitude[positive] = np.floor(np.log10(minor[positive])).astype(np.int64)
+        has_digits = positive & (magnitude >= count - 1)
+
+        digits = np.zeros(len(minor), dtype=np.int64)
+        digits[has_digits] = minor[has_digits] // 10 ** (magnitude[has_digits] - (count - 1))
+        return digits
+
+    def unique_pairs(self, first: str, second: str) -> int:
+        """Number of distinct (first, second) combinations, e.g. BIC routes"""
+        combined = self.codes[first].astype(np.int64) * len(self.categories[second]) + self.codes[second]
+        return len(np.unique(combined))
+
+    @staticmethod
+    def _parse_amount(amount: str) -> Tuple[int, int, bool]:
+        """Parse an amount string into (minor units, decimal places, valid)"""
+        try:
+            value = Decimal(amount)
+            if not value.is_finite():
+                return 0, 0, False
+            decimals = max(-value.as_tuple().exponent, 0)
+            return int((value * 100).to_integral_value()), decimals, True
+        except (InvalidOperation, TypeError, ValueError):
+            return 0, 0, False
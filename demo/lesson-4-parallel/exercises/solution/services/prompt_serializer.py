@@ -0,0 +1,97 @@
+"""
+Compact, token-efficient serialization of SWIFT messages for prompts
+"""
+
+import json
+from typing import Any, Dict, List, Sequence
+
+from config import Config
+from models.swift_message import SWIFTMessage
+from services.prompt_templates import count_tokens
+
+
+# Fields each agent actually reasons about
+FRAUD_DETECTOR_FIELDS = ["message_id", "message_type", "amount", "currency", "sender_bic", "receiver_bic"]
+FRAUD_AMOUNT_FIELDS = ["message_id", "amount", "currency"]
+FRAUD_PATTERN_FIELDS = ["message_id", "sender_bic", "receiver_bic", "ordering_customer", "beneficiary", "remittance_info"]
+ORCHESTRATOR_FIELDS = ["message_id", "message_type", "amount", "currency", "sender_bic", "receiver_bic", "value_date"]
+DATA_EXTRACTION_FIELDS = ["amount", "currency", "sender_bic", "receiver_bic"]
+
+
+class PromptSerializer:
+    """
+    Renders messages with only the fields a given agent needs.
+
+    A single message becomes key=value lines and a batch becomes a TSV table
+    with one header row, instead of the full pydantic repr with timestamps,
+    status fields and earlier agent output. Empty fields are left out. With
+    Config.PROMPT_COMPACT_SERIALIZATION off the full repr is used, so both
+    can be compared with count_tokens.
+    """
+
+    @classmethod
+    def serialize(cls, message: SWIFTMessage, fields: Sequence[str]) -> str:
+        """One message as key=value lines"""
+        if not Config.PROMPT_COMPACT_SERIALIZATION:
+            return str(message)
+
+        return "\n".join(
+            f"{field}={cls._clean(value)}"
+            for field, value in ((field, getattr(message, field, None)) for field in fields)
+            if value not in (None, "", [])
+        )
+
+    @classmethod
+    def serialize_batch(cls, messages: List[SWIFTMessage], fields: Sequence[str]) -> str:
+        """Several messages as a TSV table with a header row"""
+        if not Config.PROMPT_COMPACT_SERIALIZATION:
+            return str(messages)
+
+        return cls._table(messages, fields)
+
+    @classmethod
+    def serialize_row(cls, message: SWIFTMessage, fields: Sequence[str]) -> str:
+        """The row one message contributes to serialize_batch, without the header"""
+        if not Config.PROMPT_COMPACT_SERIALIZATION:
+            return str(message)
+        return "\t".join(cls._clean(getattr(message, field, None)) for field in fields)
+
+    @classmethod
+    def serialize_data(cls, data: Any) -> str:
+        """Structured agent output as compact JSON"""
+        if not Config.PROMPT_COMPACT_SERIALIZATION:
+            return str(data)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    @classmethod
+    def count_tokens(cls, text: str) -> int:
+        """Tokens in text for the configured model, or ~4 characters per token without tiktoken"""
+        return count_tokens(text)
+
+    @classmethod
+    def compare(cls, messages: List[SWIFTMessage], fields: Sequence[str]) -> Dict[str, Any]:
+        """
+        Token counts of the full repr against the compact form of a batch
+        """
+        full_tokens = cls.count_tokens(str(messages))
+        compact_tokens = cls.count_tokens(cls._table(messages, fields))
+
+        return {
+            "full_tokens": full_tokens,
+            "compact_tokens": compact_tokens,
+            "reduction": 1 - compact_tokens / full_tokens if full_tokens else 0.0
+        }
+
+    @classmethod
+    def _table(cls, messages: List[SWIFTMessage], fields: Sequence[str]) -> str:
+        """Header row plus one tab-separated row per message"""
+        rows = ["\t".join(fields)]
+        rows.extend("\t".join(cls._clean(getattr(message, field, None)) for field in fields) for message in messages)
+        return "\n".join(rows)
+
+    @staticmethod
+    def _clean(value: Any) -> str:
+        """Render a value on one line without tabs so rows stay aligned"""
+        if value is None:
+            return ""
+        return " ".join(str(value).split())
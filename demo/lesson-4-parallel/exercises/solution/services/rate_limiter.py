@@ -0,0 +1,219 @@
+"""
+Shared rate limiting and adaptive concurrency for LLM calls
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from config import Config
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to its per-minute capacity
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        """Add the tokens accrued since the last refill"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until cost tokens are available; 0 when they already are"""
+        missing = min(cost, self.capacity) - self.tokens
+        return max(missing, 0.0) / self.rate
+
+
+class RateLimiter:
+    """
+    Process-wide limiter in front of every LLM API call.
+
+    Requests wait for a requests-per-minute bucket, a tokens-per-minute
+    bucket charged with an up-front estimate, and a concurrency limit
+    adjusted with AIMD. The estimate counts the prompt plus a running
+    average of recent completions; it is settled against the reported
+    usage as soon as the response returns, and refunded when the request
+    fails. The concurrency limit grows
+    by one slot per window of successful calls and halves on 429/5xx/timeout
+    responses, at most once per cooldown period.
+    """
+
+    _shared: Optional["RateLimiter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.config = Config()
+        self.requests = TokenBucket(requests_per_minute or self.config.LLM_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(tokens_per_minute or self.config.LLM_TOKENS_PER_MINUTE)
+
+        self.completion_estimate = float(self.config.LLM_DEFAULT_COMPLETION_TOKENS)
+        self.concurrency_limit = float(self.config.LLM_CONCURRENCY_INITIAL)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "overloaded": 0,
+            "wait_time": 0.0
+        }
+
+    @classmethod
+    def get_shared(cls) -> "RateLimiter":
+        """Get the process-wide limiter, creating it on first use"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def call(self, params: Dict[str, Any], send: Callable[[], T]) -> T:
+        """
+        Run send once the limits allow the request described by params
+        """
+        if not self.config.LLM_RATE_LIMIT_ENABLED:
+            return send()
+
+        estimate = self.estimate_tokens(params)
+        started = time.monotonic()
+        with self._cond:
+            wait = self._try_acquire(estimate)
+            while wait > 0:
+                self._cond.wait(wait)
+                wait = self._try_acquire(estimate)
+        self._record_wait(time.monotonic() - started)
+
+        try:
+            response = send()
+        except BaseException as e:
+            self._release(estimate, error=e)
+            raise
+        self._release(estimate, response=response)
+        return response
+
+    async def acall(self, params: Dict[str, Any], send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async counterpart of call; waiting yields to the event loop
+        """
+        if not self.config.LLM_RATE_LIMIT_ENABLED:
+            return await send()
+
+        estimate = self.estimate_tokens(params)
+        started = time.monotonic()
+        while True:
+            with self._cond:
+                wait = self._try_acquire(estimate)
+            if wait == 0:
+                break
+            await asyncio.sleep(min(wait, self.config.LLM_RATE_LIMIT_POLL_INTERVAL))
+        self._record_wait(time.monotonic() - started)
+
+        try:
+            response = await send()
+        except BaseException as e:
+            self._release(estimate, error=e)
+            raise
+        self._release(estimate, response=response)
+        return response
+
+    def estimate_tokens(self, params: Dict[str, Any]) -> int:
+        """
+        Rough token cost of a request: ~4 characters per prompt token plus
+        the average recent completion, capped by max_tokens
+        """
+        prompt_chars = sum(len(str(message.get("content") or "")) for message in params.get("messages", []))
+        completion = self.completion_estimate
+        if params.get("max_tokens"):
+            completion = min(completion, params["max_tokens"])
+        return prompt_chars // 4 + int(completion)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limits and throttling counters"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats["concurrency_limit"] = round(self.concurrency_limit, 2)
+            stats["completion_estimate"] = round(self.completion_estimate, 1)
+            stats["in_flight"] = self.in_flight
+        return stats
+
+    def _try_acquire(self, estimate: int) -> float:
+        """
+        Take a slot and the bucket tokens if all are available, otherwise
+        return how long to wait before trying again. Caller holds the lock.
+        """
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+        if self.in_flight >= int(self.concurrency_limit):
+            # Woken by a release; the timeout only guards against missed wakeups
+            return self.config.LLM_RATE_LIMIT_POLL_INTERVAL
+
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimate))
+        if wait > 0:
+            return wait
+
+        self.requests.tokens -= 1
+        self.tokens.tokens -= min(estimate, self.tokens.capacity)
+        self.in_flight += 1
+        self.stats["requests"] += 1
+        return 0
+
+    def _release(self, estimate: int, response: Any = None, error: Optional[BaseException] = None):
+        """
+        Free the slot, settle or refund the token estimate and adapt the
+        concurrency limit
+        """
+        with self._cond:
+            self.in_flight -= 1
+            charged = min(estimate, self.tokens.capacity)
+
+            usage = getattr(response, "usage", None)
+            if error is not None:
+                # A failed request is not billed, so its reservation goes back to the bucket
+                self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + charged)
+            elif usage is not None and usage.total_tokens:
+                self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens - (usage.total_tokens - charged))
+                if usage.completion_tokens:
+                    weight = self.config.LLM_COMPLETION_ESTIMATE_WEIGHT
+                    self.completion_estimate += weight * (usage.completion_tokens - self.completion_estimate)
+
+            if error is not None and self._is_overload(error):
+                now = time.monotonic()
+                self.stats["overloaded"] += 1
+                if now - self._last_decrease >= self.config.LLM_CONCURRENCY_COOLDOWN:
+                    self.concurrency_limit = max(self.config.LLM_CONCURRENCY_MIN, self.concurrency_limit / 2)
+                    self._last_decrease = now
+            elif error is None:
+                self.concurrency_limit = min(
+                    self.config.LLM_CONCURRENCY_MAX,
+                    self.concurrency_limit + 1 / self.concurrency_limit
+                )
+
+            self._cond.notify_all()
+
+    def _record_wait(self, waited: float):
+        """Count requests that had to wait and the time spent waiting"""
+        with self._cond:
+            self.stats["wait_time"] += waited
+            if waited > self.config.LLM_RATE_LIMIT_POLL_INTERVAL / 10:
+                self.stats["throttled"] += 1
+
+    @staticmethod
+    def _is_overload(error: BaseException) -> bool:
+        """429, 5xx and timeouts mean the endpoint wants less traffic"""
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status == 429 or status >= 500
+        return "timeout" in type(error).__name__.lower()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The solution modules import each other from the solution directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,151 @@
+import re
+from decimal import Decimal
+
+import pytest
+
+from models.swift_batch import SWIFTBatch
+from models.swift_message import SWIFTMessage
+from services.fraud_rules import FraudRuleEngine
+
+
+def make_message(amount="2500.00", sender_bic="DEUTDEFF", receiver_bic="CHASUS33"):
+    return SWIFTMessage(
+        message_type="MT103",
+        reference="INV2024001",
+        amount=amount,
+        currency="USD",
+        sender_bic=sender_bic,
+        receiver_bic=receiver_bic,
+        value_date="240115"
+    )
+
+
+def llm_amount_rules(amount: str):
+    """The amount rules as worded in FraudAmountDetectionAgent's prompt"""
+    value = Decimal(amount)
+    cents = abs(value) % 1 * 100
+    return [
+        value > 10000,
+        value >= 5000 and value % 1000 == 0,
+        value > 100000 and cents not in (0, 50),
+    ]
+
+
+def llm_pattern_rules(sender_bic: str, receiver_bic: str):
+    """The BIC rules as worded in FraudPatternDetectionAgent's prompt"""
+    patterns = ["TEST.*", "FAKE.*", "DEMO.*", ".*999.*", ".*000000.*"]
+    risky = any(
+        re.match(pattern, bic, re.IGNORECASE)
+        for pattern in patterns for bic in (sender_bic, receiver_bic)
+    )
+    return [risky, sender_bic.upper() == receiver_bic.upper()]
+
+
+def triggered(breakdown):
+    return [rule["triggered"] for rule in breakdown["rules"]]
+
+
+AMOUNTS = [
+    "0.01", "4999.99", "5000.00", "5000.01", "5500.00", "6000.00",
+    "9999.99", "10000.00", "10000.01", "11000", "99999.99", "100000.00",
+    "100000.01", "100000.50", "100001.25", "100001.5", "150000.10", "250000",
+    "1000000.00", "1234567.89",
+]
+
+
+@pytest.mark.parametrize("amount", AMOUNTS)
+def test_amount_rules_agree_with_the_llm_rules(amount):
+    breakdown = FraudRuleEngine().score_amount_rules(SWIFTBatch.from_messages([make_message(amount)]))[0]
+
+    expected = llm_amount_rules(amount)
+    assert triggered(breakdown) == expected
+    assert breakdown["total_risk_score"] == round(sum(w for w, hit in zip((0.3, 0.2, 0.1), expected) if hit), 2)
+
+
+@pytest.mark.parametrize("amount, scores", [
+    ("10000.00", [0.0, 0.2, 0.0]),
+    ("10000.01", [0.3, 0.0, 0.0]),
+    ("100000.00", [0.3, 0.2, 0.0]),
+    ("100000.01", [0.3, 0.0, 0.1]),
+    ("100000.50", [0.3, 0.0, 0.0]),
+])
+def test_amount_rule_scores_at_the_boundaries(amount, scores):
+    breakdown = FraudRuleEngine().score_amount_rules(SWIFTBatch.from_messages([make_message(amount)]))[0]
+
+    assert [rule["score"] for rule in breakdown["rules"]] == scores
+
+
+@pytest.mark.parametrize("amount", ["abc", "", "NaN", "Infinity"])
+def test_unparseable_amounts_score_zero(amount):
+    breakdown = FraudRuleEngine().score_amount_rules(SWIFTBatch.from_messages([make_message(amount)]))[0]
+
+    assert not any(triggered(breakdown))
+    assert breakdown["total_risk_score"] == 0.0
+
+
+BIC_PAIRS = [
+    ("DEUTDEFF", "CHASUS33"),
+    ("TESTUS33", "CHASUS33"),
+    ("DEUTDEFF", "FAKEGB2L"),
+    ("DEMOFRPP", "CHASUS33"),
+    ("testus33", "CHASUS33"),
+    ("BANK999X", "CHASUS33"),
+    ("DEUTDEFF", "AB000000"),
+    ("AB00000C", "CHASUS33"),
+    ("XTESTUS3", "CHASUS33"),
+    ("DEUTDEFF", "DEUTDEFF"),
+    ("deutdeff", "DEUTDEFF"),
+    ("TEST9999", "TEST9999"),
+]
+
+
+@pytest.mark.parametrize("sender_bic, receiver_bic", BIC_PAIRS)
+def test_pattern_rules_agree_with_the_llm_rules(sender_bic, receiver_bic):
+    message = make_message(sender_bic=sender_bic, receiver_bic=receiver_bic)
+    breakdown = FraudRuleEngine().score_pattern_rules(SWIFTBatch.from_messages([message]))[0]
+
+    assert triggered(breakdown)[:2] == llm_pattern_rules(sender_bic, receiver_bic)
+
+
+def test_batch_scores_match_single_message_scores():
+    messages = [make_message(amount, *bics) for amount, bics in zip(AMOUNTS, BIC_PAIRS)]
+    engine = FraudRuleEngine()
+
+    batch_amounts = engine.score_amount_rules(SWIFTBatch.from_messages(messages))
+    batch_patterns = engine.score_pattern_rules(SWIFTBatch.from_messages(messages))
+
+    for message, amount_result, pattern_result in zip(messages, batch_amounts, batch_patterns):
+        single = SWIFTBatch.from_messages([message])
+        assert amount_result == engine.score_amount_rules(single)[0]
+        assert pattern_result == engine.score_pattern_rules(single)[0]
+        assert amount_result["message_id"] == message.message_id
+
+
+def test_misspelling_rule_is_unevaluated_until_supplied():
+    engine = FraudRuleEngine()
+    message = make_message(sender_bic="TESTUS33")
+    breakdown = engine.score_pattern_rules(SWIFTBatch.from_messages([message]))[0]
+
+    rule_3 = breakdown["rules"][2]
+    assert (rule_3["evaluated"], rule_3["triggered"]) == (False, False)
+    assert breakdown["total_risk_score"] == 0.3
+
+    engine.set_rule_result(breakdown, "Rule 3", True)
+    assert (rule_3["evaluated"], rule_3["triggered"], rule_3["score"]) == (True, True, 0.1)
+    assert breakdown["total_risk_score"] == 0.4
+
+
+def test_supplied_misspelling_results_are_scored():
+    messages = [make_message(), make_message()]
+    breakdowns = FraudRuleEngine().score_pattern_rules(SWIFTBatch.from_messages(messages), misspelled=[True, False])
+
+    assert [breakdown["rules"][2]["triggered"] for breakdown in breakdowns] == [True, False]
+    assert all(breakdown["rules"][2]["evaluated"] for breakdown in breakdowns)
+
+
+def test_empty_batch_scores_nothing():
+    engine = FraudRuleEngine()
+    batch = SWIFTBatch.from_messages([])
+
+    assert engine.score_amount_rules(batch) == []
+    assert engine.score_pattern_rules(batch) == []
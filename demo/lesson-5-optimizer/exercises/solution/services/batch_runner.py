@@ -0,0 +1,77 @@
+"""
+Local stand-in for the OpenAI Batch API
+"""
+
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from openai import OpenAI
+
+from services.config import Config
+from services.llm_client import LLMClientRegistry, _send
+
+
+class LocalBatchRunner:
+    """
+    Turns a batch request file into a batch output file locally.
+
+    Each line of the request file is sent as a chat completion through the
+    shared retry, breaker and rate-limit path, and its outcome is written
+    in the Batch API output format, so DeferredBatch can ingest it exactly
+    like a file downloaded from the Batch API. Pointing the client at a
+    local OpenAI-compatible endpoint makes a deferred run fully offline.
+    """
+
+    def __init__(self, client: Optional[OpenAI] = None, max_workers: Optional[int] = None):
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.client = client or LLMClientRegistry.get_client()
+        self.max_workers = max_workers or self.config.LLM_DEFERRED_LOCAL_WORKERS
+
+    def run(self, requests_path: str, output_path: str) -> Dict[str, int]:
+        """
+        Process every request in requests_path and write the results to output_path
+        """
+        with open(requests_path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch-runner") as executor:
+            results = list(executor.map(self._run_request, requests))
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        failed = sum(1 for result in results if result["error"] is not None)
+        self.logger.info(f"Local batch processed {len(results)} requests, {failed} failed")
+        return {"requests": len(results), "failed": failed}
+
+    def _run_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """One output line for one request line"""
+        result = {
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": request["custom_id"],
+            "response": None,
+            "error": None
+        }
+
+        try:
+            response = _send(self.client, request["body"])
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status is not None:
+                result["response"] = {"status_code": status, "request_id": None,
+                                      "body": {"error": {"message": str(e), "type": type(e).__name__}}}
+            else:
+                result["error"] = {"code": type(e).__name__, "message": str(e)}
+            return result
+
+        result["response"] = {
+            "status_code": 200,
+            "request_id": response.id,
+            "body": response.model_dump(mode="json")
+        }
+        return result
@@ -2,9 +2,10 @@
 Evaluator-Optimizer Agent Pattern for SWIFT message validation and correction
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Optional
 from services.swift_message import SWIFTMessage
 from services.llm_service import LLMService
+from services.resilience import CircuitOpenError
 from services.validator import SWIFTValidator
 from services.config import Config
 
@@ -15,10 +16,10 @@ class EvaluatorOptimizer:
     Validates messages against SWIFT standards and attempts corrections if needed.
     """
     
-    def __init__(self):
+    def __init__(self, llm_service: Optional[LLMService] = None):
         self.config = Config()
         self.validator = SWIFTValidator()
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
         self.max_iterations = 3  # Maximum correction attempts
     
     def process_message(self, message: SWIFTMessage) -> SWIFTMessage:
@@ -88,8 +89,12 @@ class EvaluatorOptimizer:
             
             return corrected_message
             
+        except CircuitOpenError:
+            # Return original message while the LLM endpoint is unavailable
+            return message
+        
         except Exception as e:
-            # Return original message if correction fails
+            message.validation_errors.append(f"Correction error: {str(e)}")
             return message
     
     def _validate_business_rules(self, message: SWIFTMessage) -> List[str]:
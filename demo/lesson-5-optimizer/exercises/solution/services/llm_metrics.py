@@ -0,0 +1,157 @@
+"""
+In-process token, latency and cost accounting for LLM calls
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from services.config import Config
+
+
+class LLMMetrics:
+    """
+    Registry of every LLM call made through the shared call path.
+
+    Each call is recorded with its agent, step, message, model, token usage,
+    latency and source ("api", "cache", "coalesced", "deferred" or
+    "replayed"). Latency covers the API call alone; time spent waiting on
+    the rate limiter and backing off between retries is recorded separately
+    as wait. Summaries give totals and latency percentiles grouped by agent,
+    step, message or model. Cost only accrues for calls that reached the
+    API, with deferred batch results charged at the batch price the first
+    time they are used.
+    """
+
+    _shared: Optional["LLMMetrics"] = None
+    _shared_lock = threading.Lock()
+
+    GROUP_KEYS = {
+        "agent": lambda record: record["agent"],
+        "step": lambda record: f"{record['agent']}.{record['step']}",
+        "message": lambda record: record["message_id"],
+        "model": lambda record: record["model"]
+    }
+
+    def __init__(self, max_records: Optional[int] = None):
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=max_records or Config.LLM_METRICS_MAX_RECORDS)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_shared(cls) -> "LLMMetrics":
+        """Get the process-wide registry, creating it on first use"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def record(self, agent: Optional[str], step: Optional[str], message_id: Optional[str],
+               model: Optional[str], latency: float, usage: Any = None, source: str = "api",
+               error: Optional[Exception] = None, first_token_latency: Optional[float] = None,
+               wait: float = 0.0):
+        """Record one completed or failed call; streamed calls also pass their time to first token"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cached_prompt_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+
+        record = {
+            "agent": agent or "unknown",
+            "step": step or "unknown",
+            "message_id": message_id,
+            "model": model,
+            "source": source,
+            "latency": latency,
+            "wait": wait,
+            "first_token_latency": first_token_latency,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": self._source_cost(source, model, prompt_tokens, completion_tokens),
+            "error": type(error).__name__ if error is not None else None
+        }
+
+        with self._lock:
+            self.records.append(record)
+
+    @staticmethod
+    def cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+        """USD cost of a call from the configured per-million-token prices"""
+        pricing = Config.LLM_PRICING.get(model)
+        if not pricing:
+            return 0.0
+        return (prompt_tokens * pricing["prompt"] + completion_tokens * pricing["completion"]) / 1_000_000
+
+    def summary(self, by: str = "agent") -> Dict[str, Dict[str, Any]]:
+        """
+        Totals and latency percentiles per agent, step, message or model
+        """
+        key_of = self.GROUP_KEYS[by]
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for record in self.get_records():
+            groups.setdefault(key_of(record), []).append(record)
+
+        return {key: self._summarize(records) for key, records in groups.items()}
+
+    def totals(self) -> Dict[str, Any]:
+        """Totals and latency percentiles across every recorded call"""
+        return self._summarize(self.get_records())
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        """Snapshot of the recorded calls"""
+        with self._lock:
+            return list(self.records)
+
+    def reset(self):
+        """Forget every recorded call"""
+        with self._lock:
+            self.records.clear()
+
+    def _source_cost(self, source: str, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+        """Cost of a call by where its response came from; cached, coalesced and replayed calls are free"""
+        if source == "api":
+            return self.cost(model, prompt_tokens, completion_tokens)
+        if source == "deferred":
+            return self.cost(model, prompt_tokens, completion_tokens) * Config.LLM_BATCH_PRICE_FACTOR
+        return 0.0
+
+    def _summarize(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate a group of records"""
+        latencies = sorted(record["latency"] for record in records)
+        waits = sorted(record["wait"] for record in records)
+        first_tokens = sorted(
+            record["first_token_latency"] for record in records if record["first_token_latency"] is not None
+        )
+        prompt_tokens = sum(record["prompt_tokens"] for record in records)
+        completion_tokens = sum(record["completion_tokens"] for record in records)
+        cached_prompt_tokens = sum(record["cached_prompt_tokens"] for record in records)
+
+        return {
+            "calls": len(records),
+            "api_calls": sum(1 for record in records if record["source"] == "api"),
+            "errors": sum(1 for record in records if record["error"]),
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "prefix_cache_hit_rate": cached_prompt_tokens / prompt_tokens if prompt_tokens else 0.0,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost": round(sum(record["cost"] for record in records), 6),
+            "latency_total": sum(latencies),
+            "latency_p50": self._percentile(latencies, 50),
+            "latency_p95": self._percentile(latencies, 95),
+            "latency_p99": self._percentile(latencies, 99),
+            "wait_total": sum(waits),
+            "wait_p50": self._percentile(waits, 50),
+            "wait_p95": self._percentile(waits, 95),
+            "first_token_p50": self._percentile(first_tokens, 50),
+            "first_token_p95": self._percentile(first_tokens, 95)
+        }
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], percent: float) -> float:
+        """Nearest-rank percentile of an already sorted list"""
+        if not sorted_values:
+            return 0.0
+        rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+        return sorted_values[rank - 1]
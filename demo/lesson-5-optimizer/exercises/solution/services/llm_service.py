@@ -2,10 +2,12 @@
 LLM service for fraud analysis and SWIFT message correction using OpenAI
 """
 
-import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from openai import OpenAI
+from services.llm_client import LLMClientRegistry, create_chat_completion
+from services.resilience import CircuitOpenError
+from services.response_parser import JSON_OBJECT, ResponseParser
 from services.config import Config
 
 
@@ -14,13 +16,13 @@ class LLMService:
     Service for LLM-based fraud analysis and SWIFT message correction
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[OpenAI] = None):
         self.config = Config()
         
-        # Initialize OpenAI client
+        # Use the injected client, or the shared pooled one
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        self.client = client or LLMClientRegistry.get_client()
         self.model = self.config.OPENAI_MODEL
 
     
@@ -29,7 +31,10 @@ class LLMService:
         Get SWIFT message corrections from LLM
         """
         try:
-            response = self.client.chat.completions.create(
+            response = create_chat_completion(
+                self.client,
+                agent="LLMService",
+                step="get_swift_correction",
                 model=self.model,
                 messages=[
                     {
@@ -48,11 +53,11 @@ class LLMService:
                 temperature=0.1
             )
             
-            result = json.loads(response.choices[0].message.content or "{}")
+            result = ResponseParser.parse_response(JSON_OBJECT, response.choices[0].message.content)
             
             return result
             
-        except Exception as e:
+        except CircuitOpenError:
             return {}
     
     
\ No newline at end of file
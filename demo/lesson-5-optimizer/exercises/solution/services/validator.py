@@ -3,7 +3,7 @@ SWIFT message validation utilities
 """
 
 import re
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -11,6 +11,18 @@ from services.swift_message import SWIFTMessage
 from services.config import Config
 
 
+# Precompiled patterns shared by every validator instance
+SWIFT_CHARSET = re.compile(r'^[A-Za-z0-9/\-\?\:\(\)\.\,\'\+\s]*$')
+TEST_REFERENCE = re.compile(r'^(TEST|FAKE|DEMO)', re.IGNORECASE)
+RISK_PATTERNS = [
+    (pattern, re.compile(pattern, re.IGNORECASE))
+    for pattern in [r'.*999.*', r'.*000000.*', r'TEST.*', r'FAKE.*', r'DEMO.*']
+]
+# Hits wherever any single risk pattern could match, so the reference and both
+# BICs are screened with one scan over the newline-joined fields
+RISK_SCREEN = re.compile(r'999|000000|^(?:TEST|FAKE|DEMO)', re.IGNORECASE | re.MULTILINE)
+
+
 class ValidationResult(BaseModel):
     """Result of validation operation"""
     is_valid: bool
@@ -27,13 +39,42 @@ class ValidationResult(BaseModel):
         self.warnings.append(warning)
 
 
+class FastValidationResult:
+    """
+    Allocation-light validation result used by the compiled validator.
+
+    Exposes the same attributes as ValidationResult without pydantic
+    model construction per message.
+    """
+    __slots__ = ("is_valid", "errors", "warnings")
+
+    def __init__(self):
+        self.is_valid = True
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+
+    def add_error(self, error: str):
+        """Add validation error"""
+        self.errors.append(error)
+        self.is_valid = False
+
+    def add_warning(self, warning: str):
+        """Add validation warning"""
+        self.warnings.append(warning)
+
+    def to_validation_result(self) -> ValidationResult:
+        """Convert to the pydantic result model"""
+        return ValidationResult(is_valid=self.is_valid, errors=self.errors, warnings=self.warnings)
+
+
 class SWIFTValidator:
     """
     Comprehensive SWIFT message validator
     """
     
-    def __init__(self):
+    def __init__(self, compiled: Optional[bool] = None):
         self.config = Config()
+        self.compiled = self.config.SWIFT_VALIDATOR_COMPILED if compiled is None else compiled
         
         # BIC validation patterns
         self.bic_pattern = re.compile(r'^[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?$')
@@ -57,10 +98,13 @@ class SWIFTValidator:
         }
         
     
-    def validate_swift_message(self, message: SWIFTMessage) -> ValidationResult:
+    def validate_swift_message(self, message: SWIFTMessage) -> Union[ValidationResult, FastValidationResult]:
         """
         Comprehensive SWIFT message validation
         """
+        if self.compiled:
+            return self._validate_compiled(message, datetime.now(), {})
+        
         result = ValidationResult(is_valid=True)
         
         # Basic field validation
@@ -93,6 +137,159 @@ class SWIFTValidator:
         
         return result
     
+    def validate_many(self, messages: List[SWIFTMessage]) -> List[Union[ValidationResult, FastValidationResult]]:
+        """
+        Validate a batch of messages against a single reference time
+        """
+        if not self.compiled:
+            return [self.validate_swift_message(message) for message in messages]
+        
+        # Value dates repeat heavily within a batch, so their checks are memoized
+        now = datetime.now()
+        date_cache: Dict[str, Tuple[List[str], List[str]]] = {}
+        return [self._validate_compiled(message, now, date_cache) for message in messages]
+    
+    def _validate_compiled(self, message: SWIFTMessage, now: datetime,
+                           date_cache: Dict[str, Tuple[List[str], List[str]]]) -> FastValidationResult:
+        """
+        Single-pass validation producing the same errors and warnings, in the
+        same order, as the individual _validate_* passes
+        """
+        result = FastValidationResult()
+        errors = result.errors
+        warnings = result.warnings
+        standards = self.config.SWIFT_STANDARDS
+        
+        reference = message.reference
+        sender_bic = message.sender_bic
+        receiver_bic = message.receiver_bic
+        currency = message.currency
+        value_date = message.value_date
+        
+        # Basic fields
+        for field in standards["required_fields"]:
+            value = getattr(message, field, None)
+            if not value or (isinstance(value, str) and not value.strip()):
+                errors.append(f"Required field '{field}' is missing or empty")
+        
+        # BIC codes
+        if not sender_bic or not self.bic_pattern.match(sender_bic):
+            errors.append(f"Invalid sender BIC format: {sender_bic}")
+        if not receiver_bic or not self.bic_pattern.match(receiver_bic):
+            errors.append(f"Invalid receiver BIC format: {receiver_bic}")
+        if sender_bic == receiver_bic:
+            errors.append("Sender and receiver BIC codes cannot be identical")
+        
+        sender_country = sender_bic[4:6] if len(sender_bic) >= 6 else ""
+        receiver_country = receiver_bic[4:6] if len(receiver_bic) >= 6 else ""
+        if sender_country in self.high_risk_countries:
+            warnings.append(f"Sender BIC from high-risk country: {sender_country}")
+        if receiver_country in self.high_risk_countries:
+            warnings.append(f"Receiver BIC from high-risk country: {receiver_country}")
+        
+        # Amount
+        try:
+            amount = float(message.amount)
+            if amount <= 0:
+                errors.append("Amount must be positive")
+            if amount < standards["min_amount"]:
+                errors.append(f"Amount {amount} below minimum {standards['min_amount']}")
+            if amount > standards["max_amount"]:
+                errors.append(f"Amount {amount} exceeds maximum {standards['max_amount']}")
+            if '.' in message.amount and len(message.amount.split('.')[1]) > 2:
+                errors.append("Amount cannot have more than 2 decimal places")
+            if amount >= 10000 and amount % 1000 == 0:
+                warnings.append(f"Round amount may indicate structuring: {amount}")
+            if amount >= 1000000:
+                warnings.append(f"Very large transaction amount: {amount}")
+        except (ValueError, TypeError):
+            errors.append(f"Invalid amount format: {message.amount}")
+        
+        # Currency
+        if not currency:
+            errors.append("Currency code is required")
+        else:
+            if len(currency) != 3:
+                errors.append(f"Currency code must be 3 characters: {currency}")
+            if not currency.isalpha():
+                errors.append(f"Currency code must be alphabetic: {currency}")
+            if not currency.isupper():
+                errors.append(f"Currency code must be uppercase: {currency}")
+            if currency not in self.valid_currencies:
+                warnings.append(f"Uncommon or invalid currency code: {currency}")
+        
+        # Value date (YYMMDD)
+        date_checks = date_cache.get(value_date)
+        if date_checks is None:
+            date_checks = date_cache[value_date] = self._check_value_date(value_date, now)
+        errors.extend(date_checks[0])
+        warnings.extend(date_checks[1])
+        
+        # Message type
+        if message.message_type not in standards["valid_message_types"]:
+            errors.append(f"Invalid message type: {message.message_type}")
+        elif message.message_type == "MT103":
+            if not message.ordering_customer:
+                warnings.append("MT103 should include ordering customer information")
+            if not message.beneficiary:
+                warnings.append("MT103 should include beneficiary information")
+            if not message.remittance_info:
+                warnings.append("MT103 should include remittance information")
+        
+        # Business rules
+        if len(reference) > standards["max_reference_length"]:
+            errors.append(f"Reference exceeds maximum length of {standards['max_reference_length']}")
+        if not reference.strip():
+            errors.append("Reference cannot be empty")
+        reference_charset_ok = bool(SWIFT_CHARSET.match(reference))
+        if not reference or not reference_charset_ok:
+            errors.append("Reference contains invalid characters")
+        if TEST_REFERENCE.match(reference):
+            warnings.append("Reference appears to be test data")
+        
+        # SWIFT character set
+        if reference and not reference_charset_ok:
+            errors.append("Reference contains invalid SWIFT characters")
+        if message.ordering_customer and not SWIFT_CHARSET.match(message.ordering_customer):
+            errors.append("Ordering customer contains invalid SWIFT characters")
+        if message.beneficiary and not SWIFT_CHARSET.match(message.beneficiary):
+            errors.append("Beneficiary contains invalid SWIFT characters")
+        if message.remittance_info and not SWIFT_CHARSET.match(message.remittance_info):
+            errors.append("Remittance info contains invalid SWIFT characters")
+        
+        # Risk patterns: fields are only checked one by one when the screen hits
+        if RISK_SCREEN.search(f"{reference}\n{sender_bic}\n{receiver_bic}"):
+            fields = (("Reference", reference), ("Sender BIC", sender_bic), ("Receiver BIC", receiver_bic))
+            for pattern, compiled_pattern in RISK_PATTERNS:
+                for label, value in fields:
+                    if compiled_pattern.match(value):
+                        warnings.append(f"{label} matches risk pattern: {pattern}")
+        
+        result.is_valid = not errors
+        return result
+    
+    def _check_value_date(self, value_date: str, now: datetime) -> Tuple[List[str], List[str]]:
+        """Errors and warnings for a value date, as produced by _validate_dates"""
+        parsed_date = None
+        if value_date and len(value_date) == 6 and value_date.isdigit():
+            try:
+                parsed_date = datetime(2000 + int(value_date[:2]), int(value_date[2:4]), int(value_date[4:6]))
+            except ValueError:
+                pass
+        
+        if parsed_date is None:
+            return [f"Invalid value date format (YYMMDD required): {value_date}"], []
+        
+        warnings = []
+        days_diff = (parsed_date - now).days
+        if days_diff < -30:
+            warnings.append(f"Value date is more than 30 days in the past: {value_date}")
+        if days_diff > 30:
+            warnings.append(f"Value date is more than 30 days in the future: {value_date}")
+        if parsed_date.weekday() >= 5:
+            warnings.append("Value date falls on weekend")
+        return [], warnings
+    
     def _validate_basic_fields(self, message: SWIFTMessage, result: ValidationResult):
         """Validate basic required fields"""
         required_fields = self.config.SWIFT_STANDARDS["required_fields"]
@@ -240,17 +437,17 @@ class SWIFTValidator:
             result.add_error("Reference cannot be empty")
         
         # Reference should not contain invalid characters
-        if not re.match(r'^[A-Za-z0-9/\-\?\:\(\)\.\,\'\+\s]+$', message.reference):
+        if not message.reference or not SWIFT_CHARSET.match(message.reference):
             result.add_error("Reference contains invalid characters")
         
         # Check for suspicious reference patterns
-        if re.match(r'^(TEST|FAKE|DEMO)', message.reference.upper()):
+        if TEST_REFERENCE.match(message.reference):
             result.add_warning("Reference appears to be test data")
     
     def _validate_formats(self, message: SWIFTMessage, result: ValidationResult):
         """Validate field formats"""
         # Check for proper SWIFT character set
-        swift_charset = re.compile(r'^[A-Za-z0-9/\-\?\:\(\)\.\,\'\+\s]*$')
+        swift_charset = SWIFT_CHARSET
         
         if message.reference and not swift_charset.match(message.reference):
             result.add_error("Reference contains invalid SWIFT characters")
@@ -270,22 +467,14 @@ class SWIFTValidator:
     def _validate_risk_factors(self, message: SWIFTMessage, result: ValidationResult):
         """Validate risk-related factors"""
         # Check for patterns indicating potential fraud
-        risk_patterns = [
-            r'.*999.*',
-            r'.*000000.*',
-            r'TEST.*',
-            r'FAKE.*',
-            r'DEMO.*'
-        ]
-        
-        for pattern in risk_patterns:
-            if re.match(pattern, message.reference, re.IGNORECASE):
+        for pattern, compiled_pattern in RISK_PATTERNS:
+            if compiled_pattern.match(message.reference):
                 result.add_warning(f"Reference matches risk pattern: {pattern}")
             
-            if re.match(pattern, message.sender_bic, re.IGNORECASE):
+            if compiled_pattern.match(message.sender_bic):
                 result.add_warning(f"Sender BIC matches risk pattern: {pattern}")
             
-            if re.match(pattern, message.receiver_bic, re.IGNORECASE):
+            if compiled_pattern.match(message.receiver_bic):
                 result.add_warning(f"Receiver BIC matches risk pattern: {pattern}")
     
     def _is_valid_bic(self, bic: str) -> bool:
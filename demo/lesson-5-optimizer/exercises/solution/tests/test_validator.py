@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.swift_message import SWIFTMessage
+from services.validator import SWIFTValidator
+
+
+def value_date(days: int) -> str:
+    return (datetime.now() + timedelta(days=days)).strftime("%y%m%d")
+
+
+BASE = {
+    "message_type": "MT103",
+    "reference": "INV2024001",
+    "amount": "2500.00",
+    "currency": "USD",
+    "sender_bic": "DEUTDEFF",
+    "receiver_bic": "CHASUS33",
+    "value_date": value_date(1),
+    "ordering_customer": "ACME CORP",
+    "beneficiary": "GLOBEX LTD",
+    "remittance_info": "INVOICE 42",
+}
+
+
+EDGE_CASES = {
+    "valid": {},
+    "mt202_without_customers": {"message_type": "MT202", "ordering_customer": None, "beneficiary": None,
+                                "remittance_info": None},
+    "mt103_without_customers": {"ordering_customer": None, "beneficiary": "", "remittance_info": None},
+    "invalid_message_type": {"message_type": "MT999"},
+    "empty_reference": {"reference": ""},
+    "blank_reference": {"reference": "   "},
+    "long_reference": {"reference": "R" * 17},
+    "reference_at_max_length": {"reference": "R" * 16},
+    "reference_bad_chars": {"reference": "INV#2024"},
+    "test_reference": {"reference": "test123"},
+    "fake_reference_with_999": {"reference": "FAKE999"},
+    "reference_000000": {"reference": "A0000000B"},
+    "demo_reference_bad_chars": {"reference": "DEMO_1"},
+    "identical_bics": {"receiver_bic": "DEUTDEFF"},
+    "short_bics": {"sender_bic": "DEUT", "receiver_bic": "CHAS"},
+    "empty_bics": {"sender_bic": "", "receiver_bic": ""},
+    "lowercase_bic": {"sender_bic": "deutdeff"},
+    "eleven_char_bic": {"sender_bic": "DEUTDEFF500"},
+    "high_risk_countries": {"sender_bic": "BANKIRTH", "receiver_bic": "BANKRUMM"},
+    "risk_pattern_bics": {"sender_bic": "TESTUS33", "receiver_bic": "BANK999X"},
+    "zero_amount": {"amount": "0"},
+    "negative_amount": {"amount": "-5.00"},
+    "below_minimum": {"amount": "0.001"},
+    "above_maximum": {"amount": "1000000000.00"},
+    "three_decimals": {"amount": "12.345"},
+    "round_structuring": {"amount": "10000"},
+    "round_below_threshold": {"amount": "9000"},
+    "very_large": {"amount": "1000000.00"},
+    "unparseable_amount": {"amount": "12,000"},
+    "empty_amount": {"amount": ""},
+    "nan_amount": {"amount": "nan"},
+    "infinite_amount": {"amount": "inf"},
+    "lowercase_currency": {"currency": "usd"},
+    "short_currency": {"currency": "US"},
+    "numeric_currency": {"currency": "U1D"},
+    "uncommon_currency": {"currency": "XXX"},
+    "empty_currency": {"currency": ""},
+    "bad_value_date_format": {"value_date": "2024-01-15"},
+    "impossible_value_date": {"value_date": "240230"},
+    "month_13": {"value_date": "241301"},
+    "empty_value_date": {"value_date": ""},
+    "old_value_date": {"value_date": value_date(-45)},
+    "future_value_date": {"value_date": value_date(45)},
+    "saturday_value_date": {"value_date": "240113"},
+    "sunday_value_date": {"value_date": "240114"},
+    "customer_bad_chars": {"ordering_customer": "ACME & CO"},
+    "beneficiary_bad_chars": {"beneficiary": "MÜLLER GMBH"},
+    "remittance_bad_chars": {"remittance_info": "INV;42"},
+    "everything_wrong": {"reference": "TEST#" * 5, "amount": "0.001", "currency": "us1",
+                         "sender_bic": "TEST999", "receiver_bic": "TEST999", "value_date": "99",
+                         "ordering_customer": "@", "beneficiary": None, "remittance_info": "%"},
+}
+
+
+def make_message(overrides):
+    fields = {**BASE, **overrides}
+    if fields["message_type"] not in ("MT103", "MT202"):
+        return SWIFTMessage.model_construct(**fields)
+    return SWIFTMessage(**fields)
+
+
+def outcome(result):
+    return result.is_valid, result.errors, result.warnings
+
+
+@pytest.mark.parametrize("overrides", EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_compiled_validator_matches_the_individual_passes(overrides):
+    message = make_message(overrides)
+
+    expected = outcome(SWIFTValidator(compiled=False).validate_swift_message(message))
+    assert outcome(SWIFTValidator(compiled=True).validate_swift_message(message)) == expected
+
+
+def test_validate_many_matches_one_by_one_validation():
+    messages = [make_message(overrides) for overrides in EDGE_CASES.values()]
+    # Repeated value dates go through the batch's memoized date checks
+    messages += [make_message(overrides) for overrides in EDGE_CASES.values()]
+
+    individual = [outcome(SWIFTValidator(compiled=False).validate_swift_message(m)) for m in messages]
+    assert [outcome(result) for result in SWIFTValidator(compiled=True).validate_many(messages)] == individual
+    assert [outcome(result) for result in SWIFTValidator(compiled=False).validate_many(messages)] == individual
+
+
+def test_valid_message_has_no_errors():
+    result = SWIFTValidator(compiled=True).validate_swift_message(make_message({}))
+
+    assert result.is_valid
+    assert result.errors == []
+
+
+def test_compiled_result_converts_to_the_pydantic_model():
+    result = SWIFTValidator(compiled=True).validate_swift_message(make_message(EDGE_CASES["everything_wrong"]))
+
+    converted = result.to_validation_result()
+    assert outcome(converted) == outcome(result)
+    assert not converted.is_valid
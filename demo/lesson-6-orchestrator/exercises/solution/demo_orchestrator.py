@@ -9,6 +9,7 @@ import time
 from typing import List, Dict
 
 from models.swift_message import SWIFTMessage
+from services.benford import BenfordMonitor
 from services.orchestrator_worker import OrchestratorWorker
 from services.swift_generator import SWIFTGenerator
 from config import Config
@@ -26,6 +27,9 @@ class OrchestratorPatternDemo:
         # Initialize all agent patterns
         self.swift_generator = SWIFTGenerator()
         self.orchestrator_worker = OrchestratorWorker()
+        self.benford_monitor = BenfordMonitor(
+            self.orchestrator_worker.llm_service, self.swift_generator.bank_registry
+        )
     
     def run_demo(self):
         """
@@ -39,6 +43,9 @@ class OrchestratorPatternDemo:
         # Step 1: Message Generation
         messages = self._message_generation()
         
+        # Step 2: Benford monitoring
+        self._benford_monitoring(messages)
+        
         self._orchestrator_worker(messages)
     
     
@@ -63,6 +70,19 @@ class OrchestratorPatternDemo:
         
         return messages
     
+    def _benford_monitoring(self, messages: List[SWIFTMessage]) -> None:
+        """
+        Step 2: Streaming Benford's law monitoring per sender BIC and bank
+        """
+        print("STEP 2: BENFORD MONITORING")
+        
+        # The LLM is only asked about keys that newly crossed the threshold
+        result = self.benford_monitor.observe(messages)
+        
+        print(f"   📊 Tracked keys: {result['tracked']}")
+        print(f"   ⚠️  New deviations: {len(result['events'])}")
+        print()
+    
     def _orchestrator_worker(self, messages: List[SWIFTMessage]) -> None:
         """
         Step 5: Transaction processing using Orchestrator-Worker pattern
@@ -0,0 +1,242 @@
+"""
+Deferred execution of LLM calls through batch request and result files
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from openai.types.chat import ChatCompletion
+
+from config import Config
+from models.swift_message import SWIFTMessage
+
+
+class DeferredRequest(BaseException):
+    """
+    Raised in place of a response whose request is waiting in the batch file.
+
+    Derives from BaseException, like asyncio.CancelledError, so the agents'
+    `except Exception` fallbacks let it through instead of recording a
+    fallback decision for a call that was merely postponed.
+    """
+
+    def __init__(self, custom_id: str):
+        super().__init__(custom_id)
+        self.custom_id = custom_id
+
+
+class DeferredBatch:
+    """
+    Runs a pipeline in rounds against batch files instead of the live API.
+
+    While a round runs, every chat completion whose result has already been
+    ingested is answered from it, and every other one is written to
+    requests.jsonl in the OpenAI batch input format and aborts the item
+    that needed it with DeferredRequest. After the batch has been processed
+    (by the Batch API or LocalBatchRunner) its output file is ingested and
+    the next round replays the saved inputs, getting one step further down
+    each dependent chain, until no item is left pending.
+
+    Input messages are saved on the first round and reloaded on every later
+    one, so a pipeline can resume in a different process.
+    """
+
+    _active: Optional["DeferredBatch"] = None
+    _active_lock = threading.Lock()
+
+    ENDPOINT = "/v1/chat/completions"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.config = Config()
+        self.directory = directory or self.config.LLM_DEFERRED_DIR
+        self.inputs_path = os.path.join(self.directory, "inputs.jsonl")
+        self.requests_path = os.path.join(self.directory, "requests.jsonl")
+        self.results_path = os.path.join(self.directory, "results.jsonl")
+
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.used: Set[str] = set()
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.results_path):
+            self._load_results(self.results_path)
+
+    @classmethod
+    def get_active(cls) -> Optional["DeferredBatch"]:
+        """The batch deferring calls in this process, if a round is running"""
+        return cls._active
+
+    def __enter__(self) -> "DeferredBatch":
+        with self._active_lock:
+            if DeferredBatch._active is not None:
+                raise RuntimeError("Another deferred batch round is already running")
+            DeferredBatch._active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._active_lock:
+            DeferredBatch._active = None
+        self.write_requests()
+
+    @staticmethod
+    def custom_id(params: Dict[str, Any]) -> str:
+        """Stable id of a request body, shared by its batch input and output lines"""
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return "req-" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def resolve(self, params: Dict[str, Any]) -> Tuple[ChatCompletion, bool]:
+        """
+        Answer a request from the ingested results, or queue it and raise
+        DeferredRequest. Also returns whether the result was already used
+        in an earlier round.
+        """
+        custom_id = self.custom_id(params)
+
+        with self._lock:
+            body = self.results.get(custom_id)
+            replayed = custom_id in self.used
+            if body is not None:
+                self.used.add(custom_id)
+            else:
+                self.pending.setdefault(custom_id, {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": self.ENDPOINT,
+                    "body": params
+                })
+
+        if body is None:
+            raise DeferredRequest(custom_id)
+        return ChatCompletion.model_validate(body), replayed
+
+    def run(self, process: Callable[..., Any], items: Optional[List[Union[SWIFTMessage, tuple]]] = None,
+            per_item: bool = True) -> Dict[str, Any]:
+        """
+        Run one round of process over the items.
+
+        Items are messages or tuples whose first element is a message, and
+        process is called as process(*item) per item, or once with the
+        whole list when per_item is False. Passing items starts a new run
+        and saves them; passing None reloads the saved inputs to resume.
+        """
+        if items is not None:
+            self._save_inputs(items)
+        # Even the first round works on reloaded copies, so every round builds identical prompts
+        items = self._load_inputs()
+
+        with self._lock:
+            self.pending.clear()
+
+        completed: Dict[str, Any] = {}
+        waiting: List[str] = []
+
+        with self:
+            if per_item:
+                for item in items:
+                    args = item if isinstance(item, tuple) else (item,)
+                    try:
+                        completed[args[0].message_id] = process(*args)
+                    except DeferredRequest:
+                        waiting.append(args[0].message_id)
+            else:
+                try:
+                    completed["batch"] = process(items)
+                except DeferredRequest:
+                    waiting.append("batch")
+
+        return {
+            "completed": completed,
+            "pending": waiting,
+            "items": items,
+            "requests": len(self.pending),
+            "requests_path": self.requests_path if self.pending else None
+        }
+
+    def run_until_complete(self, process: Callable[..., Any], runner: Any,
+                           items: Optional[List[Union[SWIFTMessage, tuple]]] = None, per_item: bool = True,
+                           max_rounds: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Alternate rounds with a batch runner (e.g. LocalBatchRunner) until
+        nothing is pending
+        """
+        rounds = 0
+        while True:
+            result = self.run(process, items if rounds == 0 else None, per_item)
+            rounds += 1
+            result["rounds"] = rounds
+            if not result["pending"] or rounds >= (max_rounds or self.config.LLM_DEFERRED_MAX_ROUNDS):
+                return result
+
+            output_path = os.path.join(self.directory, f"output-{rounds}.jsonl")
+            runner.run(self.requests_path, output_path)
+            self.ingest(output_path)
+
+    def write_requests(self) -> int:
+        """Write the requests queued in this round, replacing the previous request file"""
+        with self._lock:
+            lines = [json.dumps(request, ensure_ascii=False, default=str) for request in self.pending.values()]
+
+        with open(self.requests_path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+        return len(lines)
+
+    def ingest(self, output_path: str) -> Dict[str, int]:
+        """
+        Add the successful responses of a batch output file to the results.
+
+        Failed lines are skipped, so their requests are queued again on the
+        next round.
+        """
+        loaded = self._load_results(output_path)
+
+        with open(self.results_path, "a", encoding="utf-8") as f:
+            for custom_id, body in loaded.items():
+                f.write(json.dumps({"custom_id": custom_id, "response": {"status_code": 200, "body": body}}) + "\n")
+
+        return {"ingested": len(loaded), "results": len(self.results)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ingested results and requests queued in the current round"""
+        with self._lock:
+            return {"results": len(self.results), "pending_requests": len(self.pending)}
+
+    def _load_results(self, path: str) -> Dict[str, Dict[str, Any]]:
+        """Read the 200 responses of a batch output file into the results"""
+        loaded = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200 and response.get("body"):
+                    loaded[entry["custom_id"]] = response["body"]
+
+        with self._lock:
+            self.results.update(loaded)
+        return loaded
+
+    def _save_inputs(self, items: List[Union[SWIFTMessage, tuple]]):
+        """Save the items of a new run so later rounds replay identical inputs"""
+        with open(self.inputs_path, "w", encoding="utf-8") as f:
+            for item in items:
+                args = item if isinstance(item, tuple) else (item,)
+                f.write(json.dumps({
+                    "message": args[0].model_dump(mode="json"),
+                    "args": list(args[1:]),
+                    "tuple": isinstance(item, tuple)
+                }, default=str) + "\n")
+
+    def _load_inputs(self) -> List[Union[SWIFTMessage, tuple]]:
+        """Fresh copies of the saved items"""
+        items = []
+        with open(self.inputs_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                message = SWIFTMessage.model_validate(entry["message"])
+                items.append((message, *entry["args"]) if entry["tuple"] else message)
+        return items
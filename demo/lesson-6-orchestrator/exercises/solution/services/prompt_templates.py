@@ -0,0 +1,143 @@
+"""
+Prompt templates ordered for provider-side prefix caching
+"""
+
+import textwrap
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character estimate
+    tiktoken = None
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for the configured model, or ~4 characters per token without tiktoken"""
+    global _encoding
+
+    if tiktoken is None:
+        return max(len(text) // 4, 1) if text else 0
+
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(Config.OPENAI_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text))
+
+
+class PromptTemplate:
+    """
+    A prompt split into a static prefix and a dynamic suffix.
+
+    The static prefix (system role, rules and output schema) is identical
+    on every call; the dynamic suffix is a str.format template filled with
+    the per-transaction fields. Rendering always puts the prefix first, so
+    consecutive calls share the longest possible prompt prefix and the
+    provider's automatic prefix cache can serve it.
+    """
+
+    def __init__(self, name: str, system: str, instructions: str, dynamic: str):
+        self.name = name
+        self.system = textwrap.dedent(system).strip()
+        self.instructions = textwrap.dedent(instructions).strip()
+        self.dynamic = textwrap.dedent(dynamic).strip()
+        self._static_tokens: Optional[int] = None
+
+    @property
+    def static_tokens(self) -> int:
+        """Tokens in the static prefix, counted once"""
+        if self._static_tokens is None:
+            self._static_tokens = count_tokens(self.system) + count_tokens(self.instructions)
+        return self._static_tokens
+
+    def render_suffix(self, **fields: Any) -> str:
+        return self.dynamic.format(**fields)
+
+    def render(self, **fields: Any) -> List[Dict[str, str]]:
+        """Chat messages with the static prefix ahead of the dynamic suffix"""
+        return self.assemble(self.render_suffix(**fields))
+
+    def assemble(self, suffix: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": f"{self.instructions}\n\n{suffix}"}
+        ]
+
+
+class PromptRegistry:
+    """
+    Process-wide registry of the agents' prompt templates.
+
+    Agents register their templates at import time and render through the
+    registry, which keeps the static/dynamic token split of every template
+    so prompts whose static prefix is too short to be cached (or whose
+    dynamic suffix dominates) stand out.
+    """
+
+    _shared: Optional["PromptRegistry"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.config = Config()
+        self.templates: Dict[str, PromptTemplate] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_shared(cls) -> "PromptRegistry":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def register(cls, template: PromptTemplate) -> PromptTemplate:
+        """Add a template to the shared registry"""
+        registry = cls.get_shared()
+        with registry._lock:
+            registry.templates[template.name] = template
+        return template
+
+    def render(self, name: str, **fields: Any) -> List[Dict[str, str]]:
+        """Chat messages for the named template"""
+        template = self.templates[name]
+        suffix = template.render_suffix(**fields)
+        dynamic_tokens = count_tokens(suffix)
+
+        with self._lock:
+            stats = self.stats.setdefault(name, {"renders": 0, "dynamic_tokens": 0})
+            stats["renders"] += 1
+            stats["dynamic_tokens"] += dynamic_tokens
+        return template.assemble(suffix)
+
+    def token_split(self, name: str) -> Dict[str, Any]:
+        """
+        Static and average dynamic tokens of a template, and whether its
+        static prefix is long enough for the provider to cache
+        """
+        template = self.templates[name]
+        with self._lock:
+            stats = dict(self.stats.get(name, {"renders": 0, "dynamic_tokens": 0}))
+
+        static_tokens = template.static_tokens
+        dynamic_tokens = stats["dynamic_tokens"] / stats["renders"] if stats["renders"] else 0.0
+        total = static_tokens + dynamic_tokens
+
+        return {
+            "renders": stats["renders"],
+            "static_tokens": static_tokens,
+            "dynamic_tokens": dynamic_tokens,
+            "static_share": static_tokens / total if total else 0.0,
+            "cacheable": static_tokens >= self.config.LLM_PREFIX_CACHE_MIN_TOKENS
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Token split of every registered template"""
+        return {name: self.token_split(name) for name in sorted(self.templates)}
@@ -0,0 +1,206 @@
+"""
+Retries, timeouts and circuit breaking for LLM calls
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+import openai
+
+from config import Config
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one (endpoint, model) pair.
+
+    Opens after Config.LLM_BREAKER_FAILURE_THRESHOLD consecutive failed calls
+    (each already retried), fails fast while open, and after
+    Config.LLM_BREAKER_RESET_TIMEOUT lets a single probe call through
+    (half-open) whose outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _breakers: Dict[Tuple[str, str], "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self.config = Config()
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "successes": 0,
+            "failures": 0,
+            "rejected": 0,
+            "opened": 0
+        }
+
+    @classmethod
+    def for_endpoint(cls, base_url: str, model: str) -> "CircuitBreaker":
+        """Get the shared breaker for an endpoint and model"""
+        key = (base_url, model)
+        with cls._registry_lock:
+            breaker = cls._breakers.get(key)
+            if breaker is None:
+                breaker = cls._breakers[key] = cls(f"{base_url} {model}")
+        return breaker
+
+    @classmethod
+    def get_all_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """State and counters of every breaker created so far"""
+        with cls._registry_lock:
+            breakers = list(cls._breakers.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+    def allow(self):
+        """
+        Check that a call may proceed, raising CircuitOpenError when it may not
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.config.LLM_BREAKER_RESET_TIMEOUT:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"Circuit open for {self.name}")
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"Circuit half-open for {self.name}, probe in flight")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+            self.stats["successes"] += 1
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit past the threshold"""
+        with self._lock:
+            self.failures += 1
+            self.stats["failures"] += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+
+            if was_probe or self.failures >= self.config.LLM_BREAKER_FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give up a probe slot without an outcome (e.g. the request was invalid)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current state and counters"""
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, **self.stats}
+
+
+class ResilientCaller:
+    """
+    Bounded retries with decorrelated jitter around a single LLM request.
+
+    Transient errors (timeouts, connection errors, 429 and 5xx) are retried
+    up to Config.LLM_MAX_RETRIES times, sleeping
+    min(cap, uniform(base, previous_sleep * 3)) between attempts and never
+    less than a server-sent Retry-After. Only a request that still fails
+    after its retries counts against the endpoint's circuit breaker, so
+    callers fall back on CircuitOpenError rather than on every blip.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+
+    def call(self, breaker: CircuitBreaker, send: Callable[[], T]) -> T:
+        """Run send with retries behind the breaker"""
+        breaker.allow()
+        delay = self.config.LLM_RETRY_BASE_DELAY
+
+        for attempt in range(self.config.LLM_MAX_RETRIES + 1):
+            try:
+                response = send()
+            except Exception as e:
+                if not self.is_transient(e):
+                    breaker.release_probe()
+                    raise
+                if attempt == self.config.LLM_MAX_RETRIES:
+                    breaker.record_failure()
+                    raise
+                delay = self._next_delay(delay, e)
+                self.logger.warning(f"Transient LLM error ({type(e).__name__}), retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+            else:
+                breaker.record_success()
+                return response
+
+    async def acall(self, breaker: CircuitBreaker, send: Callable[[], Awaitable[T]]) -> T:
+        """Async counterpart of call"""
+        breaker.allow()
+        delay = self.config.LLM_RETRY_BASE_DELAY
+
+        for attempt in range(self.config.LLM_MAX_RETRIES + 1):
+            try:
+                response = await send()
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                if not self.is_transient(e):
+                    breaker.release_probe()
+                    raise
+                if attempt == self.config.LLM_MAX_RETRIES:
+                    breaker.record_failure()
+                    raise
+                delay = self._next_delay(delay, e)
+                self.logger.warning(f"Transient LLM error ({type(e).__name__}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return response
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        """Errors worth retrying: the same request may succeed a moment later"""
+        if isinstance(error, (openai.APIConnectionError, TimeoutError)):
+            return True
+        status = getattr(error, "status_code", None)
+        return status is not None and (status in (408, 409, 429) or status >= 500)
+
+    def _next_delay(self, previous: float, error: Exception) -> float:
+        """Decorrelated jitter, floored by any Retry-After header"""
+        delay = min(self.config.LLM_RETRY_MAX_DELAY,
+                    random.uniform(self.config.LLM_RETRY_BASE_DELAY, previous * 3))
+
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            delay = max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            pass
+
+        return delay
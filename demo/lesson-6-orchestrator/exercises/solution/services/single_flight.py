@@ -0,0 +1,131 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from config import Config
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Lets concurrent callers with the same request key share one call.
+
+    The first caller for a key runs the call; callers arriving while it is
+    in flight wait for that result (or exception) instead of sending their
+    own request. Once the call finishes the key is released, so later
+    callers go through the response cache as usual.
+    """
+
+    _shared: Optional["SingleFlight"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # event loop -> futures
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0
+        }
+
+    @classmethod
+    def get_shared(cls) -> "SingleFlight":
+        """Get the process-wide single-flight group, creating it on first use"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def is_coalescable(params: Dict[str, Any]) -> bool:
+        """Only near-deterministic, non-streaming requests can share a response"""
+        temperature = params.get("temperature", 1.0)
+        return (
+            Config.LLM_SINGLE_FLIGHT_ENABLED
+            and not params.get("stream", False)
+            and temperature is not None
+            and temperature <= Config.LLM_SINGLE_FLIGHT_MAX_TEMPERATURE
+        )
+
+    def do(self, key: str, call: Callable[[], T]) -> T:
+        """
+        Run call for the first caller of key; later concurrent callers share its result
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                future = self._calls[key] = Future()
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return future.result()
+
+    async def ado(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async counterpart of do, coalescing callers on the running event loop
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            loop_calls = self._async_calls.setdefault(loop, {})
+            future = loop_calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                future = loop_calls[key] = loop.create_future()
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            # Shielded so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(future)
+
+        try:
+            future.set_result(await call())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no follower was waiting for it
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del loop_calls[key]
+
+        return future.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Calls sent, callers coalesced onto them, and the coalescing rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+
+        callers = stats["calls"] + stats["coalesced"]
+        stats["coalesce_rate"] = stats["coalesced"] / callers if callers else 0.0
+        return stats